@@ -0,0 +1,78 @@
+import json
+
+from interfaces import *
+
+
+class ComputeTrace:
+    """
+    Per match compute record, one JSON object per line (JSONL), written by ScoreProcessor.compute
+    (see ScoreProcessor.set_compute_trace) and read back by 'score.py compute_trace'.
+
+    Values relating to each of the two playing entities of a match are lists of two values, in the
+    match's order:
+
+        play_type, league_match_index, league_break_in_score_factor, avg_divider (null for matches
+        computed without ranking factors), players, match_played, points_before, ranking,
+        ranking_breaking_in, won, ranking_factor, diff_ranking_factor, break_in_factor, level_factor,
+        base_points, earned, points_after
+    """
+    def __init__(self, file_name: str):
+        self._fd = open(file_name, 'w')
+
+    def record(self, record: dict):
+        self._fd.write(json.dumps(record))
+        self._fd.write("\n")
+
+    def close(self):
+        self._fd.close()
+
+    @staticmethod
+    def read(file_name: str):
+        with open(file_name, 'r') as fd:
+            for line in fd:
+                if line.strip() != "":
+                    yield json.loads(line)
+
+    @staticmethod
+    def is_in_filter(record: dict, player_filter: list):
+        """
+        A record is in the filter if one of its playing entities, or a doubles team member, is listed.
+        """
+        if not player_filter:
+            return True
+        for name in record['players']:
+            names = [name.strip()]
+            team_names = PlayingEntity.DOUBLES_NAME_RE.match(name)
+            if team_names:
+                names = [team_names.group(1), team_names.group(2)]
+            for n in names:
+                if n in player_filter:
+                    return True
+        return False
+
+    @staticmethod
+    def format_record(record: dict):
+        """
+        Returns the record as lines of text, the way 'score.py -v' prints them.
+        """
+        lines = list()
+        lines.append("######################################################")
+        lines.append("Stats for match")
+        lines.append("-----------------------------------")
+        lines.append("League match index: %d" % record['league_match_index'])
+        lines.append("Ranking break in period score factor: %2.3f" % record['league_break_in_score_factor'])
+        lines.append("-------------------")
+        lines.append("%-20s %16s %16s" % ("Players", *record['players']))
+        lines.append("%-20s %16d %16d" % ("Match Played", *record['match_played']))
+        lines.append("%-20s %16.3f %16.3f" % ("Points before", *record['points_before']))
+        lines.append("%-20s %16d %16d" % ("Current Ranking", *record['ranking']))
+        lines.append("%-20s %16s %16s" % ("Ranking Break in", *[f != 1.0 for f in record['break_in_factor']]))
+        lines.append("-------------------")
+        lines.append("Status for current match index")
+        lines.append("%-20s %16d %16d" % ("Games Won", *record['won']))
+        lines.append("%-20s %16.3f %16.3f" % ("Ranking Factor", *record['ranking_factor']))
+        lines.append("%-20s %16.3f %16.3f" % ("Diff Ranking Factor", *record['diff_ranking_factor']))
+        lines.append("%-20s %16.3f %16.3f" % ("Base Points", *record['base_points']))
+        lines.append("%-20s %16.3f %16.3f" % ("Points Earned", *record['earned']))
+        lines.append("%-20s %16.3f %16.3f" % ("Current points", *record['points_after']))
+        return lines
@@ -25,14 +25,22 @@ class DoublesTeam(PlayingEntity):
         return False
 
     def update_play_level_scoring_factor(self, play_level_scoring_factor: float,
-                                         index: LeagueIndex):
+                                         index: LeagueIndex, overwrite=False):
         super(DoublesTeam, self).update_play_level_scoring_factor(play_level_scoring_factor,
-                                                                  index)
+                                                                  index, overwrite)
 
         # Usually, level is computed from the level of both singles players, but if it is set
         # explicitly, respect that.
         self._level_override[index] = play_level_scoring_factor
 
+    def shift_league_indexes(self, index: LeagueIndex, shift: int):
+        super(DoublesTeam, self).shift_league_indexes(index, shift)
+
+        # Level overrides follow the league match index they were set at
+        self._level_override = dict([(LeagueIndex(int(override_index) + shift) if override_index >= index
+                                      else override_index, level)
+                                     for override_index, level in self._level_override.items()])
+
     def get_play_level_scoring_factor(self, index=LeagueIndex(-1)):
         """
         Override the play level scoring factor to be that of the product of
@@ -53,11 +61,13 @@ class DoublesTeam(PlayingEntity):
         try:
             factor1 = self._players[0].get_play_level_scoring_factor(index)
         except NoMatchPlayedYetError:
+            Counters.increment(Counters.NO_MATCH_PLAYED_YET_CAUGHT)
             factor1 = self._players[0].get_play_level_scoring_factor(PlayerIndex(0))
 
         try:
             factor2 = self._players[1].get_play_level_scoring_factor(index)
         except NoMatchPlayedYetError:
+            Counters.increment(Counters.NO_MATCH_PLAYED_YET_CAUGHT)
             factor2 = self._players[1].get_play_level_scoring_factor(PlayerIndex(0))
 
         return factor1 * factor2
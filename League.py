@@ -1,6 +1,9 @@
 import sys
 
 from DoublesTeam import *
+from MatchLog import MatchLog
+from Standings import *
+from utils.counters import Counters
 from utils.exceptions import PlayingEntityAlreadyExistsError, PlayingEntityDoesNotExistError
 from utils.utils import LoggerHandler
 
@@ -23,31 +26,33 @@ class League:
         self._playing_entity[PlayingEntity.PlayType.SINGLES] = set()
         self._playing_entity[PlayingEntity.PlayType.DOUBLES] = set()
 
-        self._matches = dict()
-        self._matches[PlayingEntity.PlayType.SINGLES] = dict()
-        self._matches[PlayingEntity.PlayType.DOUBLES] = dict()
+        # League match index i is at position i - 1 of the log
+        self._match_logs = dict()
+        self._match_logs[PlayingEntity.PlayType.SINGLES] = MatchLog()
+        self._match_logs[PlayingEntity.PlayType.DOUBLES] = MatchLog()
 
-        self._name_to_entity = dict()
-
-        self._league_match_index = dict()
-        self._league_match_index[PlayingEntity.PlayType.SINGLES] = LeagueIndex(0)
-        self._league_match_index[PlayingEntity.PlayType.DOUBLES] = LeagueIndex(0)
+        # Playing entities are referred to by id internally, names are only looked up when importing
+        # and printing, see add_playing_entity
+        self._entities = []
+        self._name_to_id = dict()
 
         League._SINGLETON = self
 
     # Populating league and matches
 
     def add_playing_entity(self, playing_entity: PlayingEntity):
-        if playing_entity.get_name() in self._name_to_entity:
+        if playing_entity.get_name() in self._name_to_id:
             raise PlayingEntityAlreadyExistsError("Trying to add a player who already exists: %s" %
                                                   playing_entity.get_name())
 
+        playing_entity.set_id(len(self._entities))
+        self._entities.append(playing_entity)
         self._playing_entity[playing_entity.play_type].add(playing_entity)
-        self._name_to_entity[playing_entity.get_name()] = playing_entity
+        self._name_to_id[playing_entity.get_name()] = playing_entity.id
 
     def add_match(self, match: BaseMatch):
-        p1_entity = self._name_to_entity[match.get_name(1)]
-        p2_entity = self._name_to_entity[match.get_name(2)]
+        p1_entity = self._entities[match.get_entity_id(1)]
+        p2_entity = self._entities[match.get_entity_id(2)]
 
         # if p1_entity.play_type != p2_entity.play_type:
         #     raise AussieException("%s%s" %
@@ -55,26 +60,125 @@ class League:
         #                            "P1: %s P2: %s" % (p1_entity.get_name(), p2_entity.get_name())))
 
         play_type = p1_entity.play_type
-        self._league_match_index[play_type] += 1
-
-        if self._league_match_index[play_type] in self._matches[play_type].keys():
-            raise Exception("Internal error: match overwrite attempt at match index %d" %
-                            self._league_match_index[play_type])
-        self._matches[play_type][self._league_match_index[play_type].get_locked_copy()] = match
+        match_log = self._match_logs[play_type]
+        match_log.append(*League._get_match_record(match))
+        league_match_index = LeagueIndex(len(match_log), locked=True)
 
         # Add match to player objects for stats update
-        p1_entity.add_match(match, self._league_match_index[play_type])
-        p2_entity.add_match(match, self._league_match_index[play_type])
+        p1_entity.add_match(match, league_match_index)
+        p2_entity.add_match(match, league_match_index)
+
+    @staticmethod
+    def _get_match_record(match: BaseMatch):
+        return ((match.get_entity_id(1), match.get_entity_id(2)),
+                (match.get_entity_games_won(1), match.get_entity_games_won(2)))
+
+    def _get_match(self, play_type: PlayingEntity.PlayType, league_match_index: LeagueIndex):
+        from Match import Match
+
+        return Match.from_entity_ids(self, *self._match_logs[play_type].get(int(league_match_index) - 1))
+
+    def _get_match_play_type(self, match: BaseMatch):
+        return self._entities[match.get_entity_id(1)].play_type
+
+    def replace_match(self, league_match_index: LeagueIndex, match: BaseMatch):
+        """
+        Replaces the match at given league match index, e.g. to correct a mis-entered score. Points and
+        rankings of the playing entities of both matches are reset from it on, see ScoreProcessor.replace_match.
+        """
+        play_type = self._get_match_play_type(match)
+        if not 0 < league_match_index <= self.last_match_index(play_type):
+            raise SmartIndexError("No %s match at league match index %d" % (play_type.value, int(league_match_index)))
+        previous_match = self._get_match(play_type, league_match_index)
+        previous_ids = [previous_match.get_entity_id(1), previous_match.get_entity_id(2)]
+        entity_ids = [match.get_entity_id(1), match.get_entity_id(2)]
+        for entity_id in previous_ids:
+            if entity_id not in entity_ids:
+                self._entities[entity_id].remove_match(league_match_index)
+        for entity_id in entity_ids:
+            if entity_id in previous_ids:
+                self._entities[entity_id].replace_match(match, league_match_index)
+            else:
+                self._entities[entity_id].insert_match(match, league_match_index)
+        self._match_logs[play_type].set(int(league_match_index) - 1, *League._get_match_record(match))
+
+    def insert_match(self, league_match_index: LeagueIndex, match: BaseMatch):
+        """
+        Adds a match at given league match index, e.g. a forgotten one; the league match indexes of the matches
+        from it on are shifted by one, as are the levels set at them. Points and rankings of the playing
+        entities whose matches are shifted are reset from it on, see ScoreProcessor.insert_match.
+        """
+        play_type = self._get_match_play_type(match)
+        nb_matches = len(self._match_logs[play_type])
+        if league_match_index == nb_matches + 1:
+            self.add_match(match)
+            return
+        if not 0 < league_match_index <= nb_matches:
+            raise SmartIndexError("Can't insert a %s match at league match index %d" %
+                                  (play_type.value, int(league_match_index)))
+
+        for entity in self._playing_entity[play_type]:
+            entity.shift_league_indexes(league_match_index, 1)
+        self._match_logs[play_type].insert(int(league_match_index) - 1, *League._get_match_record(match))
+        self._entities[match.get_entity_id(1)].insert_match(match, league_match_index)
+        self._entities[match.get_entity_id(2)].insert_match(match, league_match_index)
+
+    def update_play_level(self, name: str, play_level_scoring_factor: float, league_match_index: LeagueIndex,
+                          overwrite=False):
+        """
+        Sets a playing entity's level from given league match index on, as NEW_PLAYER_LEVEL and NEW_TEAM_LEVEL
+        csv entries do. A level already set at that index is only replaced if 'overwrite' is set. Matches'
+        points have to be computed again, see ScoreProcessor.apply_level_change.
+        """
+        self.get_playing_entity(name).update_play_level_scoring_factor(play_level_scoring_factor,
+                                                                       league_match_index, overwrite)
+
+    def get_first_match_affected_by_level(self, name: str, league_match_index: LeagueIndex,
+                                          play_type: PlayingEntity.PlayType):
+        """
+        First league match index of given play type whose points a level set for the playing entity at given
+        league match index may change, one more than the last match index if none.
+
+        A level set at a match the entity played is looked up from its next match on, otherwise it replaces
+        its latest level set before the index (possibly its initial one) and may apply from its first match.
+        A player's level also changes its doubles teams' level if not set explicitly.
+        """
+        entity = self.get_playing_entity(name)
+        last_match_index = self.last_match_index(play_type)
+        if last_match_index == -1:
+            return LeagueIndex(1)
+        if entity.play_type != play_type and play_type == PlayingEntity.PlayType.SINGLES:
+            # Doubles team levels don't change singles matches
+            return LeagueIndex(int(last_match_index) + 1)
+
+        def is_in_match(match):
+            # Doubles matches list their teams' players
+            return entity.id in [match.get_entity_id(1), match.get_entity_id(2)] or match.has_played(entity.get_name())
+
+        if entity.play_type == play_type and 0 < league_match_index <= last_match_index and \
+                is_in_match(self._get_match(play_type, league_match_index)):
+            return LeagueIndex(int(league_match_index) + 1)
+        for match_index, match in enumerate(self.iter_matches(play_type), 1):
+            if is_in_match(match):
+                return LeagueIndex(match_index)
+        return LeagueIndex(int(last_match_index) + 1)
 
     # Information
 
     def last_match_index(self, play_type: PlayingEntity.PlayType):
-        if len(self._matches[play_type].keys()) == 0:
+        nb_matches = len(self._match_logs[play_type])
+        if nb_matches == 0:
             return LeagueIndex(-1)
-        return max(self._matches[play_type].keys())
+        return LeagueIndex(nb_matches, locked=True)
+
+    def get_match_log(self, play_type: PlayingEntity.PlayType):
+        """
+        Matches of given play type as columns of entity ids and games won, e.g. for exports, see MatchLog.
+        """
+        return self._match_logs[play_type]
 
     def playing_entity_name_exists(self, playing_entity_name: str):
-        if playing_entity_name.lower() in self._name_to_entity:
+        if playing_entity_name.lower() in self._name_to_id:
             return True
         return False
 
@@ -83,12 +187,21 @@ class League:
         """
         Returns the number of matches a player has played at the time the league has hit 'league_match_index'
         """
-        return self._name_to_entity[entity_name].get_nb_match_played(league_match_index)
+        return self.get_playing_entity(entity_name).get_nb_match_played(league_match_index)
+
+    def get_playing_entity_by_id(self, entity_id: int):
+        """
+        Playing entities are given ids in the order they are added to the league, from 0 on.
+        """
+        return self._entities[entity_id]
 
     def get_playing_entity(self, name):
-        if name not in self._name_to_entity:
+        return self._entities[self.get_playing_entity_id(name)]
+
+    def get_playing_entity_id(self, name):
+        if name not in self._name_to_id:
             raise PlayingEntityDoesNotExistError("Playing entity %s does not exist!" % name)
-        return self._name_to_entity[name]
+        return self._name_to_id[name]
 
     def get_league_average_points_per_match(self,
                                             index: LeagueIndex,
@@ -97,23 +210,24 @@ class League:
         """
         This function returns the weighted league average of the player's average points per match.
         """
+        Counters.increment(Counters.LEAGUE_AVERAGE_SCAN)
         league_points = 0
         league_match_played = 0
         games_won = 0
         games_lost = 0
 
         for player in self.iter_playing_entities(play_type):
-            player_matches_played = self.get_player_matches_played(index, player.get_name())
+            player_matches_played = player.get_nb_match_played(index)
             if player_matches_played == 0:
                 continue
 
-            player_points = player.get_cumulative_points(index)
+            player_points = player.get_cumulative_points_at(index)
             league_points += player_points
 
             league_match_played += player_matches_played
 
-            games_won += player.get_cumulative_games_won(index)
-            games_lost += player.get_cumulative_games_lost(index)
+            games_won += player.get_cumulative_games_won_at(index)
+            games_lost += player.get_cumulative_games_lost_at(index)
 
         if data is not None:
             data['league_points'] = league_points
@@ -135,6 +249,12 @@ class League:
 
         return avg
 
+    def get_standings(self, index: LeagueIndex, play_type: PlayingEntity.PlayType):
+        """
+        Returns the standings as of given league index, see Standings for details.
+        """
+        return Standings(self, play_type, index)
+
     # Resets
 
     def reset_rankings(self, play_type: PlayingEntity.PlayType):
@@ -145,6 +265,10 @@ class League:
         for entity in self._playing_entity[play_type]:
             entity.reset_points()
 
+    def reset_results_from(self, league_match_index: LeagueIndex, play_type: PlayingEntity.PlayType):
+        for entity in self._playing_entity[play_type]:
+            entity.reset_results_from(league_match_index)
+
     # Doubles services
 
     def generate_doubles_team_combination(self):
@@ -174,8 +298,8 @@ class League:
 
     def get_doubles_team(self, player_name_1, player_name_2):
         team_name = DoublesTeam.get_doubles_team_name_from_player_names(player_name_1, player_name_2)
-        if team_name in self._name_to_entity:
-            return self._name_to_entity[team_name]
+        if team_name in self._name_to_id:
+            return self._entities[self._name_to_id[team_name]]
         raise PlayingEntityDoesNotExistError("Team composed of %s and %s does not exist!" % (player_name_1,
                                                                                              player_name_2))
 
@@ -185,8 +309,10 @@ class League:
         """
         Cycles over the matches from oldest to newest for given play type
         """
-        for match_index in sorted(self._matches[play_type].keys()):
-            yield self._matches[play_type][match_index]
+        from Match import Match
+
+        for entity_ids, games_won in self._match_logs[play_type]:
+            yield Match.from_entity_ids(self, entity_ids, games_won)
 
     def iter_playing_entities(self, play_type: PlayingEntity.PlayType):
         for entity in sorted(self._playing_entity[play_type]):
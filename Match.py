@@ -6,116 +6,122 @@ from utils.exceptions import PlayingEntityDoesNotExistError
 class Match(BaseMatch):
     """
     Match class to hold match results.
+
+    Leagues hold a match object per match played, so only the league's ids of both playing entities and their
+    games won are stored. Names, players and games lost are derived from them.
     """
     # LEAGUE must be set to a valid League object before being instantiated!
     LEAGUE = None
 
-    def __init__(self, p1: str, p1_games_won: int, p2: str, p2_games_won: int):
-        if Match.LEAGUE is None:
-            if League.get_instance() is None:
-                raise Exception("You must instantiate a league object before instantiating a Match object!")
-            else:
-                Match.LEAGUE = League.get_instance()
-
-        self._players_list = set()
-        self._play_type = PlayingEntity.PlayType.SINGLES
-        self._p1 = p1.lower()
-        self._p2 = p2.lower()
-        self._p1_games_won = p1_games_won
-        self._p2_games_won = p2_games_won
-
-        self._data = dict()
-        self._data['name'] = dict()
-        self._data['games_won'] = dict()
-        self._data['games_lost'] = dict()
-
-        self._init_data()
-
-    def _init_data(self):
-        # Extract player's names from the entity's names in case it's a doubles match
-        team_1_names = PlayingEntity.DOUBLES_NAME_RE.match(self._p1)
-        team_2_names = PlayingEntity.DOUBLES_NAME_RE.match(self._p2)
-        if team_1_names is None and team_2_names or team_2_names is None and team_1_names:
-            raise AussieException("%s%s" %
-                                  ("You can't mix singles and doubles in a Match object!",
-                                   "P1: %s P2: %s" % (self._p1, self._p2)))
-
-        # Add doubles players names to the player list
-        if team_1_names:
-            self._play_type = PlayingEntity.PlayType.DOUBLES
-            self._players_list.add(team_1_names.group(1).lower())
-            self._players_list.add(team_1_names.group(2).lower())
-            self._players_list.add(team_2_names.group(1).lower())
-            self._players_list.add(team_2_names.group(2).lower())
-
-        # Add singles players' names or doubles' team names to the list too
-        self._players_list.add(self._p1.lower())
-        self._players_list.add(self._p2.lower())
-
-        if len(self._players_list) % 2 == 1:
-            raise PlayingAgainstSelf("Can't set up a match where a player plays against himself! Match players: %s" %
-                                     str(self._players_list))
+    __slots__ = ('_league', '_entity_ids', '_games_won')
 
+    def __init__(self, p1: str, p1_games_won: int, p2: str, p2_games_won: int):
+        # There can only be one league, follow it if it was instantiated again
+        if League.get_instance() is not None:
+            Match.LEAGUE = League.get_instance()
+        elif Match.LEAGUE is None:
+            raise Exception("You must instantiate a league object before instantiating a Match object!")
+        self._league = Match.LEAGUE
+
+        entities = self._get_entities(p1.lower(), p2.lower())
+        self._entity_ids = (entities[0].id, entities[1].id)
+        self._games_won = (p1_games_won, p2_games_won)
+
+    @classmethod
+    def from_entity_ids(cls, league, entity_ids: tuple, games_won: tuple):
+        """
+        Match of given league's playing entities, as stored in its match log, see MatchLog.
+        """
+        match = cls.__new__(cls)
+        match._league = league
+        match._entity_ids = entity_ids
+        match._games_won = games_won
+        return match
+
+    def _get_entities(self, p1: str, p2: str):
         exception_string = []
-        if not Match.LEAGUE.playing_entity_name_exists(self._p1):
-            exception_string.append("Playing entity '%s' is not registered with the league!" % self._p1)
-        if not Match.LEAGUE.playing_entity_name_exists(self._p2):
-            exception_string.append("Playing entity '%s' is not registered with the league!" % self._p2)
+        for name in [p1, p2]:
+            if not self._league.playing_entity_name_exists(name):
+                exception_string.append("Playing entity '%s' is not registered with the league!" % name)
         if exception_string:
             raise PlayingEntityDoesNotExistError("\n".join(exception_string))
 
-        self._data['name'][1] = self._p1.lower()
-        self._data['games_won'][self._p1.lower()] = self._p1_games_won
-        self._data['games_lost'][self._p1.lower()] = self._p2_games_won
-        self._data['name'][2] = self._p2.lower()
-        self._data['games_won'][self._p2.lower()] = self._p2_games_won
-        self._data['games_lost'][self._p2.lower()] = self._p1_games_won
+        entities = [self._league.get_playing_entity(p1), self._league.get_playing_entity(p2)]
+        if entities[0].play_type != entities[1].play_type:
+            raise AussieException("%s%s" %
+                                  ("You can't mix singles and doubles in a Match object!",
+                                   "P1: %s P2: %s" % (p1, p2)))
 
-        if self._play_type == PlayingEntity.PlayType.DOUBLES:
+        players_list = [p1, p2]
+        if entities[0].play_type == PlayingEntity.PlayType.DOUBLES:
+            players_list += [entity.get_player(i).get_name() for entity in entities for i in [1, 2]]
+        if len(set(players_list)) != len(players_list):
+            raise PlayingAgainstSelf("Can't set up a match where a player plays against himself! Match players: %s" %
+                                     str(set(players_list)))
+        return entities
+
+    def _get_entity(self, entity: int):
+        return self._league.get_playing_entity_by_id(self._entity_ids[entity - 1])
+
+    def _get_side(self, entity_name: str):
+        """
+        1 or 2 for the side of the match the playing entity, or doubles player, played on. None if it didn't play.
+        """
+        entity_name = entity_name.lower()
+        for entity in [1, 2]:
+            playing_entity = self._get_entity(entity)
+            if playing_entity.get_name() == entity_name:
+                return entity
             # Allow doubles players to ask for their score by their individual name
             # instead of the team's name.
-            self._data['games_won'][team_1_names.group(1).lower()] = self._p1_games_won
-            self._data['games_won'][team_1_names.group(2).lower()] = self._p1_games_won
-            self._data['games_lost'][team_1_names.group(1).lower()] = self._p2_games_won
-            self._data['games_lost'][team_1_names.group(2).lower()] = self._p2_games_won
-
-            self._data['games_won'][team_2_names.group(1).lower()] = self._p2_games_won
-            self._data['games_won'][team_2_names.group(2).lower()] = self._p2_games_won
-            self._data['games_lost'][team_2_names.group(1).lower()] = self._p1_games_won
-            self._data['games_lost'][team_2_names.group(2).lower()] = self._p1_games_won
+            if playing_entity.play_type == PlayingEntity.PlayType.DOUBLES and playing_entity.is_in_team(entity_name):
+                return entity
+        return None
 
     def get_name(self, entity: int):
         if entity != 1 and entity != 2:
             raise Exception("Match.get_name: entity must be either 1 or 2, value given: %d" % entity)
-        return self._data['name'][entity]
+        return self._get_entity(entity).get_name()
+
+    def get_entity_id(self, entity: int):
+        return self._entity_ids[entity - 1]
+
+    def get_entity_games_won(self, entity: int):
+        return self._games_won[entity - 1]
 
     def get_games_won(self, entity_name: str):
-        if not self.has_played(entity_name):
+        side = self._get_side(entity_name)
+        if side is None:
             raise Exception("Match.get_games_won: player %s didn't play in this match" % entity_name)
-        return self._data['games_won'][entity_name]
+        return self._games_won[side - 1]
 
     def get_games_lost(self, entity_name: str):
-        if not self.has_played(entity_name):
+        side = self._get_side(entity_name)
+        if side is None:
             raise Exception("Match.get_games_won: player %s didn't play in this match" % entity_name)
-        return self._data['games_lost'][entity_name]
+        return self._games_won[2 - side]
 
     def has_played(self, entity_name: str, entity_name2=""):
-        if entity_name.lower() in self._players_list:
-            if entity_name2 != "" and entity_name2.lower() not in self._players_list:
+        if self._get_side(entity_name) is not None:
+            if entity_name2 != "" and self._get_side(entity_name2) is None:
                 return False
             else:
                 return True
         return False
 
     def get_players_list(self):
-        return self._players_list
+        players_list = set()
+        for entity in [1, 2]:
+            playing_entity = self._get_entity(entity)
+            players_list.add(playing_entity.get_name())
+            if playing_entity.play_type == PlayingEntity.PlayType.DOUBLES:
+                players_list.add(playing_entity.get_player(1).get_name())
+                players_list.add(playing_entity.get_player(2).get_name())
+        return players_list
 
     @property
     def play_type(self):
-        return self._play_type
+        return self._get_entity(1).play_type
 
     def __str__(self):
-        name1 = self._data['name'][1]
-        name2 = self._data['name'][2]
-        return "{:<12s} vs {:<12s}: {:d}-{:d}".format(self._data['name'][1], self._data['name'][2],
-                                                      self._data['games_won'][name1], self._data['games_won'][name2])
+        return "{:<12s} vs {:<12s}: {:d}-{:d}".format(self.get_name(1), self.get_name(2), *self._games_won)
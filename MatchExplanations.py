@@ -0,0 +1,170 @@
+import array
+import bisect
+import json
+import sys
+
+from interfaces import *
+
+
+class MatchExplanations:
+    """
+    Columnar record of how each match's points were earned, filled by ScoreProcessor.compute (see
+    ScoreProcessor.set_match_explanations), to answer "why did player X get these points for league
+    match N" without recomputing the season. There is one row per playing entity and match.
+
+    earned points = base points * ranking factor * diff ranking factor * break in factor * level factor
+
+    It can be saved to and loaded from a snapshot file: a JSON header line followed by the raw
+    columns, see save and load.
+    """
+    FORMAT = "match-explanations"
+    VERSION = 1
+
+    COLUMNS = [('league_match_index', 'q'),
+               ('entity', 'q'),
+               ('opponent', 'q'),
+               ('games_won', 'q'),
+               ('games_lost', 'q'),
+               ('ranking_factor', 'd'),
+               ('diff_ranking_factor', 'd'),
+               ('break_in_factor', 'd'),
+               ('level_factor', 'd'),
+               ('base_points', 'd'),
+               ('earned_points', 'd')]
+
+    def __init__(self):
+        self._play_type = None
+        self._points_per_match = 0
+        self.reset()
+
+    def reset(self, play_type=None, points_per_match=0):
+        self._play_type = play_type
+        self._points_per_match = points_per_match
+        self._names = []
+        self._name_to_id = dict()
+        self._columns = dict([(name, array.array(typecode)) for name, typecode in MatchExplanations.COLUMNS])
+
+    def _get_name_id(self, name: str):
+        if name not in self._name_to_id:
+            self._name_to_id[name] = len(self._names)
+            self._names.append(name)
+        return self._name_to_id[name]
+
+    def add(self, league_match_index: LeagueIndex, player1: PlayingEntity, player2: PlayingEntity, state):
+        """
+        Adds both entities' rows for a match, from ScoreProcessor's MatchComputeState.
+        """
+        ids = [self._get_name_id(player1.get_name()), self._get_name_id(player2.get_name())]
+        for side, other in [(0, 1), (1, 0)]:
+            self._columns['league_match_index'].append(int(league_match_index))
+            self._columns['entity'].append(ids[side])
+            self._columns['opponent'].append(ids[other])
+            self._columns['games_won'].append(state.won[side])
+            self._columns['games_lost'].append(state.won[other])
+            self._columns['ranking_factor'].append(state.ranking_factor[side])
+            self._columns['diff_ranking_factor'].append(state.diff_ranking_factor[side])
+            self._columns['break_in_factor'].append(state.break_in_factor[side])
+            self._columns['level_factor'].append(state.level_factor[side])
+            self._columns['base_points'].append(state.points[side])
+            self._columns['earned_points'].append(state.earned[side])
+
+    @property
+    def play_type(self):
+        return self._play_type
+
+    def __len__(self):
+        return len(self._columns['league_match_index'])
+
+    def _is_name_of(self, name: str, stored_name: str):
+        # Doubles team names are padded, see PlayingEntity.DOUBLES_NAME_FORMAT
+        if name.lower().split() == stored_name.split():
+            return True
+        team_names = PlayingEntity.DOUBLES_NAME_RE.match(stored_name)
+        return team_names is not None and name.lower() in [team_names.group(1), team_names.group(2)]
+
+    def get_explanations(self, name: str, league_match_index=None):
+        """
+        Rows of given entity, or of the doubles teams of given player, as dictionaries in league match
+        index order. Only the given league match index is returned if set.
+        """
+        ids = set([i for i, stored_name in enumerate(self._names) if self._is_name_of(name, stored_name)])
+        if len(ids) == 0:
+            raise PlayingEntityDoesNotExistError("%s has no match recorded" % name)
+
+        indexes = self._columns['league_match_index']
+        rows = range(0, len(self))
+        if league_match_index is not None:
+            # Rows are in league match index order
+            first = bisect.bisect_left(indexes, int(league_match_index))
+            rows = range(first, bisect.bisect_right(indexes, int(league_match_index), lo=first))
+
+        explanations = []
+        for row in rows:
+            if self._columns['entity'][row] not in ids:
+                continue
+            explanation = dict([(name, self._columns[name][row]) for name, _ in MatchExplanations.COLUMNS])
+            explanation['entity'] = self._names[explanation['entity']]
+            explanation['opponent'] = self._names[explanation['opponent']]
+            explanations.append(explanation)
+        return explanations
+
+    def format_explanation(self, explanation: dict):
+        """
+        Returns the explanation as lines of text.
+        """
+        total_games = explanation['games_won'] + explanation['games_lost']
+        return [
+            "League match index %d (%s): %s vs %s, %d-%d" % (explanation['league_match_index'],
+                                                             self._play_type.value if self._play_type else "",
+                                                             " ".join(explanation['entity'].split()),
+                                                             " ".join(explanation['opponent'].split()),
+                                                             explanation['games_won'], explanation['games_lost']),
+            "    %-24s %10.3f   (%d of %d games won, out of %d points per match)" %
+            ("base points", explanation['base_points'], explanation['games_won'], total_games,
+             self._points_per_match),
+            "    %-24s %10.3f   (own average vs league average)" % ("ranking factor", explanation['ranking_factor']),
+            "    %-24s %10.3f   (opponent average vs own average)" % ("diff ranking factor",
+                                                                     explanation['diff_ranking_factor']),
+            "    %-24s %10.3f   (below 1 during the ranking break in period)" % ("break in factor",
+                                                                                explanation['break_in_factor']),
+            "    %-24s %10.3f" % ("level factor", explanation['level_factor']),
+            "    %-24s %10.3f   (base points x factors)" % ("earned points", explanation['earned_points']),
+        ]
+
+    def save(self, file_name: str):
+        header = {'format': MatchExplanations.FORMAT,
+                  'version': MatchExplanations.VERSION,
+                  'byteorder': sys.byteorder,
+                  'play_type': self._play_type.value if self._play_type else None,
+                  'points_per_match': self._points_per_match,
+                  'names': self._names,
+                  'rows': len(self),
+                  'columns': MatchExplanations.COLUMNS}
+        with open(file_name, 'wb') as fd:
+            fd.write(json.dumps(header).encode('utf-8'))
+            fd.write(b"\n")
+            for name, _ in MatchExplanations.COLUMNS:
+                self._columns[name].tofile(fd)
+
+    @staticmethod
+    def load(file_name: str):
+        explanations = MatchExplanations()
+        with open(file_name, 'rb') as fd:
+            try:
+                header = json.loads(fd.readline().decode('utf-8'))
+            except ValueError:
+                header = dict()
+            if header.get('format') != MatchExplanations.FORMAT or header.get('version') != MatchExplanations.VERSION:
+                raise Exception("%s is not a match explanations snapshot" % file_name)
+
+            play_type = PlayingEntity.PlayType(header['play_type']) if header['play_type'] else None
+            explanations.reset(play_type, header['points_per_match'])
+            for name in header['names']:
+                explanations._get_name_id(name)
+            for name, typecode in header['columns']:
+                column = array.array(typecode)
+                column.fromfile(fd, header['rows'])
+                if header['byteorder'] != sys.byteorder:
+                    column.byteswap()
+                explanations._columns[name] = column
+        return explanations
@@ -0,0 +1,70 @@
+import array
+
+
+class MatchLog:
+    """
+    Matches of a play type as parallel columns of league entity ids and games won, in league match index
+    order: the match at league match index 'i' is at position 'i - 1'.
+
+    Matches are appended as they are played. Inserting or replacing one, see League.insert_match and
+    League.replace_match, is meant for the occasional correction.
+    """
+    COLUMNS = ['entity_1', 'entity_2', 'games_won_1', 'games_won_2']
+
+    def __init__(self):
+        self._columns = dict([(name, array.array('q')) for name in MatchLog.COLUMNS])
+
+    def __len__(self):
+        return len(self._columns['entity_1'])
+
+    def append(self, entity_ids: tuple, games_won: tuple):
+        self._columns['entity_1'].append(entity_ids[0])
+        self._columns['entity_2'].append(entity_ids[1])
+        self._columns['games_won_1'].append(games_won[0])
+        self._columns['games_won_2'].append(games_won[1])
+
+    def insert(self, position: int, entity_ids: tuple, games_won: tuple):
+        self._columns['entity_1'].insert(position, entity_ids[0])
+        self._columns['entity_2'].insert(position, entity_ids[1])
+        self._columns['games_won_1'].insert(position, games_won[0])
+        self._columns['games_won_2'].insert(position, games_won[1])
+
+    def set(self, position: int, entity_ids: tuple, games_won: tuple):
+        self._columns['entity_1'][position] = entity_ids[0]
+        self._columns['entity_2'][position] = entity_ids[1]
+        self._columns['games_won_1'][position] = games_won[0]
+        self._columns['games_won_2'][position] = games_won[1]
+
+    def get(self, position: int):
+        """
+        Entity ids and games won of both sides of the match at given position.
+        """
+        return ((self._columns['entity_1'][position], self._columns['entity_2'][position]),
+                (self._columns['games_won_1'][position], self._columns['games_won_2'][position]))
+
+    def __iter__(self):
+        """
+        Cycles over the matches' (entity ids, games won), see get.
+        """
+        columns = self._columns
+        for entity_1, entity_2, games_won_1, games_won_2 in zip(columns['entity_1'], columns['entity_2'],
+                                                                columns['games_won_1'], columns['games_won_2']):
+            yield (entity_1, entity_2), (games_won_1, games_won_2)
+
+    def get_columns(self):
+        """
+        Read only views of the columns, without copying them. No match can be added while a view, or an array
+        built on it, is alive: array.array raises a BufferError.
+        """
+        return dict([(name, memoryview(column).toreadonly()) for name, column in self._columns.items()])
+
+    def get_numpy_columns(self):
+        """
+        Columns as read only numpy int64 arrays sharing the log's memory, see get_columns.
+        """
+        try:
+            import numpy
+        except ImportError:
+            raise Exception("numpy is required to get the match log as numpy arrays, use get_columns instead")
+
+        return dict([(name, numpy.frombuffer(view, dtype=numpy.int64)) for name, view in self.get_columns().items()])
@@ -0,0 +1,128 @@
+import array
+import csv
+
+from Standings import *
+
+
+class RankTimeline:
+    """
+    Entities x league index matrices of cumulative points, points per match and rank for a play type.
+
+    It is filled by ScoreProcessor.compute from the ranking state it keeps after each league match
+    (see ScoreProcessor.set_rank_timeline and RankingState), so building it doesn't query Stats.
+    Entities which haven't played yet as of a league index have a rank of 0, their points being
+    their initial points.
+    """
+    METRICS = ['points', 'points_per_match', 'rank']
+
+    def __init__(self):
+        self._names = []
+        self._name_to_row = dict()
+        self._indexes = array.array('q')
+
+        # Column major flat matrices: value for row 'r' at column 'c' is at 'c * number of rows + r'
+        self._data = dict()
+        self._data['points'] = array.array('d')
+        self._data['points_per_match'] = array.array('d')
+        self._data['rank'] = array.array('q')
+
+    def reset(self, entities):
+        """
+        Clears the timeline and sets its rows, in the given order.
+        """
+        self._names = [entity.get_name() for entity in entities]
+        self._name_to_row = dict([(name, row) for row, name in enumerate(self._names)])
+        del self._indexes[:]
+        for metric in RankTimeline.METRICS:
+            del self._data[metric][:]
+
+    def add(self, standings: Standings):
+        """
+        Adds a column for the league index of the standings, which must be greater than the previous one.
+        """
+        column = dict()
+        for metric in RankTimeline.METRICS:
+            column[metric] = [0] * len(self._names)
+
+        for entry in standings:
+            row = self._name_to_row[entry.entity.get_name()]
+            column['points'][row] = float(entry.points)
+            column['points_per_match'][row] = float(entry.points_per_match)
+            column['rank'][row] = entry.rank if entry.match_played != 0 else 0
+
+        self.add_column(int(standings.index), column['points'], column['points_per_match'], column['rank'])
+
+    def add_column(self, league_index: int, points, points_per_match, ranks):
+        """
+        Adds a column for given league index from each metric's values in row order, see add.
+        """
+        if len(self._indexes) != 0 and league_index <= self._indexes[-1]:
+            raise BackToTheFutureError("Rank timeline columns must be added in increasing league index order")
+
+        self._indexes.append(league_index)
+        self._data['points'].extend(points)
+        self._data['points_per_match'].extend(points_per_match)
+        self._data['rank'].extend(ranks)
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    @property
+    def indexes(self):
+        return list(self._indexes)
+
+    def get_row(self, metric: str, name: str):
+        """
+        Returns the values of a metric for given entity, one per league index.
+        """
+        row = self._name_to_row[name.lower()]
+        return list(self._data[metric][row::len(self._names)])
+
+    @staticmethod
+    def _display_name(name: str):
+        # Doubles team names are padded, see PlayingEntity.DOUBLES_NAME_FORMAT
+        return " ".join(name.split())
+
+    def write_csv(self, file_name: str):
+        """
+        One row per entity and metric, one column per league index.
+        """
+        with open(file_name, 'w', newline='') as fd:
+            writer = csv.writer(fd)
+            writer.writerow(['metric', 'name'] + list(self._indexes))
+            for metric in RankTimeline.METRICS:
+                value_format = "{:d}" if self._data[metric].typecode == 'q' else "{:.3f}"
+                for name in self._names:
+                    writer.writerow([metric, RankTimeline._display_name(name)] +
+                                    [value_format.format(v) for v in self.get_row(metric, name)])
+
+    def write_npz(self, file_name: str):
+        """
+        Matrices are saved with shape (entities, league indexes), along with 'names' and 'league_index'.
+        """
+        try:
+            import numpy
+        except ImportError:
+            raise Exception("numpy is required to export the rank timeline in .npz format, use .csv instead")
+
+        nb_rows = len(self._names)
+        matrices = dict()
+        for metric in RankTimeline.METRICS:
+            dtype = numpy.int64 if self._data[metric].typecode == 'q' else numpy.float64
+            matrix = numpy.frombuffer(self._data[metric], dtype=dtype)
+            matrices[metric] = matrix.reshape(len(self._indexes), nb_rows).T
+
+        numpy.savez_compressed(file_name,
+                               names=numpy.array([RankTimeline._display_name(n) for n in self._names]),
+                               league_index=numpy.frombuffer(self._indexes, dtype=numpy.int64),
+                               **matrices)
+
+    def write(self, file_name: str):
+        """
+        Format is chosen from the file extension, '.npz' or CSV otherwise.
+        """
+        if file_name.endswith(".npz"):
+            self.write_npz(file_name)
+        else:
+            self.write_csv(file_name)
@@ -0,0 +1,119 @@
+import array
+import hashlib
+import importlib
+import json
+import os
+import sys
+
+from importer.cache import evict_least_recently_used, hash_files
+from utils.utils import LoggerHandler
+
+logger = LoggerHandler.get_instance().get_logger("ResultCache")
+
+# Modules whose source the computed points depend on, entries are invalidated when one changes
+ENGINE_MODULES = ['ScoreProcessor', 'League', 'Standings', 'Stats', 'interfaces', 'Player', 'DoublesTeam', 'Match',
+                  'MatchLog', 'utils.SmartIndex', 'importer.csv', 'importer.csv_format']
+
+
+class ResultCache:
+    """
+    On disk cache of computed match points (see ScoreProcessor.get_match_points), keyed by a hash of the
+    CSV file's content (see importer.cache.ParseCache.get_content_hash), the scoring parameters, the play
+    type and the scoring engine's source. Entries live in a 'results' sub directory of the cache directory,
+    whose total size is bounded: least recently used entries are evicted first.
+
+    An entry is a JSON header line followed by the points as an array of doubles, two per league match.
+    An entry computed up to a given league match index serves any index up to it.
+
+    The content hash of the last run on each CSV file is also kept, so that once a file has changed the
+    points of its previous content can be reused for the matches the change doesn't affect, see
+    get_previous_run.
+    """
+    FORMAT = "result-cache"
+    VERSION = 1
+
+    DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+    def __init__(self, cache_dir: str, max_size=DEFAULT_MAX_SIZE):
+        self._cache_dir = os.path.join(cache_dir, "results")
+        self._max_size = max_size
+        self._engine_hash = None
+
+    def _get_file_name(self, content_hash: str, parameters: tuple, play_type):
+        if self._engine_hash is None:
+            self._engine_hash = hash_files([importlib.import_module(module).__file__ for module in ENGINE_MODULES])
+        digest = hashlib.sha256()
+        digest.update((self._engine_hash + content_hash).encode('utf-8'))
+        digest.update(json.dumps([list(parameters), play_type.value]).encode('utf-8'))
+        return os.path.join(self._cache_dir, "%s.bin" % digest.hexdigest())
+
+    def _get_run_file_name(self, csv_file: str, parameters: tuple, play_type):
+        digest = hashlib.sha256(json.dumps([os.path.abspath(csv_file), list(parameters),
+                                            play_type.value]).encode('utf-8'))
+        return os.path.join(self._cache_dir, "%s.run" % digest.hexdigest())
+
+    def get_previous_run(self, csv_file: str, parameters: tuple, play_type):
+        """
+        Returns the content hash the CSV file had when last run with given parameters, None if unknown.
+        """
+        try:
+            with open(self._get_run_file_name(csv_file, parameters, play_type), 'r') as fd:
+                return json.load(fd)['content_hash']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set_previous_run(self, csv_file: str, parameters: tuple, play_type, content_hash: str):
+        os.makedirs(self._cache_dir, exist_ok=True)
+        file_name = self._get_run_file_name(csv_file, parameters, play_type)
+        tmp_file_name = "%s.%d.tmp" % (file_name, os.getpid())
+        with open(tmp_file_name, 'w') as fd:
+            json.dump({'content_hash': content_hash}, fd)
+        os.replace(tmp_file_name, file_name)
+
+    def load(self, content_hash: str, parameters: tuple, play_type, nb_matches=None):
+        """
+        Returns the points of the first 'nb_matches' league matches (all cached ones if None), None if not
+        cached.
+        """
+        file_name = self._get_file_name(content_hash, parameters, play_type)
+        if not os.path.exists(file_name):
+            return None
+
+        with open(file_name, 'rb') as fd:
+            try:
+                header = json.loads(fd.readline().decode('utf-8'))
+                if header.get('format') != ResultCache.FORMAT or header.get('version') != ResultCache.VERSION:
+                    raise ValueError("unknown format")
+                if nb_matches is None:
+                    nb_matches = header['matches']
+                if header['matches'] < nb_matches:
+                    return None
+                points = array.array('d')
+                points.fromfile(fd, 2 * nb_matches)
+            except (ValueError, EOFError, KeyError) as e:
+                logger.warning("Ignoring invalid result cache entry %s: %s" % (file_name, str(e)))
+                return None
+        if header['byteorder'] != sys.byteorder:
+            points.byteswap()
+
+        # Most recently used entries are the last ones evicted
+        os.utime(file_name)
+        return points
+
+    def save(self, content_hash: str, parameters: tuple, play_type, points):
+        header = {'format': ResultCache.FORMAT,
+                  'version': ResultCache.VERSION,
+                  'byteorder': sys.byteorder,
+                  'matches': len(points) // 2}
+
+        os.makedirs(self._cache_dir, exist_ok=True)
+        file_name = self._get_file_name(content_hash, parameters, play_type)
+        # Written under a temporary name then renamed, so that concurrent runs never read a partial entry
+        tmp_file_name = "%s.%d.tmp" % (file_name, os.getpid())
+        with open(tmp_file_name, 'wb') as fd:
+            fd.write(json.dumps(header).encode('utf-8'))
+            fd.write(b"\n")
+            array.array('d', points).tofile(fd)
+        os.replace(tmp_file_name, file_name)
+
+        evict_least_recently_used(self._cache_dir, self._max_size, file_name)
@@ -1,10 +1,197 @@
+from ComputeTrace import *
+from MatchExplanations import *
 from League import *
+from utils.tracer import Tracer
 from utils.utils import LoggerHandler
+import array
+import bisect
+import itertools
 import logging
 
 logger = LoggerHandler.get_instance().get_logger("ScoreProcessor")
 
 
+class RankingState:
+    """
+    Matches played, cumulative points (initial points included) and rank of each playing entity of a play type
+    as of the last match computed, in arrays indexed by the entity's position in name order. ScoreProcessor.compute
+    updates them match after match, instead of querying every entity and building Standings for every match.
+
+    Ranks are those of Standings: entities are ranked by points per match average, those which haven't played yet
+    having one of 0. Averages are also kept sorted along with the position they belong to, so that a match only
+    goes over the entities whose rank it changes. A sentinel at the last position always has an average of 0, the
+    average of the entities ranked last, as Standings always ranks them after every better average.
+
+    Ranks are set in the entities' rankings as they change, for the entities which have played.
+    """
+    __slots__ = ['_entities', '_positions', '_match_played', '_points', '_ranks', '_sorted_averages',
+                 '_sorted_positions']
+
+    def __init__(self, league: League, play_type: PlayingEntity.PlayType, league_match_index: LeagueIndex):
+        """
+        State as of given league match index, whose points must have been computed. Entities' rankings are set as
+        of that index.
+        """
+        self._entities = list(league.iter_playing_entities(play_type))
+        self._positions = dict([(entity.id, position) for position, entity in enumerate(self._entities)])
+        self._match_played = array.array('q', [entity.get_nb_match_played(league_match_index)
+                                               for entity in self._entities] + [0])
+        self._points = array.array('d', [entity.get_cumulative_points_at(league_match_index)
+                                          for entity in self._entities] + [0.0])
+
+        positions = sorted(range(0, len(self._entities) + 1), key=self._get_average)
+        self._sorted_positions = array.array('q', positions)
+        self._sorted_averages = array.array('d', [self._get_average(position) for position in positions])
+        self._ranks = array.array('q', [0] * len(positions))
+        rank = 0
+        for i in range(len(positions) - 1, -1, -1):
+            if i == len(positions) - 1 or self._sorted_averages[i] != self._sorted_averages[i + 1]:
+                rank += 1
+            self._ranks[positions[i]] = rank
+            self._set_entity_rank(positions[i])
+
+    def get_position(self, entity_id: int):
+        return self._positions[entity_id]
+
+    def get_entity(self, position: int):
+        return self._entities[position]
+
+    def get_match_played(self, position: int):
+        return self._match_played[position]
+
+    def _get_average(self, position: int):
+        if self._match_played[position] == 0:
+            return 0.0
+        return self._points[position] / self._match_played[position]
+
+    def get_average_points_per_match(self, position: int):
+        """
+        Same as PlayingEntity.get_average_points_per_match.
+        """
+        return self._get_average(position)
+
+    def get_league_average_points_per_match(self):
+        """
+        Same as League.get_league_average_points_per_match, summed in the same order.
+        """
+        league_points = 0
+        league_match_played = 0
+        match_played = self._match_played
+        points = self._points
+        for position in range(0, len(self._entities)):
+            if match_played[position] != 0:
+                league_points += points[position]
+                league_match_played += match_played[position]
+        try:
+            return league_points/league_match_played
+        except ZeroDivisionError:
+            return 0
+
+    def get_rank(self, position: int):
+        return self._ranks[position]
+
+    def _set_entity_rank(self, position: int):
+        if self._match_played[position] != 0:
+            self._entities[position].set_rank_at_match_played(self._match_played[position], self._ranks[position])
+
+    def add_match(self, position_1: int, points_1: float, position_2: int, points_2: float):
+        """
+        Adds the points both playing entities earned in a match, updates the ranks and sets those which changed.
+        """
+        average_1 = self._get_average(position_1)
+        average_2 = self._get_average(position_2)
+        self._match_played[position_1] += 1
+        self._points[position_1] += points_1
+        self._match_played[position_2] += 1
+        self._points[position_2] += points_2
+
+        self._move(position_1, average_1, position_2)
+        self._move(position_2, average_2, position_1)
+        self._set_entity_rank(position_1)
+        self._set_entity_rank(position_2)
+
+    def add_to_timeline(self, rank_timeline, league_match_index: LeagueIndex):
+        """
+        Adds a column as of the last match added to given RankTimeline, whose rows must be the entities in
+        position order, see ScoreProcessor.set_rank_timeline.
+        """
+        positions = range(0, len(self._entities))
+        rank_timeline.add_column(int(league_match_index),
+                                 (self._points[position] for position in positions),
+                                 (self._get_average(position) for position in positions),
+                                 (self._ranks[position] if self._match_played[position] != 0 else 0
+                                  for position in positions))
+
+    def _move(self, position: int, previous: float, opponent: int):
+        """
+        Moves the entity at given position from its previous average to its current one, shifting the rank of the
+        entities in between. The opponent's rank is only set once it is moved as well.
+        """
+        averages = self._sorted_averages
+        positions = self._sorted_positions
+        current = self._get_average(position)
+
+        i = bisect.bisect_left(averages, previous)
+        while positions[i] != position:
+            i += 1
+        del averages[i]
+        del positions[i]
+        previous_removed = (i == len(averages) or averages[i] != previous) and (i == 0 or averages[i - 1] != previous)
+
+        i = bisect.bisect_left(averages, current)
+        current_added = i == len(averages) or averages[i] != current
+        averages.insert(i, current)
+        positions.insert(i, position)
+
+        # Ranks are one more than the number of better averages
+        if previous_removed and current_added:
+            start = bisect.bisect_left(averages, min(previous, current))
+            end = bisect.bisect_left(averages, max(previous, current))
+            shift = 1 if previous < current else -1
+        elif current_added:
+            start, end, shift = 0, i, 1
+        elif previous_removed:
+            start, end, shift = 0, bisect.bisect_left(averages, previous), -1
+        else:
+            start, end, shift = 0, 0, 0
+        ranks = self._ranks
+        for i in range(start, end):
+            shifted = positions[i]
+            if shifted != position:
+                ranks[shifted] += shift
+                if shifted != opponent:
+                    self._set_entity_rank(shifted)
+
+        i = bisect.bisect_right(averages, current)
+        ranks[position] = 1 if i == len(averages) else ranks[positions[i]] + 1
+
+
+class MatchComputeState:
+    """
+    Per match computation data, reused from one match to the next by ScoreProcessor.compute.
+    Values relating to each of the two playing entities of a match are lists of two values, in the
+    match's order.
+    """
+    __slots__ = ['play_type', 'prior_match_played', 'ranking_breaking_in', 'avg_divider', 'ranking_factor',
+                 'diff_ranking_factor', 'break_in_factor', 'level_factor', 'won', 'total_games', 'points',
+                 'earned']
+
+    def __init__(self, play_type: PlayingEntity.PlayType):
+        self.play_type = play_type
+        self.prior_match_played = [0, 0]
+        self.ranking_breaking_in = [False, False]
+        # League average points per match, None for matches computed without ranking factors
+        self.avg_divider = None
+        self.ranking_factor = [1, 1]
+        self.diff_ranking_factor = [1, 1]
+        self.break_in_factor = [1, 1]
+        self.level_factor = [1, 1]
+        self.won = [0, 0]
+        self.total_games = 0
+        self.points = [0, 0]
+        self.earned = [0, 0]
+
+
 class ScoreProcessor:
     def __init__(self,
                  league: League,
@@ -23,162 +210,180 @@ class ScoreProcessor:
         self._league_break_in_score_factor = league_break_in_score_factor
 
         self._player_filter = []
+        self._rank_timeline = None
+        self._compute_trace = None
+        self._match_explanations = None
+
+    def get_parameters(self):
+        """
+        Scoring parameters; computed points only depend on these and the league's content.
+        """
+        return (self._points_per_match,
+                self._ranking_factor_constant,
+                self._ranking_diff_factor_constant,
+                self._ranking_factor_break_in_period,
+                self._league_break_in_score_factor,
+                self._ignore_ranking_factors)
 
     def set_player_filter(self, player_filter: list):
         """
-        Restricts debugging information output to listed players (needs -v option)
+        Restricts debugging information output and the compute trace to listed players
         :param player_filter:
         :return:
         """
         self._player_filter = player_filter
 
-    def _set_ranking(self,
-                     play_type: PlayingEntity.PlayType,
-                     league_match_index: LeagueIndex):
+    def set_rank_timeline(self, rank_timeline):
         """
-        Ranking is based on points per match average
+        Records the points and ranks of every playing entity after each match in given RankTimeline.
         """
-        players_points = dict()
-        players_points[0] = []
-
-        for entity in self._league.iter_playing_entities(play_type):
-            player_matches_played = self._league.get_player_matches_played(league_match_index,
-                                                                           entity.get_name())
-            # If player has not played any matches, don't set rank
-            if player_matches_played == 0:
-                players_points[0].append(entity)
-                continue
-
-            # get total number of points up to match index
-            points_per_match = entity.get_cumulative_points(PlayerIndex(player_matches_played))/player_matches_played
-            if points_per_match not in players_points:
-                players_points[points_per_match] = []
-
-            players_points[points_per_match].append(entity)
+        self._rank_timeline = rank_timeline
 
-        rank = 1
-        for score in sorted(players_points.keys(), reverse=True):
-            # Set the player ranking for current match index
-            for entity in players_points[score]:
-                # player_match_index = self._league.get_player_matches_played(league_match_index,
-                #                                                             entity.get_name())
-                try:
-                    entity.set_rank(league_match_index, rank)
-                except NoMatchPlayedYetError:
-                    pass
-
-            rank += 1
-
-    def _print_debug(self, player1, player2, league_match_index, compute_data):
+    def set_compute_trace(self, compute_trace: ComputeTrace):
+        """
+        Records each computed match in given ComputeTrace, honouring the player filter.
+        """
+        self._compute_trace = compute_trace
 
-        if not logger.isEnabledFor(logging.DEBUG):
+    def set_match_explanations(self, match_explanations: MatchExplanations):
+        """
+        Records each computed match's factors and points in given MatchExplanations.
+        """
+        self._match_explanations = match_explanations
+
+    def _record_ranks(self, ranking_state: RankingState, league_match_index: LeagueIndex):
+        if self._rank_timeline is not None:
+            ranking_state.add_to_timeline(self._rank_timeline, league_match_index)
+
+    def _is_in_player_filter(self, player1, player2):
+        if self._player_filter == []:
+            return True
+
+        for entity in [player1, player2]:
+            if entity.get_name() in self._player_filter:
+                return True
+            # Doubles teams are in the filter if one of their players is
+            if isinstance(entity, DoublesTeam):
+                for name in self._player_filter:
+                    if entity.is_in_team(name):
+                        return True
+        return False
+
+    def _get_compute_record(self, player1, player2, league_match_index, state):
+        """
+        Match record for the compute trace and debugging output, see ComputeTrace. Data is taken from
+        the compute state, only the points before the match and rankings are queried.
+        """
+        match_played = [state.prior_match_played[0] + 1, state.prior_match_played[1] + 1]
+        prior_match_index = LeagueIndex(int(league_match_index) - 1)
+        points_before = [player1.get_cumulative_points_at(prior_match_index),
+                         player2.get_cumulative_points_at(prior_match_index)]
+
+        return {
+            'play_type': state.play_type.value,
+            'league_match_index': int(league_match_index),
+            'league_break_in_score_factor': self._league_break_in_score_factor,
+            'avg_divider': state.avg_divider,
+            'players': [player1.get_name(), player2.get_name()],
+            'match_played': match_played,
+            'points_before': points_before,
+            'ranking': [player1.get_ranking(PlayerIndex(match_played[0])),
+                        player2.get_ranking(PlayerIndex(match_played[1]))],
+            'ranking_breaking_in': list(state.ranking_breaking_in),
+            'won': list(state.won),
+            'ranking_factor': list(state.ranking_factor),
+            'diff_ranking_factor': list(state.diff_ranking_factor),
+            'break_in_factor': list(state.break_in_factor),
+            'level_factor': list(state.level_factor),
+            'base_points': list(state.points),
+            'earned': list(state.earned),
+            'points_after': [points_before[0] + state.earned[0],
+                             points_before[1] + state.earned[1]],
+        }
+
+    def _trace(self, player1, player2, league_match_index, state):
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if not debug and self._compute_trace is None:
             return
 
-        if self._player_filter != [] and \
-           player1.get_name() not in self._player_filter and \
-           player2.get_name() not in self._player_filter:
+        if not self._is_in_player_filter(player1, player2):
             return
 
-        # Can't rely on compute_data information here as it doesn't contain player match index as of
-        # the league match index.
-        p1_match_played = player1.get_nb_match_played(league_match_index)
-        p2_match_played = player2.get_nb_match_played(league_match_index)
-        p1_ranking_break_in = compute_data['ranking_factors']['league_break_in_score_factor'][1] != 1.0
-        p2_ranking_break_in = compute_data['ranking_factors']['league_break_in_score_factor'][2] != 1.0
-
-        logger.debug("######################################################")
-        logger.debug("Stats for match")
-        logger.debug("-----------------------------------")
-        logger.debug("League match index: %d" % league_match_index)
-        logger.debug("Ranking break in period score factor: %2.3f" % self._league_break_in_score_factor)
-        logger.debug("-------------------")
-        logger.debug("%-20s %16s %16s" % ("Players", player1.get_name(), player2.get_name()))
-        logger.debug("%-20s %16d %16d" % ("Match Played", p1_match_played, p2_match_played))
-        logger.debug("%-20s %16.3f %16.3f" % ("Points before", player1.get_cumulative_points(PlayerIndex(p1_match_played-1)),
-                                              player2.get_cumulative_points(PlayerIndex(p2_match_played-1))))
-        logger.debug("%-20s %16d %16d" % ("Current Ranking", player1.get_ranking(PlayerIndex(p1_match_played)),
-                                          player2.get_ranking(PlayerIndex(p2_match_played))))
-        logger.debug("%-20s %16s %16s" % ("Ranking Break in", p1_ranking_break_in, p2_ranking_break_in))
-        logger.debug("-------------------")
-        logger.debug("Status for current match index")
-        logger.debug("%-20s %16d %16d" % ("Games Won", compute_data['won'][1], compute_data['won'][2]))
-        logger.debug("%-20s %16.3f %16.3f" % ("Ranking Factor", compute_data['ranking_factors']['p1_ranking_factor'],
-                                              compute_data['ranking_factors']['p2_ranking_factor']))
-        logger.debug("%-20s %16.3f %16.3f" % ("Diff Ranking Factor",
-                                              compute_data['ranking_factors']['p1_diff_ranking_factor'],
-                                              compute_data['ranking_factors']['p2_diff_ranking_factor']))
-        logger.debug("%-20s %16.3f %16.3f" % ("Base Points", compute_data['points'][1], compute_data['points'][2]))
-        logger.debug("%-20s %16.3f %16.3f" % ("Points Earned", compute_data['earned'][1], compute_data['earned'][2]))
-        logger.debug("%-20s %16.3f %16.3f" % ("Current points",
-                                              player1.get_cumulative_points(PlayerIndex(p1_match_played)),
-                                              player2.get_cumulative_points(PlayerIndex(p2_match_played))))
+        record = self._get_compute_record(player1, player2, league_match_index, state)
 
-    def _set_ranking_factors(self, prior_match_index: LeagueIndex,
-                             player1: PlayingEntity,
-                             player2: PlayingEntity,
-                             compute_data: dict):
-        play_type = compute_data['play_type']
+        if self._compute_trace is not None:
+            self._compute_trace.record(record)
 
-        compute_data['ranking_factors']['league_break_in_score_factor'] = dict()
-        compute_data['ranking_factors']['league_break_in_score_factor'][1] = 1
-        compute_data['ranking_factors']['league_break_in_score_factor'][2] = 1
+        if debug:
+            for line in ComputeTrace.format_record(record):
+                logger.debug(line)
+
+    def _set_ranking_factors(self, prior_match_index: LeagueIndex,
+                             position_1: int,
+                             position_2: int,
+                             ranking_state: RankingState,
+                             state: MatchComputeState):
+        ranking_factor = state.ranking_factor
+        diff_ranking_factor = state.diff_ranking_factor
+        break_in_factor = state.break_in_factor
+
+        break_in_factor[0] = 1
+        break_in_factor[1] = 1
+        state.avg_divider = None
 
         # If "ignore ranking factor", ranking factors are not a considered in calculating points.
         if self._ignore_ranking_factors or prior_match_index == 0:
-            compute_data['ranking_factors']['p1_ranking_factor'] = 1
-            compute_data['ranking_factors']['p2_ranking_factor'] = 1
-            compute_data['ranking_factors']['p1_diff_ranking_factor'] = 1
-            compute_data['ranking_factors']['p2_diff_ranking_factor'] = 1
-            if compute_data['ranking_breaking_in'][1]:
-                compute_data['ranking_factors']['league_break_in_score_factor'][1] = self._league_break_in_score_factor
-            if compute_data['ranking_breaking_in'][2]:
-                compute_data['ranking_factors']['league_break_in_score_factor'][2] = self._league_break_in_score_factor
+            ranking_factor[0] = 1
+            ranking_factor[1] = 1
+            diff_ranking_factor[0] = 1
+            diff_ranking_factor[1] = 1
+            if state.ranking_breaking_in[0]:
+                break_in_factor[0] = self._league_break_in_score_factor
+            if state.ranking_breaking_in[1]:
+                break_in_factor[1] = self._league_break_in_score_factor
         else:
-            p1_average_ppm = player1.get_average_points_per_match(prior_match_index)
-            p2_average_ppm = player2.get_average_points_per_match(prior_match_index)
+            p1_average_ppm = ranking_state.get_average_points_per_match(position_1)
+            p2_average_ppm = ranking_state.get_average_points_per_match(position_2)
 
-            league_average_ppm = self._league.get_league_average_points_per_match(prior_match_index, play_type)
-            compute_data['ranking_factors']['avg_divider'] = league_average_ppm
+            league_average_ppm = ranking_state.get_league_average_points_per_match()
+            state.avg_divider = league_average_ppm
 
-            compute_data['ranking_factors']['p1_ranking_factor'] = \
-                p1_average_ppm / compute_data['ranking_factors']['avg_divider'] * self._ranking_factor_constant
+            # No point earned yet in the whole league, i.e. only 0-0 matches so far.
+            try:
+                ranking_factor[0] = p1_average_ppm / league_average_ppm * self._ranking_factor_constant
+            except ZeroDivisionError:
+                ranking_factor[0] = 1
 
-            compute_data['ranking_factors']['p2_ranking_factor'] = \
-                p2_average_ppm / compute_data['ranking_factors']['avg_divider'] * self._ranking_factor_constant
+            try:
+                ranking_factor[1] = p2_average_ppm / league_average_ppm * self._ranking_factor_constant
+            except ZeroDivisionError:
+                ranking_factor[1] = 1
 
             # The stronger you are compared to your opponent, the least point you earn per games won.
             try:
-                compute_data['ranking_factors']['p1_diff_ranking_factor'] = self._ranking_diff_factor_constant / \
-                    (p1_average_ppm / p2_average_ppm)
+                diff_ranking_factor[0] = self._ranking_diff_factor_constant / (p1_average_ppm / p2_average_ppm)
             except ZeroDivisionError:
-                compute_data['ranking_factors']['p1_diff_ranking_factor'] = 1
+                diff_ranking_factor[0] = 1
 
             try:
-                compute_data['ranking_factors']['p2_diff_ranking_factor'] = self._ranking_diff_factor_constant / \
-                    (p2_average_ppm / p1_average_ppm)
+                diff_ranking_factor[1] = self._ranking_diff_factor_constant / (p2_average_ppm / p1_average_ppm)
             except ZeroDivisionError:
-                compute_data['ranking_factors']['p2_diff_ranking_factor'] = 1
+                diff_ranking_factor[1] = 1
 
             # override depending on breaking in flag
-            if compute_data['ranking_breaking_in'][1]:
-                compute_data['ranking_factors']['p1_ranking_factor'] = 1
-                compute_data['ranking_factors']['p1_diff_ranking_factor'] = 1
-                compute_data['ranking_factors']['league_break_in_score_factor'][1] = self._league_break_in_score_factor
-            if compute_data['ranking_breaking_in'][2]:
-                compute_data['ranking_factors']['p2_ranking_factor'] = 1
-                compute_data['ranking_factors']['p2_diff_ranking_factor'] = 1
-                compute_data['ranking_factors']['league_break_in_score_factor'][2] = self._league_break_in_score_factor
-
-    def _set_points_data(self, compute_data, match, player1, player2):
-        match_index_1 = PlayerIndex(compute_data['prior_match_played'][1])
-        match_index_2 = PlayerIndex(compute_data['prior_match_played'][2])
-
-        compute_data['level_score_factor'] = dict()
-        compute_data['level_score_factor'][1] = player1.get_play_level_scoring_factor(match_index_1)
-        compute_data['level_score_factor'][2] = player2.get_play_level_scoring_factor(match_index_2)
-
-        p1_won_games = match.get_games_won(player1.get_name())
-        p2_won_games = match.get_games_won(player2.get_name())
+            if state.ranking_breaking_in[0]:
+                ranking_factor[0] = 1
+                diff_ranking_factor[0] = 1
+                break_in_factor[0] = self._league_break_in_score_factor
+            if state.ranking_breaking_in[1]:
+                ranking_factor[1] = 1
+                diff_ranking_factor[1] = 1
+                break_in_factor[1] = self._league_break_in_score_factor
+
+    def _set_points_data(self, state: MatchComputeState, p1_won_games: int, p2_won_games: int, player1, player2):
+        state.level_factor[0] = player1.get_play_level_scoring_factor(PlayerIndex(state.prior_match_played[0]))
+        state.level_factor[1] = player2.get_play_level_scoring_factor(PlayerIndex(state.prior_match_played[1]))
+
         total_games_played = p1_won_games + p2_won_games
 
         if total_games_played == 0:
@@ -188,41 +393,31 @@ class ScoreProcessor:
             p1_points = p1_won_games/total_games_played*self._points_per_match
             p2_points = p2_won_games/total_games_played*self._points_per_match
 
-        ranking_factor = compute_data['ranking_factors']['p1_ranking_factor']
-        diff_factor = compute_data['ranking_factors']['p1_diff_ranking_factor']
-        break_in_factor = compute_data['ranking_factors']['league_break_in_score_factor'][1]
-        lvl_factor = compute_data['level_score_factor'][1]
-
-        p1_earned_points = p1_points * ranking_factor * diff_factor * break_in_factor * lvl_factor
-
-        ranking_factor = compute_data['ranking_factors']['p2_ranking_factor']
-        diff_factor = compute_data['ranking_factors']['p2_diff_ranking_factor']
-        break_in_factor = compute_data['ranking_factors']['league_break_in_score_factor'][2]
-        lvl_factor = compute_data['level_score_factor'][2]
-
-        p2_earned_points = p2_points * ranking_factor * diff_factor * break_in_factor * lvl_factor
-
-        compute_data['won'] = dict()
-        compute_data['won'][1] = p1_won_games
-        compute_data['won'][2] = p2_won_games
-        compute_data['total_games'] = total_games_played
-        compute_data['points'] = dict()
-        compute_data['points'][1] = p1_points
-        compute_data['points'][2] = p1_points
-        compute_data['earned'] = dict()
-        compute_data['earned'][1] = p1_earned_points
-        compute_data['earned'][2] = p2_earned_points
-
-    def _set_individual_player_doubles_stats(self, compute_data: dict, teams: list, league_match_index: LeagueIndex):
+        state.won[0] = p1_won_games
+        state.won[1] = p2_won_games
+        state.total_games = total_games_played
+        state.points[0] = p1_points
+        state.points[1] = p2_points
+        for i in range(0, 2):
+            state.earned[i] = state.points[i] * state.ranking_factor[i] * state.diff_ranking_factor[i] * \
+                state.break_in_factor[i] * state.level_factor[i]
+
+    def _set_individual_player_doubles_stats(self, state: MatchComputeState, teams: list,
+                                             league_match_index: LeagueIndex):
         for team_index in range(0, 2):
-            team_earned_points = compute_data['earned'][team_index+1]
+            team_earned_points = state.earned[team_index]
             for player_index in range(1, 3):
                 player = teams[team_index].get_player(player_index)
-                player_doubles_played = self._league.get_player_matches_played(league_match_index,
-                                                                               player.get_name())
+                player_doubles_played = player.get_nb_match_played(league_match_index)
                 player.set_match_points(player_doubles_played, team_earned_points, PlayingEntity.PlayType.DOUBLES)
 
-    def compute(self, last_match_index: LeagueIndex, play_type: PlayingEntity.PlayType):
+    def compute(self, last_match_index: LeagueIndex, play_type: PlayingEntity.PlayType, prefix_points=None):
+        """
+        Computes points and rankings of each match up to given league match index (-1 for all). If set,
+        'prefix_points' are points of the first matches as returned by get_match_points, e.g. from a previous
+        run the league only differs from after those matches, which are then set instead of computed, see
+        set_match_points. Those matches aren't traced nor explained.
+        """
         # if no match played, just return
         if self._league.last_match_index(play_type) == -1:
             return
@@ -232,47 +427,217 @@ class ScoreProcessor:
 
         self._league.reset_points(play_type)
         self._league.reset_rankings(play_type)
+        self._reset_records(play_type)
 
-        prior_match_index = LeagueIndex(0)
-        current_match_index = LeagueIndex(1)
-
-        # Process points for each match
-        for match in self._league.iter_matches(play_type):
-            if current_match_index > last_match_index:
-                break
+        prior_match_index = LeagueIndex(0, locked=True)
+        ranking_state = RankingState(self._league, play_type, prior_match_index)
+        if prefix_points is not None:
+            prior_match_index = self._set_prefix_points(play_type, prefix_points, ranking_state)
 
-            compute_data = dict()
-            compute_data['ranking_factors'] = dict()
-            compute_data['play_type'] = play_type
+        self._compute_matches(ranking_state, prior_match_index, last_match_index, play_type)
 
-            playing_entity_1 = self._league.get_playing_entity(match.get_name(1))
-            playing_entity_2 = self._league.get_playing_entity(match.get_name(2))
+    def _reset_records(self, play_type: PlayingEntity.PlayType):
+        if self._rank_timeline is not None:
+            self._rank_timeline.reset(self._league.iter_playing_entities(play_type))
+        if self._match_explanations is not None:
+            self._match_explanations.reset(play_type, self._points_per_match)
 
-            compute_data['prior_match_played'] = dict()
-            for i in range(1, 3):
-                compute_data['prior_match_played'][i] = self._league.get_player_matches_played(prior_match_index.get_locked_copy(),
-                                                                                               match.get_name(i))
+    def _compute_matches(self, ranking_state: RankingState, prior_match_index: LeagueIndex,
+                         last_match_index: LeagueIndex, play_type: PlayingEntity.PlayType):
+        """
+        Computes the matches after given league match index up to the last one, ranking state being as of the
+        former. Matches are read from the league's match log columns, playing entities being looked up through
+        the ranking state, so that a match only allocates the results it stores.
+        """
+        state = MatchComputeState(play_type)
+        columns = self._league.get_match_log(play_type).get_columns()
+        matches = zip(columns['entity_1'], columns['entity_2'], columns['games_won_1'], columns['games_won_2'])
+        try:
+            for entity_id_1, entity_id_2, games_won_1, games_won_2 in \
+                    itertools.islice(matches, int(prior_match_index), int(last_match_index)):
+                # Locked, so that it can be kept by the stats it is set in and reused as the next prior index
+                current_match_index = LeagueIndex(int(prior_match_index) + 1, locked=True)
+
+                span = Tracer.sample("match", play_type=play_type.value, league_match_index=int(current_match_index))
+
+                position_1 = ranking_state.get_position(entity_id_1)
+                position_2 = ranking_state.get_position(entity_id_2)
+                playing_entity_1 = ranking_state.get_entity(position_1)
+                playing_entity_2 = ranking_state.get_entity(position_2)
+
+                state.prior_match_played[0] = ranking_state.get_match_played(position_1)
+                state.prior_match_played[1] = ranking_state.get_match_played(position_2)
+
+                # Are players in their breaking in mode?
+                state.ranking_breaking_in[0] = state.prior_match_played[0] < self._ranking_factor_break_in_period
+                state.ranking_breaking_in[1] = state.prior_match_played[1] < self._ranking_factor_break_in_period
+
+                if span is not None:
+                    span.step("ranking factors")
+                self._set_ranking_factors(prior_match_index, position_1, position_2, ranking_state, state)
+
+                if span is not None:
+                    span.step("points")
+                self._set_points_data(state, games_won_1, games_won_2, playing_entity_1, playing_entity_2)
+                if self._match_explanations is not None:
+                    self._match_explanations.add(current_match_index, playing_entity_1, playing_entity_2, state)
+
+                if span is not None:
+                    span.step("set_match_points")
+                playing_entity_1.set_match_points(current_match_index, state.earned[0])
+                playing_entity_2.set_match_points(current_match_index, state.earned[1])
+
+                if span is not None:
+                    span.step("ranking")
+                ranking_state.add_match(position_1, state.earned[0], position_2, state.earned[1])
+                self._record_ranks(ranking_state, current_match_index)
+
+                self._trace(playing_entity_1, playing_entity_2, current_match_index, state)
+
+                if span is not None:
+                    span.end()
+
+                prior_match_index = current_match_index
+        finally:
+            # Matches can't be added to the log while its columns are viewed
+            for column in columns.values():
+                column.release()
+
+    def recompute_from(self, first_match_index: LeagueIndex, last_match_index: LeagueIndex,
+                       play_type: PlayingEntity.PlayType):
+        """
+        Computes points and rankings of the matches from given league match index up to the last one (-1 for
+        all) again, those computed before for the matches before it being kept. The matches kept aren't
+        explained nor traced (see compute).
+        """
+        if last_match_index == -1:
+            last_match_index = self._league.last_match_index(play_type)
+        if first_match_index > last_match_index:
+            return
 
-            # Are players in their breaking in mode?
-            compute_data['ranking_breaking_in'] = dict()
-            compute_data['ranking_breaking_in'][1] = \
-                compute_data['prior_match_played'][1] < self._ranking_factor_break_in_period
-            compute_data['ranking_breaking_in'][2] = \
-                compute_data['prior_match_played'][2] < self._ranking_factor_break_in_period
+        prior_match_index = LeagueIndex(max(int(first_match_index), 1) - 1, locked=True)
+        self._reset_records(play_type)
+        if self._rank_timeline is None:
+            self._league.reset_results_from(LeagueIndex(int(prior_match_index) + 1), play_type)
+            ranking_state = RankingState(self._league, play_type, prior_match_index)
+        else:
+            # The rank timeline columns of the matches kept are added again as their points are set back
+            points = self.get_match_points(prior_match_index, play_type)
+            self._league.reset_results_from(LeagueIndex(1), play_type)
+            ranking_state = RankingState(self._league, play_type, LeagueIndex(0))
+            self._set_prefix_points(play_type, points, ranking_state)
 
-            self._set_ranking_factors(prior_match_index.get_locked_copy(),
-                                      playing_entity_1,
-                                      playing_entity_2,
-                                      compute_data)
+        self._compute_matches(ranking_state, prior_match_index, last_match_index, play_type)
 
-            self._set_points_data(compute_data, match, playing_entity_1, playing_entity_2)
+    def apply_level_change(self, name: str, play_level_scoring_factor: float, league_match_index: LeagueIndex,
+                           play_type: PlayingEntity.PlayType, last_match_index=LeagueIndex(-1)):
+        """
+        Sets a playing entity's level from given league match index on (see League.update_play_level),
+        replacing the one set at that index if any, and only computes the matches it may change again. Points
+        must have been computed before, up to 'last_match_index'. Returns the first league match index
+        computed again.
+        """
+        self._league.update_play_level(name, play_level_scoring_factor, league_match_index, overwrite=True)
+        first_match_index = self._league.get_first_match_affected_by_level(name, league_match_index, play_type)
+        self.recompute_from(first_match_index, last_match_index, play_type)
+        return first_match_index
 
-            playing_entity_1.set_match_points(current_match_index.get_locked_copy(), compute_data['earned'][1])
-            playing_entity_2.set_match_points(current_match_index.get_locked_copy(), compute_data['earned'][2])
+    def _get_first_match_affected_by_levels(self, entity_ids: set, first_match_index: LeagueIndex,
+                                            play_type: PlayingEntity.PlayType):
+        """
+        Lowest of given league match index and the first ones whose points the levels set for given playing
+        entities may change, see League.get_first_match_affected_by_level. Both are needed before and after
+        the entities' matches change: a level set at a match an entity no longer plays replaces the latest one
+        set before it, see Stats._set_levels_again.
+        """
+        for entity_id in entity_ids:
+            entity = self._league.get_playing_entity_by_id(entity_id)
+            for level_index in entity.get_level_change_indexes():
+                first_match_index = min(first_match_index, self._league.get_first_match_affected_by_level(
+                    entity.get_name(), level_index, play_type))
+        return first_match_index
+
+    def replace_match(self, league_match_index: LeagueIndex, match: BaseMatch):
+        """
+        Replaces the match at given league match index (see League.replace_match) and computes the matches
+        from it on again, or from the first one a level of its playing entities now applies to differently,
+        the points and rankings of the matches before being kept. All matches' points must have been computed
+        before.
+        """
+        play_type = self._league.get_playing_entity_by_id(match.get_entity_id(1)).play_type
+        entity_ids = {match.get_entity_id(1), match.get_entity_id(2)}
+        if 0 < league_match_index <= self._league.last_match_index(play_type):
+            # League.replace_match raises otherwise
+            entity_ids.update(self._league.get_match_log(play_type).get(int(league_match_index) - 1)[0])
+        first_match_index = self._get_first_match_affected_by_levels(entity_ids, league_match_index, play_type)
+        # The entities whose matches change keep their points and rankings before it, see
+        # Stats.replace_match_results
+        self._league.replace_match(league_match_index, match)
+        first_match_index = self._get_first_match_affected_by_levels(entity_ids, first_match_index, play_type)
+        self.recompute_from(first_match_index, LeagueIndex(-1), play_type)
+
+    def insert_match(self, league_match_index: LeagueIndex, match: BaseMatch):
+        """
+        Adds a match at given league match index (see League.insert_match) and computes the matches from it
+        on again, or from the first one a level of its playing entities now applies to differently, the points
+        and rankings of the matches before being kept. All matches' points must have been computed before.
+        """
+        play_type = self._league.get_playing_entity_by_id(match.get_entity_id(1)).play_type
+        entity_ids = {match.get_entity_id(1), match.get_entity_id(2)}
+        first_match_index = self._get_first_match_affected_by_levels(entity_ids, league_match_index, play_type)
+        # The entities whose matches are shifted or added keep their points and rankings before it, see
+        # Stats.shift_league_indexes
+        self._league.insert_match(league_match_index, match)
+        first_match_index = self._get_first_match_affected_by_levels(entity_ids, first_match_index, play_type)
+        self.recompute_from(first_match_index, LeagueIndex(-1), play_type)
+
+    def get_match_points(self, last_match_index: LeagueIndex, play_type: PlayingEntity.PlayType):
+        """
+        Points earned by each match's two playing entities up to given league match index (-1 for all), as
+        set by compute, in league match index order.
+        """
+        if last_match_index == -1:
+            last_match_index = self._league.last_match_index(play_type)
 
-            self._set_ranking(play_type, current_match_index)
+        points = []
+        match_index = LeagueIndex(1)
+        for entity_ids, _ in self._league.get_match_log(play_type):
+            if match_index > last_match_index:
+                break
+            points.append(self._league.get_playing_entity_by_id(entity_ids[0]).get_match_points(match_index))
+            points.append(self._league.get_playing_entity_by_id(entity_ids[1]).get_match_points(match_index))
+            match_index += 1
+        return points
 
-            self._print_debug(playing_entity_1, playing_entity_2, current_match_index.get_locked_copy(), compute_data)
+    def set_match_points(self, points, play_type: PlayingEntity.PlayType):
+        """
+        Sets points returned by get_match_points instead of computing them, e.g. from a ResultCache. Rankings
+        are set from them as a compute does.
+        """
+        self._league.reset_points(play_type)
+        self._league.reset_rankings(play_type)
+        self._reset_records(play_type)
+        self._set_prefix_points(play_type, points, RankingState(self._league, play_type, LeagueIndex(0)))
 
-            prior_match_index += 1
-            current_match_index += 1
+    def _set_prefix_points(self, play_type: PlayingEntity.PlayType, points, ranking_state: RankingState):
+        """
+        Sets points of the first matches, as many as there are points for, adding them to the ranking state
+        as of no match played, and returns the league match index of the last one.
+        """
+        prior_match_index = LeagueIndex(0, locked=True)
+        if len(points) == 0:
+            return prior_match_index
+        for entity_ids, _ in self._league.get_match_log(play_type):
+            current_match_index = LeagueIndex(int(prior_match_index) + 1, locked=True)
+            position_1 = ranking_state.get_position(entity_ids[0])
+            position_2 = ranking_state.get_position(entity_ids[1])
+            points_1 = points[2 * int(prior_match_index)]
+            points_2 = points[2 * int(prior_match_index) + 1]
+            ranking_state.get_entity(position_1).set_match_points(current_match_index, points_1)
+            ranking_state.get_entity(position_2).set_match_points(current_match_index, points_2)
+            ranking_state.add_match(position_1, points_1, position_2, points_2)
+            self._record_ranks(ranking_state, current_match_index)
+            prior_match_index = current_match_index
+            if 2 * int(prior_match_index) >= len(points):
+                break
+        return prior_match_index
@@ -0,0 +1,98 @@
+from interfaces import *
+
+
+class StandingsEntry:
+    """
+    State of a playing entity as of a league index.
+    Points include the entity's initial points.
+    """
+    def __init__(self,
+                 entity: PlayingEntity,
+                 match_played: int,
+                 points: float,
+                 games_won: int,
+                 games_lost: int):
+        self.entity = entity
+        self.match_played = match_played
+        self.points = points
+        self.games_won = games_won
+        self.games_lost = games_lost
+        self.rank = 0
+
+    @property
+    def points_per_match(self):
+        if self.match_played == 0:
+            return 0.0
+        return self.points / self.match_played
+
+    def __str__(self):
+        return "%d %s" % (self.rank, self.entity.get_name())
+
+
+class Standings:
+    """
+    Standings of every playing entity of a given play type as of a league index ('-1' meaning latest).
+
+    The season must have been computed (see ScoreProcessor.compute) up to the index for points to be
+    meaningful, but it doesn't need to stop at that index: each entity's state is found with a binary
+    search over its per match cumulative data, so any league index can be queried in O(log n) per entity.
+
+    Ranking is based on points per match average. Entities with the same average share the same rank.
+    Entities which haven't played yet are ranked last, along with those which have 0 points per match.
+    """
+    def __init__(self, league, play_type: PlayingEntity.PlayType, index: LeagueIndex):
+        self._play_type = play_type
+        self._index = index
+        self._entries = []
+        self._name_to_entry = dict()
+
+        entries_by_score = dict()
+        entries_by_score[0] = []
+
+        for entity in league.iter_playing_entities(play_type):
+            entry = StandingsEntry(entity,
+                                   match_played=entity.get_nb_match_played(index),
+                                   points=entity.get_cumulative_points_at(index),
+                                   games_won=entity.get_cumulative_games_won_at(index),
+                                   games_lost=entity.get_cumulative_games_lost_at(index))
+            self._name_to_entry[entity.get_name()] = entry
+
+            if entry.match_played == 0:
+                entries_by_score[0].append(entry)
+                continue
+
+            points_per_match = entry.points / entry.match_played
+            if points_per_match not in entries_by_score:
+                entries_by_score[points_per_match] = []
+
+            entries_by_score[points_per_match].append(entry)
+
+        rank = 1
+        for score in sorted(entries_by_score.keys(), reverse=True):
+            for entry in entries_by_score[score]:
+                entry.rank = rank
+                self._entries.append(entry)
+            rank += 1
+
+    @property
+    def play_type(self):
+        return self._play_type
+
+    @property
+    def index(self):
+        return self._index
+
+    def get_entry(self, name: str):
+        if name.lower() not in self._name_to_entry:
+            raise PlayingEntityDoesNotExistError("Playing entity %s does not exist!" % name)
+        return self._name_to_entry[name.lower()]
+
+    def __iter__(self):
+        """
+        Cycles over the entries from best to worst rank, then by name.
+        """
+        for entry in self._entries:
+            yield entry
+
+    def __len__(self):
+        return len(self._entries)
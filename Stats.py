@@ -1,4 +1,8 @@
+import array
+import bisect
+
 from utils.SmartIndex import *
+from utils.counters import Counters
 from utils.utils import LoggerHandler
 
 logger = LoggerHandler.get_instance().get_logger("Stats")
@@ -37,6 +41,14 @@ class StatsData(dict):
         else:
             self.clear()
 
+    def truncate(self, player_index: int):
+        # clear all data set after given player index, data being set in player index order
+        while len(self) != 0:
+            index = next(reversed(self.keys()))
+            if int(index) <= player_index:
+                break
+            del self[index]
+
     def __getitem__(self, key: PlayerIndex):
         if not key.exists:
             if not self._extendable:  # and key.index_type == IndexType.PLAYER:
@@ -46,6 +58,7 @@ class StatsData(dict):
             return dict.__getitem__(self, key)
         except KeyError:
             # get latest index less than or equal to key
+            Counters.increment(Counters.EXTENDABLE_SCAN)
             latest = PlayerIndex(0)
             for index in sorted(self.keys()):
                 if latest < index <= key:
@@ -56,6 +69,7 @@ class StatsData(dict):
     def __setitem__(self, key: PlayerIndex, value):
         if not key.exists:
             # get latest index less than or equal to key
+            Counters.increment(Counters.EXTENDABLE_SCAN)
             latest = PlayerIndex(0)
             for index in sorted(self.keys()):
                 if latest < index <= key:
@@ -68,6 +82,112 @@ class StatsData(dict):
         return "%s: extendable: %s" % (self._tag, self._extendable)
 
 
+class RankHistory:
+    """
+    Extendable 'int' stats data meant for rankings, which are set for every entity after every league
+    match but seldom change from one match to the other.
+
+    Instead of one entry per player index, it only stores change events: the player index at which
+    the value changed and the new value. Lookups are binary searches over the change events.
+
+    As for an extendable StatsData, requesting the value for an index for which no value is set
+    returns the value of the latest index set before it. Values are expected to be set in player
+    index order: setting a value at a player index sets it for all the player indexes before it
+    which weren't set yet.
+    """
+    def __init__(self, tag: str):
+        self._tag = tag
+        self._data_type = int
+
+        # Change events, player index 0 always has one
+        self._event_indexes = array.array('q', [0])
+        self._event_values = array.array('q', [0])
+
+        # Latest player index set
+        self._last_index = 0
+
+    @property
+    def tag(self):
+        return self._tag
+
+    @property
+    def data_type(self):
+        return self._data_type
+
+    def reset(self):
+        # clear all data except at player index 0
+        initial = self._event_values[0]
+        self._event_indexes = array.array('q', [0])
+        self._event_values = array.array('q', [initial])
+        self._last_index = 0
+
+    def truncate(self, index: int):
+        """
+        Clears the values set after given player index, e.g. for the following ones to be set again.
+        """
+        position = bisect.bisect_right(self._event_indexes, index)
+        del self._event_indexes[position:]
+        del self._event_values[position:]
+        self._last_index = min(self._last_index, index)
+
+    def _get_value(self, index: int):
+        return self._event_values[bisect.bisect_right(self._event_indexes, index) - 1]
+
+    def set_value(self, index: int, value: int):
+        """
+        Sets the value at given player index, see __setitem__.
+        """
+        position = bisect.bisect_right(self._event_indexes, index) - 1
+        previous_value = self._event_values[position]
+
+        if index > self._last_index:
+            self._last_index = index
+        elif previous_value == value:
+            return
+        elif index < self._last_index and \
+                (position + 1 == len(self._event_indexes) or self._event_indexes[position + 1] != index + 1):
+            # Only this index changes, the following one keeps the value it had
+            self._event_indexes.insert(position + 1, index + 1)
+            self._event_values.insert(position + 1, previous_value)
+
+        if self._event_indexes[position] == index:
+            self._event_values[position] = value
+        else:
+            position += 1
+            self._event_indexes.insert(position, index)
+            self._event_values.insert(position, value)
+
+        # Drop events which don't change the value anymore
+        if position + 1 < len(self._event_indexes) and self._event_values[position + 1] == value:
+            del self._event_indexes[position + 1]
+            del self._event_values[position + 1]
+        if position > 0 and self._event_values[position - 1] == value:
+            del self._event_indexes[position]
+            del self._event_values[position]
+
+    def __contains__(self, key: PlayerIndex):
+        return key.exists and key.index_type == IndexType.PLAYER and int(key) <= self._last_index
+
+    def __getitem__(self, key: PlayerIndex):
+        # When the key doesn't exist, it's a LeagueIndex; take the latest player index set before it.
+        return self._get_value(min(int(key), self._last_index))
+
+    def __setitem__(self, key: PlayerIndex, value):
+        if key.exists:
+            self.set_value(int(key), value)
+        else:
+            self.set_value(min(int(key), self._last_index), value)
+
+    def __len__(self):
+        return self._last_index + 1
+
+    def get_number_of_events(self):
+        return len(self._event_indexes)
+
+    def __str__(self):
+        return "%s: %d change events for %d player indexes" % (self._tag, len(self._event_indexes), len(self))
+
+
 class Stats:
     """
     Stats are set based on the league match index, not to be confused with the player's
@@ -88,7 +208,7 @@ class Stats:
         games_won = StatsData('games_won', int, extendable=False)
         games_lost = StatsData('games_lost', int, extendable=False)
         points = StatsData('match_points', float, extendable=False)
-        rank = StatsData('ranking', int, extendable=True)
+        rank = RankHistory('ranking')
         level_scoring_factor = StatsData('level_scoring_factor', float, extendable=True)
 
         self._stats_data[games_won.tag] = games_won
@@ -107,6 +227,20 @@ class Stats:
 
         self._index_cache = SmartIndexCache()
 
+        # League index of each match played, in player index order (position 0 is player index 1).
+        # Along with the cumulative sums below (position 0 is player index 0), it allows to find the
+        # state as of any league index with a binary search, see get_number_of_match_played_at.
+        self._league_indexes = []
+        self._cumulative_data = dict()
+        self._cumulative_data[games_won.tag] = [0]
+        self._cumulative_data[games_lost.tag] = [0]
+        self._cumulative_data[points.tag] = [initial_points]
+
+        # League index and value of the levels set after the initial one, in the order they were set. They
+        # are set again when matches played are changed, see _set_levels_again.
+        self._initial_level = initial_level
+        self._level_changes = []
+
     def _get_index_cache(self):
         """
         Necessary for player_index_selector decorator
@@ -117,6 +251,43 @@ class Stats:
         if tag != 'match_points' and tag != 'ranking':
             raise Exception("You can't reset data other than for 'match_points' and 'ranking'")
         self._stats_data[tag].reset()
+        if tag in self._cumulative_data:
+            self._rebuild_cumulative_data(tag)
+
+    @Accepts.accepts(object, LeagueIndex, league_index=LeagueIndex)
+    def reset_results_from(self, league_index: LeagueIndex):
+        """
+        Resets points and rankings of the matches played from given league index on, those of the matches
+        played before being kept. The ranking as of the last match kept is kept too, although matches from
+        the league index on may change it; it must be set again, see ScoreProcessor.recompute_from.
+        """
+        self._truncate_results(bisect.bisect_left(self._league_indexes, int(league_index)))
+
+    def _truncate_results(self, player_index: int):
+        self._stats_data['match_points'].truncate(player_index)
+        del self._cumulative_data['match_points'][player_index + 1:]
+        self._stats_data['ranking'].truncate(player_index)
+
+    def _rebuild_cumulative_data(self, tag: str):
+        self._cumulative_data[tag] = []
+        value = 0 if self._stats_data[tag].data_type == int else 0.0
+        for index in sorted(self._stats_data[tag].keys()):
+            # Player indexes without data don't add anything to the sum
+            while len(self._cumulative_data[tag]) < int(index):
+                self._cumulative_data[tag].append(value)
+            value += dict.__getitem__(self._stats_data[tag], index)
+            self._cumulative_data[tag].append(value)
+
+    def _append_cumulative_data(self, tag: str, player_index: PlayerIndex, data):
+        cumulative = self._cumulative_data[tag]
+        if not player_index.exists or int(player_index) < len(cumulative):
+            self._rebuild_cumulative_data(tag)
+            return
+
+        # Player indexes without data don't add anything to the sum
+        while len(cumulative) < int(player_index):
+            cumulative.append(cumulative[-1])
+        cumulative.append(cumulative[-1] + data)
 
     @Accepts.accepts(object, int, int, LeagueIndex, games_won=int, games_lost=int, league_match_index=LeagueIndex)
     def set_match_results(self,
@@ -140,13 +311,143 @@ class Stats:
 
         self._index_cache.add_index(l_index, p_index)
 
+        self._league_indexes.append(int(l_index))
+        self._append_cumulative_data('games_won', p_index, games_won)
+        self._append_cumulative_data('games_lost', p_index, games_lost)
+
         self._player_match_index += 1
 
+    def get_level_change_indexes(self):
+        """
+        League indexes the levels set after the initial one were set at, in the order they were set.
+        """
+        return [LeagueIndex(league_index) for league_index, _ in self._level_changes]
+
+    def get_match_results(self, first_position=0):
+        """
+        League index, games won and games lost of each match played, in player index order, from given
+        position on (0 for the first match played).
+        """
+        results = []
+        for player_index, league_index in enumerate(self._league_indexes[first_position:], first_position + 1):
+            results.append((league_index,
+                            dict.__getitem__(self._stats_data['games_won'], PlayerIndex(player_index)),
+                            dict.__getitem__(self._stats_data['games_lost'], PlayerIndex(player_index))))
+        return results
+
+    def _truncate_match_results(self, position: int):
+        """
+        Removes the matches played from given position on (0 for the first match played) and returns them,
+        see get_match_results. Points and rankings are reset from it on, as reset_results_from does, those of
+        the matches before being kept.
+        """
+        results = self.get_match_results(position)
+        league_index = self._league_indexes[position - 1] if position > 0 else 0
+        self._index_cache.remove_latest_indexes(LeagueIndex(league_index), PlayerIndex(position))
+        del self._league_indexes[position:]
+        for tag in ['games_won', 'games_lost']:
+            self._stats_data[tag].truncate(position)
+            del self._cumulative_data[tag][position + 1:]
+        self._truncate_results(position)
+        self._player_match_index = PlayerIndex(position + 1)
+        return results
+
+    def _set_match_results_again(self, results: list):
+        """
+        Sets the matches played after the ones kept by _truncate_match_results from (league index, games won,
+        games lost) tuples, in league index order.
+        """
+        for league_index, games_won, games_lost in results:
+            self.set_match_results(games_won, games_lost, LeagueIndex(league_index))
+
+    def _set_levels_again(self):
+        """
+        Sets the levels again as a league imported with the matches played would, see set_data: a level set
+        at a match no longer played replaces the latest one set before it.
+        """
+        level_changes = self._level_changes
+        self._level_changes = []
+        self._stats_data['level_scoring_factor'].clear()
+        self._stats_data['level_scoring_factor'][PlayerIndex(0)] = self._initial_level
+        for league_index, level in level_changes:
+            self.set_data('level_scoring_factor', level, LeagueIndex(league_index), overwrite=True)
+
+    def _get_match_position(self, league_match_index: LeagueIndex):
+        position = bisect.bisect_left(self._league_indexes, int(league_match_index))
+        if position == len(self._league_indexes) or self._league_indexes[position] != int(league_match_index):
+            raise SmartIndexError("No match played at league index %d" % int(league_match_index))
+        return position
+
+    @Accepts.accepts(object, int, int, LeagueIndex, games_won=int, games_lost=int, league_match_index=LeagueIndex)
+    def replace_match_results(self, games_won: int, games_lost: int, league_match_index: LeagueIndex):
+        """
+        Replaces the results of the match played at given league index. Points and rankings are reset from
+        it on, see _truncate_match_results.
+        """
+        results = self._truncate_match_results(self._get_match_position(league_match_index))
+        results[0] = (int(league_match_index), games_won, games_lost)
+        # Levels are set at the same player indexes
+        self._set_match_results_again(results)
+
+    @Accepts.accepts(object, int, int, LeagueIndex, games_won=int, games_lost=int, league_match_index=LeagueIndex)
+    def insert_match_results(self, games_won: int, games_lost: int, league_match_index: LeagueIndex):
+        """
+        Sets the results of a match played at given league index, which can be lower than the latest; the
+        league indexes of the matches played from it on must have been shifted first, see
+        shift_league_indexes. Levels are set again, see _set_levels_again. Points and rankings are reset from
+        it on, see _truncate_match_results.
+        """
+        if self._index_cache.exists(league_match_index):
+            raise OverwriteError("Trying to overwrite match results for %s" % str(league_match_index))
+
+        results = self._truncate_match_results(bisect.bisect_left(self._league_indexes, int(league_match_index)))
+        results.insert(0, (int(league_match_index), games_won, games_lost))
+        self._set_match_results_again(results)
+        self._set_levels_again()
+
+    @Accepts.accepts(object, LeagueIndex, league_match_index=LeagueIndex)
+    def remove_match_results(self, league_match_index: LeagueIndex):
+        """
+        Removes the results of the match played at given league index. Levels are set again, see
+        _set_levels_again. Points and rankings are reset from it on, see _truncate_match_results.
+        """
+        results = self._truncate_match_results(self._get_match_position(league_match_index))
+        self._set_match_results_again(results[1:])
+        self._set_levels_again()
+
+    @Accepts.accepts(object, LeagueIndex, int, first_league_index=LeagueIndex, shift=int)
+    def shift_league_indexes(self, first_league_index: LeagueIndex, shift: int):
+        """
+        Shifts the league indexes of the matches played from given one on, e.g. for a match to be inserted
+        before them, along with the league indexes levels were set at. Points and rankings are reset from the
+        first match shifted on if any is, see _truncate_match_results.
+        """
+        self._level_changes = [(league_index + shift if league_index >= int(first_league_index) else league_index,
+                                level) for league_index, level in self._level_changes]
+        if len(self._league_indexes) == 0 or self._league_indexes[-1] < int(first_league_index):
+            return
+        results = self._truncate_match_results(bisect.bisect_left(self._league_indexes, int(first_league_index)))
+        self._set_match_results_again([(league_index + shift, games_won, games_lost)
+                                       for league_index, games_won, games_lost in results])
+        self._set_levels_again()
+
+    def set_ranking(self, player_index: int, rank: int):
+        """
+        Sets the rank as of given number of matches played. Unlike set_data, there is no league index to
+        convert, see ScoreProcessor.compute which sets ranks as they change.
+        """
+        self._stats_data['ranking'].set_value(player_index, rank)
+
     def index_exists(self, index: SmartIndex):
         return self._index_cache.exists(index)
 
-    @Accepts.accepts(object, str, object, LeagueIndex, tag=str, data=object, league_index=LeagueIndex)
-    def set_data(self, tag: str, data, league_index: LeagueIndex):
+    @Accepts.accepts(object, str, object, LeagueIndex, bool, tag=str, data=object, league_index=LeagueIndex,
+                     overwrite=bool)
+    def set_data(self, tag: str, data, league_index: LeagueIndex, overwrite=False):
+        """
+        Sets data at given league index. Data already set can only be replaced if 'overwrite' is set, and
+        if it isn't cumulative.
+        """
         # data has to be internally set with player index:
         player_index = self._index_cache.get_index_for_type(league_index, IndexType.PLAYER)
 
@@ -154,12 +455,17 @@ class Stats:
             raise TypeError("%s stats data is expecting %s, you provided %s" %
                             (tag, self._stats_data[tag].data_type.__name__, type(data).__name__))
 
-        if player_index in self._stats_data[tag]:
+        if player_index in self._stats_data[tag] and (not overwrite or tag in self._cumulative_data):
             raise OverwriteError("Data already exist for %s at player index %d (league index: %d)" %
                                  (tag, int(player_index), int(league_index)))
 
         self._stats_data[tag][player_index.get_locked_copy()] = data
 
+        if tag in self._cumulative_data:
+            self._append_cumulative_data(tag, player_index, data)
+        elif tag == 'level_scoring_factor':
+            self._level_changes.append((int(league_index), data))
+
     ##########################################################
     # Getter functions
     # Note: player_index_selector decorated function must be called
@@ -172,10 +478,34 @@ class Stats:
     def get_initial_data(self, tag: str):
         return self._stats_data[tag][PlayerIndex(0)]
 
+    @Accepts.accepts(object, LeagueIndex, index=LeagueIndex)
+    def get_number_of_match_played_at(self, index: LeagueIndex):
+        """
+        Return the number of match played as of the league index provided, '-1' meaning latest.
+        Contrary to get_number_of_match_played_by_league_index_time, this is a binary search
+        and no match played yet is not an error.
+        """
+        if index == -1:
+            return len(self._league_indexes)
+        return bisect.bisect_right(self._league_indexes, int(index))
+
+    @Accepts.accepts(object, str, LeagueIndex, tag=str, index=LeagueIndex)
+    def get_cumulative_data_at(self, tag: str, index: LeagueIndex):
+        """
+        Return the cumulative sum of 'games_won', 'games_lost' or 'match_points' as of the league
+        index provided, '-1' meaning latest. Initial points are included in the 'match_points' sum.
+        """
+        cumulative = self._cumulative_data[tag]
+        player_index = self.get_number_of_match_played_at(index)
+        if player_index >= len(cumulative):
+            raise SmartIndexError("No %s set for the player's match %d (%s)" % (tag, player_index, str(index)))
+        return cumulative[player_index]
+
     @Accepts.accepts(object, dict, PlayerIndex, data=dict, last_player_index=PlayerIndex)
     def _get_sum(self,
                  data: StatsData,
                  last_player_index: PlayerIndex):
+        Counters.increment(Counters.CUMULATIVE_SUM)
         if data.data_type == int:
             value = 0
         else:
@@ -208,6 +538,7 @@ class Stats:
 
     @Accepts.accepts(object, SmartIndex, index=SmartIndex)
     def _fix_non_exists(self, index: SmartIndex):
+        Counters.increment(Counters.NON_EXISTS_FALLBACK)
         latest_valid_league_index = self._index_cache.get_latest_valid_index(index)
         return self._index_cache.get_index_for_type(latest_valid_league_index, IndexType.PLAYER)
 
@@ -10,37 +10,17 @@ class StatsPrinter:
         self._name_formatter = lambda name: name
 
     def _get_largest_score_width(self,
-                                 index: LeagueIndex,
-                                 rankings: dict):
+                                 standings: Standings):
         largest_score_width = 0
-        for r in sorted(rankings.keys()):
-            for entity in rankings[r]:
-                match_played = PlayerIndex(self._league.get_player_matches_played(index, entity.get_name()))
-                points = entity.get_cumulative_points(index=match_played)
-                l = len("{:.3f}".format(points))
-                if l > largest_score_width:
-                    largest_score_width = l
+        for entry in standings:
+            l = len("{:.3f}".format(entry.points))
+            if l > largest_score_width:
+                largest_score_width = l
         return largest_score_width
 
-    def _process_rankings(self,
-                          play_type: PlayingEntity.PlayType,
-                          index: LeagueIndex,
-                          rankings: dict):
-        for playing_entity in self._league.iter_playing_entities(play_type):
-            try:
-                r = playing_entity.get_ranking(index)
-            except NoMatchPlayedYetError:
-                r = 0
-
-            if r not in rankings:
-                rankings[r] = []
-
-            rankings[r].append(playing_entity)
-
     def _format_setup(self,
                       play_type: PlayingEntity.PlayType,
-                      index: LeagueIndex,
-                      rankings: dict):
+                      standings: Standings):
         header_name_index = 1
         header_points_index = 4
 
@@ -53,7 +33,7 @@ class StatsPrinter:
                    "Games Lost", "% games won"]
         headers_length = [len(i) for i in headers]
         headers_length[header_name_index] = longest_name_length
-        headers_length[header_points_index] = self._get_largest_score_width(index, rankings)
+        headers_length[header_points_index] = self._get_largest_score_width(standings)
         headers_length = [i+2 for i in headers_length]
 
         header_format_str = "{{:<{:d}s}} {{:<{:d}s}} {{:>{:d}s}} {{:>{:d}s}} {{:>{:d}s}}   {{:<{:d}s}} " + \
@@ -98,42 +78,38 @@ class StatsPrinter:
         """
         Print ranking for given match index.
         Prints latest ranking if not parameter is specified.
+        Any index of a fully computed season can be printed without recomputing, see Standings.
         """
-        rankings = dict()
-        self._process_rankings(play_type, index, rankings)
-        header, ranking_format = self._format_setup(play_type, index, rankings)
+        standings = self._league.get_standings(index, play_type)
+        header, ranking_format = self._format_setup(play_type, standings)
 
         print('-'*len(header))
         print(title)
         print('-'*len(header))
         print(header)
-        for rank in sorted(rankings.keys()):
-            for entity in sorted(rankings[rank]):
-                if not self._in_filter(entity):
-                    continue
-
-                match_played = PlayerIndex(self._league.get_player_matches_played(index, entity.get_name()))
-                if index != 0 and match_played == 0:
-                    continue
-                games_won = entity.get_cumulative_games_won(match_played)
-                games_lost = entity.get_cumulative_games_lost(match_played)
-                try:
-                    games_won_percent = float(games_won) / (games_won + games_lost) * 100
-                except ZeroDivisionError:
-                    games_won_percent = 0
-                points = entity.get_cumulative_points(match_played)
-
-                ppm = points/int(match_played)
-
-                print(ranking_format.format(rank=rank,
-                                            name=self._name_formatter(entity.get_name()),
-                                            play_level=entity.get_play_level_scoring_factor(match_played),
-                                            ppm=ppm,
-                                            points=points,
-                                            match_played=int(match_played),
-                                            games_won=games_won,
-                                            games_lost=games_lost,
-                                            games_won_percent=games_won_percent))
+        for entry in standings:
+            if not self._in_filter(entry.entity):
+                continue
+
+            if index != 0 and entry.match_played == 0:
+                continue
+            try:
+                games_won_percent = float(entry.games_won) / (entry.games_won + entry.games_lost) * 100
+            except ZeroDivisionError:
+                games_won_percent = 0
+
+            ppm = entry.points/entry.match_played
+
+            print(ranking_format.format(rank=entry.rank,
+                                        name=self._name_formatter(entry.entity.get_name()),
+                                        play_level=entry.entity.get_play_level_scoring_factor(
+                                            PlayerIndex(entry.match_played)),
+                                        ppm=ppm,
+                                        points=entry.points,
+                                        match_played=entry.match_played,
+                                        games_won=entry.games_won,
+                                        games_lost=entry.games_lost,
+                                        games_won_percent=games_won_percent))
 
         data = dict()
         ppm = self._league.get_league_average_points_per_match(index, play_type, data)
@@ -195,8 +171,7 @@ class CsvStatsPrinter(StatsPrinter):
 
     def _format_setup(self,
                       play_type: PlayingEntity.PlayType,
-                      index: LeagueIndex,
-                      rankings: dict):
+                      standings: Standings):
 
         if play_type == PlayingEntity.PlayType.SINGLES:
             headers = ["Rank", "Name", "Play Level", "Points/Match", "Points", "Matches Played", "Games Won",
@@ -0,0 +1,200 @@
+import array
+import hashlib
+import json
+import os
+import sys
+
+import importer.csv
+import importer.csv_format
+from utils.utils import LoggerHandler
+
+logger = LoggerHandler.get_instance().get_logger("cache")
+
+# Cache directory used when score.py's --cache-dir isn't set, caching is disabled if neither is
+CACHE_DIR_ENV = "TENNIS_SCORE_CACHE_DIR"
+
+
+def hash_files(file_names: list):
+    """
+    SHA-256 hex digest of the files' content, in given order.
+    """
+    digest = hashlib.sha256()
+    for file_name in file_names:
+        with open(file_name, 'rb') as fd:
+            for block in iter(lambda: fd.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def evict_least_recently_used(cache_dir: str, max_size: int, keep: str):
+    """
+    Removes the least recently used '.bin' entries of the cache directory, by modification time, until they
+    fit in given maximum size, 'keep' excepted. Entries are touched when loaded, see ParseCache.load_content.
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".bin"):
+            path = os.path.join(cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    size = sum([entry[1] for entry in entries])
+    for _, entry_size, path in sorted(entries):
+        if size <= max_size:
+            break
+        if path == keep:
+            continue
+        os.remove(path)
+        size -= entry_size
+        logger.debug("Evicted cache entry %s" % path)
+
+
+class ParseCache:
+    """
+    On disk cache of parsed CSV records (see importer.csv.parse_league), so that importing the same CSV
+    file again skips parsing. Entries are keyed by a hash of the CSV file's content and of the importer's
+    source, so that they are invalidated when either changes. Entries of a file's previous content are
+    kept, they serve importer.csv.get_first_affected_match_index once the file has changed, but the total
+    size of the entries is bounded: least recently used entries are evicted first, as ResultCache's are.
+
+    An entry is a JSON header line, holding the strings referred to by records, followed by two flat
+    arrays: integers (record type, line number, then int fields and string fields, strings being indexes
+    in the header's list) and doubles (float fields), in record order.
+    """
+    FORMAT = "parse-cache"
+    VERSION = 1
+
+    # 32 bits, games won, line numbers and league match indexes fit in
+    INT_TYPECODE = 'i'
+
+    DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+    def __init__(self, cache_dir: str, max_size=DEFAULT_MAX_SIZE):
+        self._cache_dir = cache_dir
+        self._max_size = max_size
+        # CSV file name -> hash of its content, so that a file is only hashed once
+        self._content_hashes = dict()
+        self._source_hash = None
+
+    @staticmethod
+    def get_cache_dir(cache_dir=None):
+        """
+        Returns given cache directory, or the one set in the environment, None if caching is disabled.
+        """
+        if cache_dir is not None:
+            return cache_dir
+        return os.environ.get(CACHE_DIR_ENV) or None
+
+    @property
+    def cache_dir(self):
+        return self._cache_dir
+
+    def get_content_hash(self, csv_file: str):
+        """
+        Hash of the CSV file's content, which entries are keyed by along with the importer's source.
+        """
+        if csv_file not in self._content_hashes:
+            self._content_hashes[csv_file] = hash_files([csv_file])
+        return self._content_hashes[csv_file]
+
+    def _get_file_name(self, content_hash: str):
+        if self._source_hash is None:
+            self._source_hash = hash_files([importer.csv.__file__, importer.csv_format.__file__, __file__])
+        digest = hashlib.sha256((self._source_hash + content_hash).encode('utf-8')).hexdigest()
+        return os.path.join(self._cache_dir, "%s.bin" % digest)
+
+    def load(self, csv_file: str):
+        """
+        Returns the CSV file's cached records, None if not cached.
+        """
+        return self.load_content(self.get_content_hash(csv_file))
+
+    def load_content(self, content_hash: str):
+        """
+        Returns the cached records of the CSV content with given hash (see get_content_hash), None if not
+        cached. Records of a file's previous content are still found this way once it has changed.
+        """
+        file_name = self._get_file_name(content_hash)
+        if not os.path.exists(file_name):
+            return None
+
+        with open(file_name, 'rb') as fd:
+            try:
+                header = json.loads(fd.readline().decode('utf-8'))
+                if header.get('format') != ParseCache.FORMAT or header.get('version') != ParseCache.VERSION:
+                    raise ValueError("unknown format")
+                ints = array.array(header['int_typecode'])
+                ints.fromfile(fd, header['ints'])
+                floats = array.array('d')
+                floats.fromfile(fd, header['floats'])
+            except (ValueError, EOFError, KeyError) as e:
+                logger.warning("Ignoring invalid parse cache entry %s: %s" % (file_name, str(e)))
+                return None
+            if header['byteorder'] != sys.byteorder:
+                ints.byteswap()
+                floats.byteswap()
+
+        # Most recently used entries are the last ones evicted
+        os.utime(file_name)
+
+        strings = header['strings']
+        records = []
+        int_position = 0
+        float_position = 0
+        while int_position < len(ints):
+            record_type = ints[int_position]
+            record = [record_type, ints[int_position + 1]]
+            int_position += 2
+            for field_type in importer.csv.RECORD_FIELDS[record_type]:
+                if field_type == 's':
+                    record.append(strings[ints[int_position]])
+                    int_position += 1
+                elif field_type == 'i':
+                    record.append(ints[int_position])
+                    int_position += 1
+                else:
+                    record.append(floats[float_position])
+                    float_position += 1
+            records.append(tuple(record))
+        logger.debug("Loaded %d parsed records from %s" % (len(records), file_name))
+        return records
+
+    def save(self, csv_file: str, records: list):
+        strings = []
+        string_ids = dict()
+        ints = array.array(ParseCache.INT_TYPECODE)
+        floats = array.array('d')
+        for record in records:
+            ints.append(record[0])
+            ints.append(record[1])
+            for field_type, value in zip(importer.csv.RECORD_FIELDS[record[0]], record[2:]):
+                if field_type == 's':
+                    if value not in string_ids:
+                        string_ids[value] = len(strings)
+                        strings.append(value)
+                    ints.append(string_ids[value])
+                elif field_type == 'i':
+                    ints.append(value)
+                else:
+                    floats.append(value)
+
+        header = {'format': ParseCache.FORMAT,
+                  'version': ParseCache.VERSION,
+                  'byteorder': sys.byteorder,
+                  'int_typecode': ParseCache.INT_TYPECODE,
+                  'strings': strings,
+                  'ints': len(ints),
+                  'floats': len(floats)}
+
+        os.makedirs(self._cache_dir, exist_ok=True)
+        file_name = self._get_file_name(self.get_content_hash(csv_file))
+        # Written under a temporary name then renamed, so that concurrent runs never read a partial entry
+        tmp_file_name = "%s.%d.tmp" % (file_name, os.getpid())
+        with open(tmp_file_name, 'wb') as fd:
+            fd.write(json.dumps(header).encode('utf-8'))
+            fd.write(b"\n")
+            ints.tofile(fd)
+            floats.tofile(fd)
+        os.replace(tmp_file_name, file_name)
+
+        evict_least_recently_used(self._cache_dir, self._max_size, file_name)
@@ -1,20 +1,14 @@
 from Match import *
 import League
 from Player import *
+from importer.csv_format import *
+from utils.profiler import Profiler
+from utils.tracer import Tracer
 
 logger = LoggerHandler.get_instance().get_logger("CSV")
 
-REPLACEMENT_PLAYER_PREFIX_TOKENS = ['*', 'RPL']
-
-# CSV FILE FORMAT REQUIREMENTS, run score.py --demo-csv for a sample.
-PLAYER_ENTRY_FORMAT = "NEW_PLAYER,{name:s},{level_scoring_factor:.3f},{initial_points:.3f}"
-SINGLES_GAME_ENTRY_FORMAT = "SINGLES_GAME,{player1:s},{games_won_1:d},{player2:s},{games_won_2:d}"
-DOUBLES_GAME_ENTRY_FORMAT = "DOUBLES_GAME,{player1:s},{player2:s},{games_won_a:d},{player3:s},{player4:s}," + \
-                            "{games_won_b:d}"
-SINGLES_NEW_LEVEL_ENTRY_FORMAT = "NEW_PLAYER_LEVEL,{name:s},{league_match_index:d},{new_level:.3f}"
-DOUBLES_TEAM_NEW_LEVEL_ENTRY_FORMAT = "NEW_TEAM_LEVEL,{name1:s},{name2:s},{league_match_index:d},{new_level:.3f}"
-# TODO: Add support for interweaving match results with player level adjustments so as to not have to specify
-# TODO: league match index. Don't forget to adjust regex in csv parsing.
+# Number of csv lines per 'import chunk' span when tracing, see utils.tracer
+TRACE_CHUNK_LINES = 10000
 
 
 def add_player(tennis_league: League, player: str, level=1.0, initial_points=0.0):
@@ -42,9 +36,33 @@ def cleanup_name(name):
     return new_name
 
 
+# Parsed CSV records are tuples: (record type, csv line number, fields...), field types being listed in
+# RECORD_FIELDS ('s' string, 'i' int, 'f' float). Records can be cached, see importer.cache.
+RECORD_NEW_PLAYER = 0
+RECORD_SINGLES_GAME = 1
+RECORD_DOUBLES_GAME = 2
+RECORD_NEW_PLAYER_LEVEL = 3
+RECORD_NEW_TEAM_LEVEL = 4
+RECORD_REPLACEMENT_SKIPPED = 5
+RECORD_LINE_SKIPPED = 6
+
+RECORD_FIELDS = {
+    RECORD_NEW_PLAYER: "sff",               # name, level scoring factor, initial points
+    RECORD_SINGLES_GAME: "sisi",            # player 1, games won, player 2, games won
+    RECORD_DOUBLES_GAME: "ssissi",          # player 1, player 2, games won, player 3, player 4, games won
+    RECORD_NEW_PLAYER_LEVEL: "sif",         # name, league match index, new level
+    RECORD_NEW_TEAM_LEVEL: "ssif",          # name 1, name 2, league match index, new level
+    RECORD_REPLACEMENT_SKIPPED: "s",        # line
+    RECORD_LINE_SKIPPED: "s",               # line
+}
+
+
 # TODO, use python's csv reader
-def init_league(csv_file, tennis_league):
+def parse_league(lines):
     """
+    Parses CSV lines into records, see RECORD_FIELDS. Lines are only matched against the expected formats,
+    records are checked against the league when applied, see apply_records.
+
     Required format for the CSV file:
     See top of file definitions.
     Player entries must be listed first, then singles or doubles matches.
@@ -56,172 +74,238 @@ def init_league(csv_file, tennis_league):
     new_singles_level_re = re.compile(r"^NEW_PLAYER_LEVEL,(\S+?),(\d+),(\d+|(?:\d+\.\d*))$")
     new_team_level_re = re.compile(r"^NEW_TEAM_LEVEL,(\S+?),(\S+?),(\d+),(\d+|(?:\d+\.\d*))$")
 
-    with open(csv_file, 'r') as fd:
-        doubles_team_generated = False
-        line_nb = 0
-        for line in fd:
-            line_nb += 1
-            line = line.strip()
-            line = re.sub(r'\s+', '', line)
-
-            if line.startswith("#"):
-                continue
-
-            try:
-                next_line = False
-                for token in REPLACEMENT_PLAYER_PREFIX_TOKENS:
-                    if token in line.lower():
-                        logger.info("Entry '%s' skipped as a replacement played" % line)
-                        next_line = True
-                        break
-                if next_line:
-                    continue
-
-                new_player = new_player_re.fullmatch(line)
-                singles_match = singles_entry_re.fullmatch(line)
-                doubles_match = doubles_entry_re.fullmatch(line)
-                updated_singles_player_level = new_singles_level_re.fullmatch(line)
-                updated_doubles_team_level = new_team_level_re.fullmatch(line)
-
-                if new_player:
-                    name = cleanup_name(new_player.group(1))
-                    level_scoring_factor = (float(new_player.group(2)))
-                    initial_points = float(new_player.group(3))
-                    add_player(tennis_league, name, level_scoring_factor, initial_points)
-                elif doubles_match:
-                    if not doubles_team_generated:
+    records = []
+    line_nb = 0
+    for line in lines:
+        line_nb += 1
+        line = line.strip()
+        line = re.sub(r'\s+', '', line)
+
+        if line.startswith("#"):
+            continue
+
+        next_line = False
+        for token in REPLACEMENT_PLAYER_PREFIX_TOKENS:
+            if token in line.lower():
+                records.append((RECORD_REPLACEMENT_SKIPPED, line_nb, line))
+                next_line = True
+                break
+        if next_line:
+            continue
+
+        new_player = new_player_re.fullmatch(line)
+        singles_match = singles_entry_re.fullmatch(line)
+        doubles_match = doubles_entry_re.fullmatch(line)
+        updated_singles_player_level = new_singles_level_re.fullmatch(line)
+        updated_doubles_team_level = new_team_level_re.fullmatch(line)
+
+        if new_player:
+            records.append((RECORD_NEW_PLAYER, line_nb,
+                            cleanup_name(new_player.group(1)),
+                            float(new_player.group(2)),
+                            float(new_player.group(3))))
+        elif doubles_match:
+            records.append((RECORD_DOUBLES_GAME, line_nb,
+                            cleanup_name(doubles_match.group(1)),
+                            cleanup_name(doubles_match.group(2)),
+                            int(doubles_match.group(3)),
+                            cleanup_name(doubles_match.group(4)),
+                            cleanup_name(doubles_match.group(5)),
+                            int(doubles_match.group(6))))
+        elif singles_match:
+            records.append((RECORD_SINGLES_GAME, line_nb,
+                            cleanup_name(singles_match.group(1)),
+                            int(singles_match.group(2)),
+                            cleanup_name(singles_match.group(3)),
+                            int(singles_match.group(4))))
+        elif updated_doubles_team_level:
+            records.append((RECORD_NEW_TEAM_LEVEL, line_nb,
+                            cleanup_name(updated_doubles_team_level.group(1)),
+                            cleanup_name(updated_doubles_team_level.group(2)),
+                            int(updated_doubles_team_level.group(3)),
+                            float(updated_doubles_team_level.group(4))))
+        elif updated_singles_player_level:
+            records.append((RECORD_NEW_PLAYER_LEVEL, line_nb,
+                            cleanup_name(updated_singles_player_level.group(1)),
+                            int(updated_singles_player_level.group(2)),
+                            float(updated_singles_player_level.group(3))))
+        elif line != "":
+            records.append((RECORD_LINE_SKIPPED, line_nb, line))
+
+    return records
+
+
+def apply_records(records, tennis_league):
+    """
+    Adds parsed records' players, matches and level changes to the league, in CSV order.
+    """
+    doubles_team_generated = False
+    chunk_span = Tracer.begin("import chunk", first_line=1)
+    chunk = 0
+    for record in records:
+        record_type = record[0]
+        line_nb = record[1]
+        if chunk_span is not None and line_nb // TRACE_CHUNK_LINES != chunk:
+            chunk = line_nb // TRACE_CHUNK_LINES
+            chunk_span.end()
+            chunk_span = Tracer.begin("import chunk", first_line=line_nb)
+
+        try:
+            if record_type == RECORD_REPLACEMENT_SKIPPED:
+                logger.info("Entry '%s' skipped as a replacement played" % record[2])
+            elif record_type == RECORD_NEW_PLAYER:
+                _, _, name, level_scoring_factor, initial_points = record
+                add_player(tennis_league, name, level_scoring_factor, initial_points)
+            elif record_type == RECORD_DOUBLES_GAME:
+                _, _, player1, player2, games_won_1, player3, player4, games_won_2 = record
+                if not doubles_team_generated:
+                    with Profiler.phase("doubles team generation"):
                         tennis_league.generate_doubles_team_combination()
-                        doubles_team_generated = True
-                    player1 = cleanup_name(doubles_match.group(1))
-                    player2 = cleanup_name(doubles_match.group(2))
-                    games_won_1 = int(doubles_match.group(3))
-                    player3 = cleanup_name(doubles_match.group(4))
-                    player4 = cleanup_name(doubles_match.group(5))
-                    games_won_2 = int(doubles_match.group(6))
-                    try:
-                        team1 = tennis_league.get_doubles_team(player1, player2)
-                        team2 = tennis_league.get_doubles_team(player3, player4)
-                    except PlayingEntityDoesNotExistError:
-                        team1 = add_doubles_team(tennis_league, player1, player2)
-                        team2 = add_doubles_team(tennis_league, player3, player4)
-
-                    tennis_league.add_match(Match(team1.get_name(), games_won_1, team2.get_name(), games_won_2))
-
-                elif singles_match:
-                    player1 = cleanup_name(singles_match.group(1))
-                    games_won_1 = int(singles_match.group(2))
-                    player2 = cleanup_name(singles_match.group(3))
-                    games_won_2 = int(singles_match.group(4))
-
-                    try:
-                        tennis_league.add_match(Match(player1, games_won_1, player2, games_won_2))
-                    except PlayingEntityDoesNotExistError:
-                        add_player(tennis_league, player1)
-                        add_player(tennis_league, player2)
-                        tennis_league.add_match(Match(player1, games_won_1, player2, games_won_2))
-                elif updated_doubles_team_level:
-                    entity = tennis_league.get_playing_entity(cleanup_name(updated_doubles_team_level.group(1)))
-                    entity2 = tennis_league.get_playing_entity(cleanup_name(updated_doubles_team_level.group(2)))
-                    team = tennis_league.get_doubles_team(entity.get_name(), entity2.get_name())
-                    team.update_play_level_scoring_factor(float(updated_doubles_team_level.group(4)),
-                                                          LeagueIndex(int(updated_doubles_team_level.group(3))))
-                elif updated_singles_player_level:
-                    entity = tennis_league.get_playing_entity(cleanup_name(updated_singles_player_level.group(1)))
-                    entity.update_play_level_scoring_factor(float(updated_singles_player_level.group(3)),
-                                                            LeagueIndex(int(updated_singles_player_level.group(2))))
-                elif line != "":
-                    logger.debug("Following line (csv line number:%d) skipped: %s" % (line_nb, line))
-            except Exception as e:
-                error_msg = "\n\tERROR: Line %d in csv. %s.\n\t" % (line_nb, str(e)) + \
-                            "ERROR: You may want to remove the line if you don't need it."
-                raise Exception(error_msg)
-
-
-def dump_sample(seed: int):
-    import random
-    import copy
-    max_match_index = 50
-
-    def generate_player(player):
-        data = dict()
-        data['name'] = player
-        data['level_scoring_factor'] = random.uniform(0.7, 0.9)
-        data['initial_points'] = random.random()*10 + 5.0
-        return data
-
-    def generate_singles_match(a_players_list: list):
-        match = dict()
-        players_list = copy.deepcopy(a_players_list)
-        match['player1'] = players_list[random.randint(0, len(players_list)-1)]
-        players_list.remove(match['player1'])
-        match['player2'] = players_list[random.randint(0, len(players_list)-1)]
-        match['games_won_1'] = random.randint(0, 8)
-        match['games_won_2'] = random.randint(0, 8)
-        return match
-
-    def generate_doubles_match(a_players_list: list):
-        match = dict()
-        players_list = copy.deepcopy(a_players_list)
-        match['player1'] = players_list[random.randint(0, len(players_list)-1)]
-        players_list.remove(match['player1'])
-        match['player2'] = players_list[random.randint(0, len(players_list)-1)]
-        players_list.remove(match['player2'])
-        match['player3'] = players_list[random.randint(0, len(players_list)-1)]
-        players_list.remove(match['player3'])
-        match['player4'] = players_list[random.randint(0, len(players_list)-1)]
-        match['games_won_a'] = random.randint(0, 8)
-        match['games_won_b'] = random.randint(0, 8)
-        return match
-
-    def generate_singles_level_change(a_players_list: list):
-        new_level = dict()
-        new_level['name'] = a_players_list[random.randint(0, len(a_players_list)-1)]
-        new_level['league_match_index'] = random.randint(1, 5)
-        new_level['new_level'] = random.uniform(0.4, 1.0)
-        return new_level
-
-    def generate_doubles_level_change(a_players_list: list):
-        new_level = dict()
-        players_list = copy.deepcopy(a_players_list)
-        new_level['name1'] = players_list[random.randint(0, len(players_list)-1)]
-        players_list.remove(new_level['name1'])
-        new_level['name2'] = players_list[random.randint(0, len(players_list)-1)]
-        new_level['league_match_index'] = random.randint(1, 3)
-        new_level['new_level'] = random.uniform(0.4, 1.0)
-        return new_level
-
-    random.seed(seed)
-
-    players = ["math", "andrew", "ben", "jessica", "anika", "carolina"]
-    players_sub_list = ["math", "andrew", "jessica", "carolina"]
-
-    # Players
-    print("# New Player, Name, Level Scoring Factor, Initial Points")
-    for p in sorted(players_sub_list):
-        print(PLAYER_ENTRY_FORMAT.format(**generate_player(p)))
-
-    # Singles Matches
-    print("# Singles Matches, Player 1, Games Won, Player 2, Games Won")
-    for i in range(0, max_match_index):
-        print(SINGLES_GAME_ENTRY_FORMAT.format(**generate_singles_match(players)))
-
-    # Doubles Matches
-    print("# Doubles Matches, Player 1, Player 2, Games Won, Player 3, Player 4, Games Won")
-    for i in range(0, max_match_index):
-        print(DOUBLES_GAME_ENTRY_FORMAT.format(**generate_doubles_match(players)))
-
-    # Singles Level Adjustment
-    print("# New Player Level, Name, League Match Index To Take Effect, New Level(Scoring Factor)")
-    for i in range(0, 4):
-        print(SINGLES_NEW_LEVEL_ENTRY_FORMAT.format(**generate_singles_level_change(players)))
-
-    # Doubles Team Level Adjustment
-    print("# New Team Level, Name, League Match Index To Take Effect, New Level(Scoring Factor)")
-    for i in range(0, 4):
-        print(DOUBLES_TEAM_NEW_LEVEL_ENTRY_FORMAT.format(**generate_doubles_level_change(players)))
-
-    # Generate some originally unlisted player doubles matches
-    print(DOUBLES_GAME_ENTRY_FORMAT.format(player1="math", player2="julie", games_won_a=4, player3="anika",
-                                           player4="rick", games_won_b=4))
-    print(DOUBLES_GAME_ENTRY_FORMAT.format(player1="RPL1", player2="julie", games_won_a=4, player3="anika",
-                                           player4="rick", games_won_b=4))
+                    doubles_team_generated = True
+                try:
+                    team1 = tennis_league.get_doubles_team(player1, player2)
+                    team2 = tennis_league.get_doubles_team(player3, player4)
+                except PlayingEntityDoesNotExistError:
+                    team1 = add_doubles_team(tennis_league, player1, player2)
+                    team2 = add_doubles_team(tennis_league, player3, player4)
+
+                tennis_league.add_match(Match(team1.get_name(), games_won_1, team2.get_name(), games_won_2))
+
+            elif record_type == RECORD_SINGLES_GAME:
+                _, _, player1, games_won_1, player2, games_won_2 = record
+                try:
+                    tennis_league.add_match(Match(player1, games_won_1, player2, games_won_2))
+                except PlayingEntityDoesNotExistError:
+                    add_player(tennis_league, player1)
+                    add_player(tennis_league, player2)
+                    tennis_league.add_match(Match(player1, games_won_1, player2, games_won_2))
+            elif record_type == RECORD_NEW_TEAM_LEVEL:
+                _, _, name1, name2, league_match_index, new_level = record
+                entity = tennis_league.get_playing_entity(name1)
+                entity2 = tennis_league.get_playing_entity(name2)
+                team = tennis_league.get_doubles_team(entity.get_name(), entity2.get_name())
+                team.update_play_level_scoring_factor(new_level, LeagueIndex(league_match_index))
+            elif record_type == RECORD_NEW_PLAYER_LEVEL:
+                _, _, name, league_match_index, new_level = record
+                entity = tennis_league.get_playing_entity(name)
+                entity.update_play_level_scoring_factor(new_level, LeagueIndex(league_match_index))
+            elif record_type == RECORD_LINE_SKIPPED:
+                logger.debug("Following line (csv line number:%d) skipped: %s" % (line_nb, record[2]))
+        except Exception as e:
+            error_msg = "\n\tERROR: Line %d in csv. %s.\n\t" % (line_nb, str(e)) + \
+                        "ERROR: You may want to remove the line if you don't need it."
+            raise Exception(error_msg)
+
+    if chunk_span is not None:
+        chunk_span.end()
+
+
+# Level record type -> (play type of the league match index it refers to, number of names)
+_LEVEL_RECORDS = {
+    RECORD_NEW_PLAYER_LEVEL: (PlayingEntity.PlayType.SINGLES, 1),
+    RECORD_NEW_TEAM_LEVEL: (PlayingEntity.PlayType.DOUBLES, 2),
+}
+
+
+def _get_comparable_records(records):
+    # Line numbers and skipped lines don't change the league
+    return [(record[0],) + tuple(record[2:]) for record in records
+            if record[0] not in [RECORD_REPLACEMENT_SKIPPED, RECORD_LINE_SKIPPED]]
+
+
+def _get_matches(records):
+    # Sides' player names of each match, in league match index order
+    matches = {PlayingEntity.PlayType.SINGLES: [], PlayingEntity.PlayType.DOUBLES: []}
+    for record in records:
+        if record[0] == RECORD_SINGLES_GAME:
+            matches[PlayingEntity.PlayType.SINGLES].append(({record[1].lower()}, {record[3].lower()}))
+        elif record[0] == RECORD_DOUBLES_GAME:
+            matches[PlayingEntity.PlayType.DOUBLES].append(({record[1].lower(), record[2].lower()},
+                                                            {record[4].lower(), record[5].lower()}))
+    return matches
+
+
+def _get_first_match_affected_by_level(matches: list, names: set, league_match_index: int, same_play_type=True):
+    # Same as League.get_first_match_affected_by_level: a level set at a match the entity played is looked up
+    # from its next match on (see ScoreProcessor._set_points_data), otherwise it replaces the entity's latest
+    # level set before the index, possibly its initial level (see Stats.StatsData). A player's level changes
+    # its doubles teams' from their first match.
+    if same_play_type and 0 < league_match_index <= len(matches) and \
+            any([names <= side for side in matches[league_match_index - 1]]):
+        return league_match_index + 1
+    for index, sides in enumerate(matches, 1):
+        if any([names <= side for side in sides]):
+            return index
+    return len(matches) + 1
+
+
+def get_first_affected_match_index(old_records: list, new_records: list, play_type: PlayingEntity.PlayType):
+    """
+    First league match index of given play type whose points may differ between leagues built from old and
+    new records, the matches before it and their points being the same in both. It is one more than the
+    number of matches of the play type in new records if none may differ.
+
+    Only the points computation depends on it: the league itself is still imported from all new records.
+    """
+    old = _get_comparable_records(old_records)
+    new = _get_comparable_records(new_records)
+    common = 0
+    while common < min(len(old), len(new)) and old[common] == new[common]:
+        common += 1
+
+    # Matches before the first difference are the same in both leagues
+    matches = _get_matches(new[:common])
+    first_affected = len(matches[play_type]) + 1
+    for record in old[common:] + new[common:]:
+        if record[0] == RECORD_NEW_PLAYER:
+            # Initial points and levels apply from the start, doubles teams are generated from players
+            return 1
+
+    # Level records after the first difference set the same levels in both leagues if an entity's are the
+    # same, in the same order, and refer to matches before it, e.g. when matches were added before them.
+    # Others are looked up in the league they belong to, all of an entity's if its records differ.
+    levels = dict()
+    for tail_index, tail in enumerate([old[common:], new[common:]]):
+        for record in tail:
+            if record[0] in _LEVEL_RECORDS:
+                level_play_type, nb_names = _LEVEL_RECORDS[record[0]]
+                key = (level_play_type, frozenset([name.lower() for name in record[1:1 + nb_names]]))
+                levels.setdefault(key, ([], []))[tail_index].append(record)
+    league_matches = None
+    for (level_play_type, names), (old_levels, new_levels) in levels.items():
+        if level_play_type != play_type and play_type == PlayingEntity.PlayType.SINGLES:
+            # Doubles team levels don't change singles matches
+            continue
+        if old_levels == new_levels:
+            # Levels set at matches before the first difference are set at the same ones in both leagues
+            nb_matches = len(matches[level_play_type])
+            old_levels = new_levels = [record for record in old_levels if record[1 + len(names)] > nb_matches]
+        if league_matches is None:
+            league_matches = [_get_matches(old)[play_type], _get_matches(new)[play_type]]
+        for tail_index, tail_levels in enumerate([old_levels, new_levels]):
+            for record in tail_levels:
+                first_affected = min(first_affected, _get_first_match_affected_by_level(
+                    league_matches[tail_index], names, record[1 + len(names)], level_play_type == play_type))
+    return first_affected
+
+
+def init_league(csv_file, tennis_league, cache=None):
+    """
+    Parses the CSV file and adds its content to the league. Parsed records are taken from, or stored in,
+    given ParseCache if set, see importer.cache. Returns the records.
+    """
+    records = None
+    if cache is not None:
+        with Profiler.phase("parse cache lookup"):
+            records = cache.load(csv_file)
+
+    if records is None:
+        with Profiler.phase("parse"):
+            with open(csv_file, 'r') as fd:
+                records = parse_league(fd)
+        if cache is not None:
+            cache.save(csv_file, records)
+
+    with Profiler.phase("apply"):
+        apply_records(records, tennis_league)
+    return records
@@ -0,0 +1,224 @@
+# CSV format and writers (sample and synthetic league dumps), kept apart from importer.csv so that dumping a
+# CSV file doesn't import the league model, see 'score.py demo_csv'.
+
+REPLACEMENT_PLAYER_PREFIX_TOKENS = ['*', 'RPL']
+
+# CSV FILE FORMAT REQUIREMENTS, run score.py --demo-csv for a sample.
+PLAYER_ENTRY_FORMAT = "NEW_PLAYER,{name:s},{level_scoring_factor:.3f},{initial_points:.3f}"
+SINGLES_GAME_ENTRY_FORMAT = "SINGLES_GAME,{player1:s},{games_won_1:d},{player2:s},{games_won_2:d}"
+DOUBLES_GAME_ENTRY_FORMAT = "DOUBLES_GAME,{player1:s},{player2:s},{games_won_a:d},{player3:s},{player4:s}," + \
+                            "{games_won_b:d}"
+SINGLES_NEW_LEVEL_ENTRY_FORMAT = "NEW_PLAYER_LEVEL,{name:s},{league_match_index:d},{new_level:.3f}"
+DOUBLES_TEAM_NEW_LEVEL_ENTRY_FORMAT = "NEW_TEAM_LEVEL,{name1:s},{name2:s},{league_match_index:d},{new_level:.3f}"
+# Game entries as formatted from tuples, in the fields order of the formats above, see dump_league
+SINGLES_GAME_LINE_FORMAT = "SINGLES_GAME,%s,%d,%s,%d"
+DOUBLES_GAME_LINE_FORMAT = "DOUBLES_GAME,%s,%s,%d,%s,%s,%d"
+# TODO: Add support for interweaving match results with player level adjustments so as to not have to specify
+# TODO: league match index. Don't forget to adjust regex in csv parsing.
+
+
+def dump_sample(seed: int):
+    import random
+    import copy
+    max_match_index = 50
+
+    def generate_player(player):
+        data = dict()
+        data['name'] = player
+        data['level_scoring_factor'] = random.uniform(0.7, 0.9)
+        data['initial_points'] = random.random()*10 + 5.0
+        return data
+
+    def generate_singles_match(a_players_list: list):
+        match = dict()
+        players_list = copy.deepcopy(a_players_list)
+        match['player1'] = players_list[random.randint(0, len(players_list)-1)]
+        players_list.remove(match['player1'])
+        match['player2'] = players_list[random.randint(0, len(players_list)-1)]
+        match['games_won_1'] = random.randint(0, 8)
+        match['games_won_2'] = random.randint(0, 8)
+        return match
+
+    def generate_doubles_match(a_players_list: list):
+        match = dict()
+        players_list = copy.deepcopy(a_players_list)
+        match['player1'] = players_list[random.randint(0, len(players_list)-1)]
+        players_list.remove(match['player1'])
+        match['player2'] = players_list[random.randint(0, len(players_list)-1)]
+        players_list.remove(match['player2'])
+        match['player3'] = players_list[random.randint(0, len(players_list)-1)]
+        players_list.remove(match['player3'])
+        match['player4'] = players_list[random.randint(0, len(players_list)-1)]
+        match['games_won_a'] = random.randint(0, 8)
+        match['games_won_b'] = random.randint(0, 8)
+        return match
+
+    def generate_singles_level_change(a_players_list: list):
+        new_level = dict()
+        new_level['name'] = a_players_list[random.randint(0, len(a_players_list)-1)]
+        new_level['league_match_index'] = random.randint(1, 5)
+        new_level['new_level'] = random.uniform(0.4, 1.0)
+        return new_level
+
+    def generate_doubles_level_change(a_players_list: list):
+        new_level = dict()
+        players_list = copy.deepcopy(a_players_list)
+        new_level['name1'] = players_list[random.randint(0, len(players_list)-1)]
+        players_list.remove(new_level['name1'])
+        new_level['name2'] = players_list[random.randint(0, len(players_list)-1)]
+        new_level['league_match_index'] = random.randint(1, 3)
+        new_level['new_level'] = random.uniform(0.4, 1.0)
+        return new_level
+
+    random.seed(seed)
+
+    players = ["math", "andrew", "ben", "jessica", "anika", "carolina"]
+    players_sub_list = ["math", "andrew", "jessica", "carolina"]
+
+    # Players
+    print("# New Player, Name, Level Scoring Factor, Initial Points")
+    for p in sorted(players_sub_list):
+        print(PLAYER_ENTRY_FORMAT.format(**generate_player(p)))
+
+    # Singles Matches
+    print("# Singles Matches, Player 1, Games Won, Player 2, Games Won")
+    for i in range(0, max_match_index):
+        print(SINGLES_GAME_ENTRY_FORMAT.format(**generate_singles_match(players)))
+
+    # Doubles Matches
+    print("# Doubles Matches, Player 1, Player 2, Games Won, Player 3, Player 4, Games Won")
+    for i in range(0, max_match_index):
+        print(DOUBLES_GAME_ENTRY_FORMAT.format(**generate_doubles_match(players)))
+
+    # Singles Level Adjustment
+    print("# New Player Level, Name, League Match Index To Take Effect, New Level(Scoring Factor)")
+    for i in range(0, 4):
+        print(SINGLES_NEW_LEVEL_ENTRY_FORMAT.format(**generate_singles_level_change(players)))
+
+    # Doubles Team Level Adjustment
+    print("# New Team Level, Name, League Match Index To Take Effect, New Level(Scoring Factor)")
+    for i in range(0, 4):
+        print(DOUBLES_TEAM_NEW_LEVEL_ENTRY_FORMAT.format(**generate_doubles_level_change(players)))
+
+    # Generate some originally unlisted player doubles matches
+    print(DOUBLES_GAME_ENTRY_FORMAT.format(player1="math", player2="julie", games_won_a=4, player3="anika",
+                                           player4="rick", games_won_b=4))
+    print(DOUBLES_GAME_ENTRY_FORMAT.format(player1="RPL1", player2="julie", games_won_a=4, player3="anika",
+                                           player4="rick", games_won_b=4))
+
+
+def dump_league(seed: int,
+                nb_players: int,
+                nb_matches: int,
+                doubles_ratio: float,
+                level_change_rate: float,
+                replacement_rate: float,
+                skew: float,
+                out=None,
+                chunk_size=10000):
+    """
+    Dumps a synthetic league of any size, for load testing. Output is deterministic for a given seed.
+    Generating costs about 3 to 4 microseconds per match line in CPython, depending on skew: a 10M lines
+    league takes 30 to 45 seconds, not a few seconds.
+
+    :param nb_players: number of players, all listed as new players at the top of the file.
+    :param nb_matches: number of singles and doubles matches.
+    :param doubles_ratio: share of doubles matches, between 0 and 1.
+    :param level_change_rate: per match probability of a level change for one of its players (or teams),
+                              taking effect at that match. Level changes are listed at the end of the file.
+    :param replacement_rate: per match probability of a replacement player, such entries are skipped on import.
+    :param skew: players are picked with a probability proportional to 1/rank^skew, 0 meaning all players
+                 play about as much.
+    :param out: file object to write to, defaults to standard output. Lines are written in chunks.
+    """
+    import itertools
+    import random
+    import sys
+
+    if out is None:
+        out = sys.stdout
+
+    rng = random.Random(seed)
+
+    name_width = len(str(nb_players))
+    players = ["player%0*d" % (name_width, i) for i in range(1, nb_players + 1)]
+    cumulative_weights = list(itertools.accumulate([1.0 / (rank ** skew) for rank in range(1, nb_players + 1)]))
+
+    if skew == 0:
+        # Unweighted picks are a lot faster
+        cumulative_weights = None
+
+    def pick_players(nb):
+        picked = rng.choices(players, cum_weights=cumulative_weights, k=nb)
+        while len(set(picked)) != nb:
+            picked = rng.choices(players, cum_weights=cumulative_weights, k=nb)
+        return picked
+
+    lines = ["# New Player, Name, Level Scoring Factor, Initial Points"]
+    for p in players:
+        lines.append(PLAYER_ENTRY_FORMAT.format(name=p,
+                                                level_scoring_factor=rng.uniform(0.7, 0.9),
+                                                initial_points=rng.random()*10 + 5.0))
+
+    lines.append("# Singles Matches, Player 1, Games Won, Player 2, Games Won")
+    lines.append("# Doubles Matches, Player 1, Player 2, Games Won, Player 3, Player 4, Games Won")
+
+    singles_level_changes = []
+    doubles_level_changes = []
+    singles_index = 0
+    doubles_index = 0
+
+    # Local aliases for the hot loop, game entries are formatted from tuples rather than keyword dictionaries
+    uniform = rng.random
+    append = lines.append
+    singles_format = SINGLES_GAME_LINE_FORMAT
+    doubles_format = DOUBLES_GAME_LINE_FORMAT
+
+    for chunk_start in range(0, nb_matches, chunk_size):
+        nb_chunk_matches = min(chunk_size, nb_matches - chunk_start)
+        # Drawing players for the whole chunk at once is a lot faster
+        picks = rng.choices(players, cum_weights=cumulative_weights, k=4*nb_chunk_matches)
+
+        chunk_picks = iter(picks)
+        for p1, p2, p3, p4 in zip(chunk_picks, chunk_picks, chunk_picks, chunk_picks):
+            replacement = uniform() < replacement_rate
+            games_won_1 = int(uniform() * 9)
+            games_won_2 = int(uniform() * 9)
+
+            if uniform() < doubles_ratio:
+                if p1 == p2 or p1 == p3 or p1 == p4 or p2 == p3 or p2 == p4 or p3 == p4:
+                    p1, p2, p3, p4 = pick_players(4)
+                if replacement:
+                    p4 = REPLACEMENT_PLAYER_PREFIX_TOKENS[0] + p4
+                else:
+                    doubles_index += 1
+                    if uniform() < level_change_rate:
+                        doubles_level_changes.append(
+                            DOUBLES_TEAM_NEW_LEVEL_ENTRY_FORMAT.format(name1=p1, name2=p2,
+                                                                       league_match_index=doubles_index,
+                                                                       new_level=rng.uniform(0.4, 1.0)))
+                append(doubles_format % (p1, p2, games_won_1, p3, p4, games_won_2))
+            else:
+                if p1 == p2:
+                    p1, p2 = pick_players(2)
+                if replacement:
+                    p2 = REPLACEMENT_PLAYER_PREFIX_TOKENS[0] + p2
+                else:
+                    singles_index += 1
+                    if uniform() < level_change_rate:
+                        singles_level_changes.append(
+                            SINGLES_NEW_LEVEL_ENTRY_FORMAT.format(name=p1,
+                                                                  league_match_index=singles_index,
+                                                                  new_level=rng.uniform(0.4, 1.0)))
+                append(singles_format % (p1, games_won_1, p2, games_won_2))
+
+        out.write("\n".join(lines))
+        out.write("\n")
+        del lines[:]
+
+    lines.append("# New Player Level, Name, League Match Index To Take Effect, New Level(Scoring Factor)")
+    lines.extend(singles_level_changes)
+    lines.append("# New Team Level, Name, League Match Index To Take Effect, New Level(Scoring Factor)")
+    lines.extend(doubles_level_changes)
+    out.write("\n".join(lines))
+    out.write("\n")
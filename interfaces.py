@@ -1,14 +1,59 @@
+import functools
 import re
+import sys
 
 from Stats import *
 from utils.SmartIndex import *
 
 
+def _memoized(getter):
+    """
+    Memoizes a PlayingEntity getter for the latest index it was queried at: standings, league averages and
+    printers go over all playing entities one index at a time, querying each several times. The entity's
+    memo is cleared whenever its matches, points or level change, see PlayingEntity._invalidate_memo.
+    """
+    name = getter.__name__
+
+    @functools.wraps(getter)
+    def wrapper(self, index: SmartIndex):
+        key = index.get_key()
+        memo = self._memo
+        if key == self._memo_index:
+            try:
+                value = memo[name]
+                Counters.increment(Counters.ENTITY_GETTER_HIT)
+                return value
+            except KeyError:
+                pass
+        else:
+            self._memo_index = key
+            memo.clear()
+        Counters.increment(Counters.ENTITY_GETTER_MISS)
+        value = getter(self, index)
+        memo[name] = value
+        return value
+    return wrapper
+
+
 class BaseMatch(metaclass=ABCMeta):
+    # Leagues hold many matches, let implementations use slots
+    __slots__ = ()
+
     @abstractmethod
     def get_name(self, entity: int):
         pass
 
+    @abstractmethod
+    def get_entity_id(self, entity: int):
+        """
+        League id of entity 1 or 2, see League.get_playing_entity_by_id.
+        """
+        pass
+
+    @abstractmethod
+    def get_entity_games_won(self, entity: int):
+        pass
+
     @abstractmethod
     def get_games_won(self, entity_name: str):
         pass
@@ -41,15 +86,9 @@ class PlayingEntity(metaclass=ABCMeta):
     See DOUBLES_NAME_FORMAT and get_name in this class for details.
     """
     DOUBLES_NAME_FORMAT = "{:12s} and {:12s}"
+    # DOUBLES_NAME_RE must be able to exactly match a DOUBLES_NAME_FORMAT formatted string, see test_general
     DOUBLES_NAME_RE = re.compile(r"^(\S+)\s+and\s+(\S+)\s+$")
 
-    # Sanity test of prior two statements
-    _team_name = DOUBLES_NAME_FORMAT.format("name1", "name2")
-    _m = DOUBLES_NAME_RE.match(_team_name)
-    if not _m:
-        raise Exception("PlayingEntity.DOUBLES_NAME_RE must be able to exactly match a "
-                        "PlayingEntity.DOUBLES_NAME_FORMAT formatted string")
-
     class PlayType(Enum):
         SINGLES = 'singles'
         DOUBLES = 'doubles'
@@ -59,39 +98,94 @@ class PlayingEntity(metaclass=ABCMeta):
                  play_type: PlayType,
                  play_level_scoring_factor: float,
                  initial_points=0.0):
-        self._name = name.lower()
+        # Names are compared and used as keys all the time
+        self._name = sys.intern(name.lower())
         self._play_type = play_type
+        # Set when registered with the league, see League.add_playing_entity
+        self._id = None
 
         self._stats = Stats(initial_points, play_level_scoring_factor)
         self._stats.reset_data('match_points')
         self._stats.reset_data('ranking')
+        self._invalidate_memo()
+
+    def _invalidate_memo(self):
+        self._memo_index = None
+        self._memo = dict()
 
     def get_initial_level_scoring_factor(self):
         return self._stats.get_initial_data('level_scoring_factor')
 
     def update_play_level_scoring_factor(self, play_level_scoring_factor: float,
-                                         index: LeagueIndex):
-        self._stats.set_data('level_scoring_factor', play_level_scoring_factor, index)
+                                         index: LeagueIndex, overwrite=False):
+        self._invalidate_memo()
+        self._stats.set_data('level_scoring_factor', play_level_scoring_factor, index, overwrite=overwrite)
 
     def get_play_level_scoring_factor(self, index: SmartIndex):
         return self._stats.get_data_for_index('level_scoring_factor', index=index)
 
+    def get_level_change_indexes(self):
+        return self._stats.get_level_change_indexes()
+
     def reset_rankings(self):
+        self._invalidate_memo()
         self._stats.reset_data('ranking')
 
     def reset_points(self):
+        self._invalidate_memo()
         self._stats.reset_data('match_points')
 
-    def add_match(self, match: BaseMatch, index: LeagueIndex):
-        # Check name of playing_entity is involved in match
-        if not match.has_played(self._name):
-            raise Exception("%s has not played in match: %s" % (self._name, match))
+    def reset_results_from(self, index: LeagueIndex):
+        """
+        Resets points and rankings from the match played at given league match index on, see
+        Stats.reset_results_from.
+        """
+        self._invalidate_memo()
+        self._stats.reset_results_from(index)
+
+    def _get_match_results(self, match: BaseMatch):
+        """
+        Games won and lost by the playing entity in given match.
+        """
+        # Check playing_entity is involved in match
+        for entity in [1, 2]:
+            if match.get_entity_id(entity) == self._id:
+                return match.get_entity_games_won(entity), match.get_entity_games_won(3 - entity)
+        raise Exception("%s has not played in match: %s" % (self._name, match))
 
-        games_won = match.get_games_won(self._name)
-        games_lost = match.get_games_lost(self._name)
+    def add_match(self, match: BaseMatch, index: LeagueIndex):
+        games_won, games_lost = self._get_match_results(match)
 
+        self._invalidate_memo()
         self._stats.set_match_results(games_won, games_lost, index)
 
+    def replace_match(self, match: BaseMatch, index: LeagueIndex):
+        """
+        Replaces the match played at given league match index, see League.replace_match.
+        """
+        games_won, games_lost = self._get_match_results(match)
+        self._invalidate_memo()
+        self._stats.replace_match_results(games_won, games_lost, index)
+
+    def insert_match(self, match: BaseMatch, index: LeagueIndex):
+        """
+        Adds a match played at a league match index lower than the latest, see League.insert_match.
+        """
+        games_won, games_lost = self._get_match_results(match)
+        self._invalidate_memo()
+        self._stats.insert_match_results(games_won, games_lost, index)
+
+    def remove_match(self, index: LeagueIndex):
+        self._invalidate_memo()
+        self._stats.remove_match_results(index)
+
+    def shift_league_indexes(self, index: LeagueIndex, shift: int):
+        """
+        Shifts the league match indexes of the matches played from given one on, see League.insert_match.
+        """
+        self._invalidate_memo()
+        self._stats.shift_league_indexes(index, shift)
+
     def set_rank(self, index: LeagueIndex, rank: int):
         """
         Sets the player rank for given match index. It is based on all results up to and including match index.
@@ -100,57 +194,101 @@ class PlayingEntity(metaclass=ABCMeta):
             raise ValueError("Rank must be positive and greater than or equal to 1, value given: %d" % rank)
         self._stats.set_data('ranking', rank, index)
 
+    def set_rank_at_match_played(self, nb_match_played: int, rank: int):
+        """
+        Sets the player rank as of its given number of matches played, i.e. from its match at that player index
+        until its next one, see ScoreProcessor.RankingState.
+        """
+        self._stats.set_ranking(nb_match_played, rank)
+
     def set_match_points(self, index: LeagueIndex, points: float):
         """
         Sets the player earned points for given match index.
         """
         if not self._stats.index_exists(index):
             raise SmartIndexError("No match played for %s" % str(index))
+        self._invalidate_memo()
         self._stats.set_data('match_points', points, league_index=index)
 
+    @_memoized
     def get_cumulative_games_won(self, index: SmartIndex):
         try:
             return self._stats.get_cumulative_data_sum_for_index('games_won', index=index)
         except NoMatchPlayedYetError:
+            Counters.increment(Counters.NO_MATCH_PLAYED_YET_CAUGHT)
             return 0
 
+    @_memoized
     def get_cumulative_games_lost(self, index: SmartIndex):
         try:
             return self._stats.get_cumulative_data_sum_for_index('games_lost', index=index)
         except NoMatchPlayedYetError:
+            Counters.increment(Counters.NO_MATCH_PLAYED_YET_CAUGHT)
             return 0
 
+    @_memoized
     def get_cumulative_points(self, index: SmartIndex):
         try:
             return self._stats.get_cumulative_data_sum_for_index('match_points', index=index)
         except NoMatchPlayedYetError:
+            Counters.increment(Counters.NO_MATCH_PLAYED_YET_CAUGHT)
             return 0.0
 
+    @_memoized
     def get_average_points_per_match(self, index: SmartIndex):
         try:
             return self._stats.get_average_points_per_match(index=index)
         except NoMatchPlayedYetError:
+            Counters.increment(Counters.NO_MATCH_PLAYED_YET_CAUGHT)
             return 0.0
 
+    @_memoized
     def get_match_points(self, index: SmartIndex):
         try:
             return self._stats.get_data_for_index('match_points', index=index)
         except NoMatchPlayedYetError:
+            Counters.increment(Counters.NO_MATCH_PLAYED_YET_CAUGHT)
             return 0.0
 
     def get_ranking(self, index: SmartIndex):
         return self._stats.get_data_for_index('ranking', index=index)
 
+    @_memoized
     def get_nb_match_played(self, index: LeagueIndex):
+        if index.index_type == IndexType.LEAGUE:
+            return self._stats.get_number_of_match_played_at(index)
         try:
             return self._stats.get_number_of_match_played_by_league_index_time(index=index)
         except NoMatchPlayedYetError:
+            Counters.increment(Counters.NO_MATCH_PLAYED_YET_CAUGHT)
             return 0
 
+    # The following getters are binary searches on the league index, meant to query a fully
+    # computed season as of any league index. Initial points are included in cumulative points.
+
+    @_memoized
+    def get_cumulative_games_won_at(self, index: LeagueIndex):
+        return self._stats.get_cumulative_data_at('games_won', index)
+
+    @_memoized
+    def get_cumulative_games_lost_at(self, index: LeagueIndex):
+        return self._stats.get_cumulative_data_at('games_lost', index)
+
+    @_memoized
+    def get_cumulative_points_at(self, index: LeagueIndex):
+        return self._stats.get_cumulative_data_at('match_points', index)
+
     @property
     def play_type(self):
         return self._play_type
 
+    @property
+    def id(self):
+        return self._id
+
+    def set_id(self, entity_id: int):
+        self._id = entity_id
+
     def get_name(self):
         return self._name
 
@@ -1,14 +1,23 @@
 #!/usr/bin/env python3
 import argparse
+import atexit
 import logging
 import sys
+import time
 
-from ScoreProcessor import *
-from StatsPrinter import *
-from Player import *
-import importer.csv
+# Reported as the 'startup import' phase by --profile. It only covers score.py's own imports: sub commands
+# import the modules they need when run, timed by --profile in their own import phase
+_import_start_time = time.perf_counter()
+
+# Sub commands import what they need when run, so that 'score.py -h' or 'demo_csv' don't pay for the
+# league model, see tests/run-benchmarks.py startup
+from utils.counters import Counters
+from utils.profiler import Profiler
+from utils.tracer import Tracer
 from utils.utils import LoggerHandler, Accepts
 
+IMPORT_TIME = time.perf_counter() - _import_start_time
+
 logging.basicConfig(level=logging.INFO)
 LoggerHandler.set_default_level(level=logging.INFO)
 logger = LoggerHandler.get_instance().get_logger("score")
@@ -18,6 +27,79 @@ RANKING_FACTOR_CONSTANT = 1.0
 RANKING_DIFF_FACTOR_CONSTANT = 1.0
 RANKING_FACTOR_BREAK_IN_PERIOD = 3
 LEAGUE_BREAK_IN_SCORE_FACTOR = 0.1
+# Same as ResultCache.DEFAULT_MAX_SIZE, not imported to keep 'score.py -h' fast
+DEFAULT_RESULT_CACHE_SIZE = 64 * 1024 * 1024
+DEFAULT_PARSE_CACHE_SIZE = 256 * 1024 * 1024
+
+# Synthetic league defaults for 'demo_csv', only used if one of its sizing options is set
+DEMO_PLAYERS = 6
+DEMO_MATCHES = 100
+DEMO_DOUBLES_RATIO = 0.5
+DEMO_LEVEL_CHANGE_RATE = 0.08
+DEMO_REPLACEMENT_RATE = 0.01
+DEMO_SKEW = 0.0
+
+
+class MatchIndexSelection:
+    """
+    League match indexes requested on the command line: a single index ('-1' meaning latest),
+    a comma separated list of indexes or 'every:N' for every Nth league match index.
+    The season is computed once, up to the last requested index, and standings are then
+    printed as of each index.
+    """
+    EVERY_PREFIX = "every:"
+
+    def __init__(self, indexes: list, every=None):
+        self._indexes = indexes
+        self._every = every
+
+    @staticmethod
+    def from_string(value: str):
+        """
+        argparse type for the '-m' option.
+        """
+        try:
+            if value.startswith(MatchIndexSelection.EVERY_PREFIX):
+                return MatchIndexSelection([], every=int(value[len(MatchIndexSelection.EVERY_PREFIX):]))
+            return MatchIndexSelection([int(i) for i in value.split(',')])
+        except ValueError:
+            raise argparse.ArgumentTypeError("invalid match index selection: '%s'" % value)
+
+    def is_valid(self):
+        if self._every is not None:
+            return self._every >= 1
+        if self._indexes == [-1]:
+            return True
+        return min(self._indexes) >= 1
+
+    def is_single(self):
+        return self._every is None and len(self._indexes) == 1
+
+    def get_compute_index(self):
+        """
+        League match index up to which the season needs to be computed.
+        """
+        from utils.SmartIndex import LeagueIndex
+
+        if self._every is not None or -1 in self._indexes:
+            return LeagueIndex(-1)
+        return LeagueIndex(max(self._indexes))
+
+    def get_indexes(self, last_match_index: "LeagueIndex"):
+        """
+        Returns the requested indexes in increasing order, 'every:N' is resolved against the last
+        league match index and raises if N is above it, as nothing would be printed.
+        """
+        from utils.SmartIndex import LeagueIndex
+        from utils.exceptions import SmartIndexError
+
+        if self._every is not None:
+            last_index = max(int(last_match_index), 0)
+            if self._every > last_index:
+                raise SmartIndexError("Match index selection '%s%d' selects no league match index, the last one is %d" %
+                                      (MatchIndexSelection.EVERY_PREFIX, self._every, last_index))
+            return [LeagueIndex(i) for i in range(self._every, last_index + 1, self._every)]
+        return [LeagueIndex(i) for i in sorted(set(self._indexes))]
 
 
 def parse_command_line(command_line_args=sys.argv[1:]):
@@ -30,6 +112,46 @@ def parse_command_line(command_line_args=sys.argv[1:]):
                         help="Print debug chatter.",
                         default=False)
 
+    parser.add_argument("--profile",
+                        dest="profile",
+                        action="store_true",
+                        help="Print the time spent in each phase of the run to stderr.",
+                        default=False)
+
+    parser.add_argument("--profile-dir",
+                        dest="profile_dir",
+                        type=str,
+                        help="Implies --profile. Also run the compute phase under cProfile, saving its stats "
+                             "as '.prof' files in given directory and printing its hottest functions.",
+                        default=None)
+
+    parser.add_argument("--profile-top",
+                        dest="profile_top",
+                        type=int,
+                        help="Number of hottest functions printed per cProfile'd phase. Defaults to 15.",
+                        default=15)
+
+    parser.add_argument("--counters",
+                        dest="counters",
+                        action="store_true",
+                        help="Count hot path operations (index conversions, fallback scans, cumulative sums...) "
+                             "and print them per play type to stderr at exit.",
+                        default=False)
+
+    parser.add_argument("--trace",
+                        dest="trace",
+                        type=str,
+                        help="Record per match processing spans (and csv import chunks) to given file, in Chrome "
+                             "trace event format. Open it in chrome://tracing or https://ui.perfetto.dev.",
+                        default=None)
+
+    parser.add_argument("--trace-sample",
+                        dest="trace_sample",
+                        type=int,
+                        help="Only trace one out of every TRACE_SAMPLE matches, to keep tracing long seasons cheap. "
+                             "Defaults to 1, every match.",
+                        default=1)
+
     subparsers = parser.add_subparsers(help='Use one of the following sub commands to perform the desired task.',
                                        dest='cmd')
 
@@ -83,10 +205,12 @@ def parse_command_line(command_line_args=sys.argv[1:]):
 
     csv_parser.add_argument("-m", "--match-index",
                             dest="match_index",
-                            type=int,
+                            type=MatchIndexSelection.from_string,
                             help="Print results as of specified league match index. If none specified, prints "
-                                 "latest results.",
-                            default=-1)
+                                 "latest results. Also accepts a comma separated list of indexes (10,20,30) or "
+                                 "'every:N' to print results as of every Nth league match index; the season is "
+                                 "only computed once.",
+                            default=MatchIndexSelection([-1]))
 
     csv_parser.add_argument("--doubles",
                             dest="doubles",
@@ -119,6 +243,53 @@ def parse_command_line(command_line_args=sys.argv[1:]):
                             help="Output stats in CSV format to standard output.",
                             default=False)
 
+    csv_parser.add_argument("--rank-timeline",
+                            dest="rank_timeline",
+                            type=str,
+                            help="Export every entity's cumulative points, points per match and rank as of every "
+                                 "computed league match index to this file, as a NumPy '.npz' file if it has that "
+                                 "extension (requires numpy), as CSV otherwise.",
+                            default=None)
+
+    csv_parser.add_argument("--compute-trace",
+                            dest="compute_trace",
+                            type=str,
+                            help="Record how each match's points were computed (factors, base and earned points, "
+                                 "break in flags) to this file, one JSON object per line, honouring the player "
+                                 "filter. See the 'compute_trace' sub command to print or query it.",
+                            default=None)
+
+    csv_parser.add_argument("--explanations",
+                            dest="explanations",
+                            type=str,
+                            help="Save a snapshot of each match's factors and points to this file, see the "
+                                 "'explain' sub command.",
+                            default=None)
+
+    csv_parser.add_argument("--cache-dir",
+                            dest="cache_dir",
+                            type=str,
+                            help="Cache parsed CSV files in this directory, so that importing the same file again "
+                                 "skips parsing. Defaults to the TENNIS_SCORE_CACHE_DIR environment variable, "
+                                 "no caching if not set. Computed points are also cached, unless '-v', "
+                                 "--compute-trace, --explanations or --rank-timeline is used, and those of "
+                                 "the matches a change to the file doesn't affect are reused.",
+                            default=None)
+
+    csv_parser.add_argument("--result-cache-size",
+                            dest="result_cache_size",
+                            type=int,
+                            help="Maximum size of the computed points cache in MiB, least recently used results "
+                                 "are evicted first. Defaults to %d MiB." % (DEFAULT_RESULT_CACHE_SIZE // (1 << 20)),
+                            default=DEFAULT_RESULT_CACHE_SIZE // (1 << 20))
+
+    csv_parser.add_argument("--parse-cache-size",
+                            dest="parse_cache_size",
+                            type=int,
+                            help="Maximum size of the parsed CSV files cache in MiB, least recently used files "
+                                 "are evicted first. Defaults to %d MiB." % (DEFAULT_PARSE_CACHE_SIZE // (1 << 20)),
+                            default=DEFAULT_PARSE_CACHE_SIZE // (1 << 20))
+
     csv_dump_parser = subparsers.add_parser('demo_csv', help='Dump a demo CSV file.')
 
     csv_dump_parser.add_argument("--seed",
@@ -127,6 +298,97 @@ def parse_command_line(command_line_args=sys.argv[1:]):
                                  help="Dumped demo CSV is randomized with this integer seed. Defaults to 0.",
                                  default=0)
 
+    # Sizing options: if none is set, the small hard-coded demo league is dumped.
+    csv_dump_parser.add_argument("--players",
+                                 dest="players",
+                                 type=int,
+                                 help="Generate a synthetic league with this number of players. Defaults to %d if "
+                                      "another sizing option is set." % DEMO_PLAYERS,
+                                 default=None)
+
+    csv_dump_parser.add_argument("--matches",
+                                 dest="matches",
+                                 type=int,
+                                 help="Number of singles and doubles matches of the synthetic league. Defaults to %d "
+                                      "if another sizing option is set." % DEMO_MATCHES,
+                                 default=None)
+
+    csv_dump_parser.add_argument("--doubles-ratio",
+                                 dest="doubles_ratio",
+                                 type=float,
+                                 help="Share of doubles matches, between 0 and 1. Defaults to %2.3f." %
+                                      DEMO_DOUBLES_RATIO,
+                                 default=None)
+
+    csv_dump_parser.add_argument("--level-change-rate",
+                                 dest="level_change_rate",
+                                 type=float,
+                                 help="Per match probability of a player or team level change taking effect at that "
+                                      "match, between 0 and 1. Defaults to %2.3f." % DEMO_LEVEL_CHANGE_RATE,
+                                 default=None)
+
+    csv_dump_parser.add_argument("--replacement-rate",
+                                 dest="replacement_rate",
+                                 type=float,
+                                 help="Per match probability of a replacement player, between 0 and 1. Defaults "
+                                      "to %2.3f." % DEMO_REPLACEMENT_RATE,
+                                 default=None)
+
+    csv_dump_parser.add_argument("--skew",
+                                 dest="skew",
+                                 type=float,
+                                 help="Players are picked with a probability proportional to 1/rank^skew, higher "
+                                      "values make some players play far more than others. Defaults to %2.3f." %
+                                      DEMO_SKEW,
+                                 default=None)
+
+    trace_parser = subparsers.add_parser('compute_trace', help="Print or query a file recorded with "
+                                                               "'input_csv --compute-trace'.")
+    trace_parser.add_argument("trace_file",
+                              metavar="trace",
+                              type=str,
+                              help="Compute trace file.")
+
+    trace_parser.add_argument("-p", "--player-filter",
+                              dest="player_filter",
+                              action='append',
+                              help="Only print matches of selected players, can be used multiple times.",
+                              default=[])
+
+    trace_parser.add_argument("--first",
+                              dest="first",
+                              type=int,
+                              help="Only print matches from this league match index on.",
+                              default=None)
+
+    trace_parser.add_argument("--last",
+                              dest="last",
+                              type=int,
+                              help="Only print matches up to this league match index.",
+                              default=None)
+
+    trace_parser.add_argument("--jsonl",
+                              dest="jsonl",
+                              action="store_true",
+                              help="Print selected records as is, one JSON object per line, instead of as text.",
+                              default=False)
+
+    explain_parser = subparsers.add_parser('explain', help="Explain the points earned by a player, from a snapshot "
+                                                           "saved with 'input_csv --explanations'.")
+    explain_parser.add_argument("snapshot",
+                                type=str,
+                                help="Match explanations snapshot file.")
+
+    explain_parser.add_argument("player",
+                                type=str,
+                                help="Player, or doubles team as 'NAME1 and NAME2'.")
+
+    explain_parser.add_argument("-m", "--match-index",
+                                dest="explain_match_index",
+                                type=int,
+                                help="League match index to explain, defaults to all of the player's matches.",
+                                default=None)
+
     parser.epilog = """Program for processing scores in a league with players of varied levels. You can generate
 demo data by running 'score.py demo_csv --seed 0 > test.csv'. Then running 'score.py input_csv test.csv' will
 show you the kind of output you can get.
@@ -227,6 +489,9 @@ Set a different seed to generate different results.
 Same, but save to a file:
     score.py demo_csv --seed 0 > demo.csv
 
+Generate a large synthetic league for load testing, where some players play far more than others:
+    score.py demo_csv --seed 0 --players 2000 --matches 100000 --doubles-ratio 0.3 --skew 1 > large.csv
+
 Default stats output for singles
 
     score.py input_csv demo.csv
@@ -239,11 +504,48 @@ Default stats output for doubles
 
     score.py input_csv --doubles demo.csv
 
+Stats output as of league match indexes 10, 20 and 30, then as of every 25th league match index
+
+    score.py input_csv -m 10,20,30 demo.csv
+    score.py input_csv -m every:25 demo.csv
+
+Export every player's points, points per match and rank as of every league match index
+
+    score.py input_csv --rank-timeline timeline.csv demo.csv
+
 Print lots of debugging information; note that position of '-v' parameter is important!!!
 The '-v' parameter must come before the sub command ('input_csv' or 'demo_csv')
 
     score.py -v input_csv demo.csv
 
+Same information, recorded to a file while computing, then printed for a player's matches 10 to 20
+
+    score.py input_csv --compute-trace trace.jsonl demo.csv
+    score.py compute_trace -p alex --first 10 --last 20 trace.jsonl
+
+Why did a player earn these points for league match index 12? Save explanations once, then ask
+
+    score.py input_csv --explanations explanations.bin demo.csv
+    score.py explain explanations.bin alex -m 12
+
+Time each phase of the run, profile the compute phase with cProfile ('.prof' files saved under 'prof'), or count
+hot path operations; like '-v', these options must come before the sub command. Stats output is unchanged, the
+profile and counters go to stderr.
+
+    score.py --profile input_csv demo.csv
+    score.py --profile-dir prof input_csv demo.csv
+    score.py --counters input_csv demo.csv
+
+Trace the processing of one out of every 100 matches, see chrome://tracing or https://ui.perfetto.dev
+
+    score.py --trace trace.json --trace-sample 100 input_csv demo.csv
+
+Cache parsed CSV files and computed points, to skip both when running the same file again with other display
+options. Once matches are added or changed at the end of the file, only their points are computed again
+
+    score.py input_csv --cache-dir ~/.cache/tennis-score demo.csv
+    TENNIS_SCORE_CACHE_DIR=~/.cache/tennis-score score.py input_csv --doubles demo.csv
+
 Emulate current point system based on games won vs games lost without consideration ranking (diff)factor constants.
 
     score.py input_csv --ignore-ranking-factors --ranking-factor-break-in-period=0 demo.csv
@@ -264,15 +566,61 @@ Emulate current point system based on games won vs games lost without considerat
         # When verbose is set, enable type checking decorator.
         Accepts.enable()
 
+    if arguments.profile_dir is not None:
+        arguments.profile = True
+
+    if arguments.trace_sample < 1:
+        logger.error("Trace sample rate must be at least 1.")
+        error = True
+
+    if arguments.profile_top < 0:
+        logger.error("Number of hottest functions to print can't be negative.")
+        error = True
+
     if arguments.cmd == "input_csv":
         if arguments.league_break_in_score_factor > 0.5:
             logger.error("League break in score factor --lbsf can't be set above 0.5.")
             error = True
 
-        if arguments.match_index < 1 and arguments.match_index != -1:
+        if not arguments.match_index.is_valid():
             logger.error("Can't set a match index inferior to 1")
             error = True
 
+    if arguments.cmd == "demo_csv":
+        sizing = [arguments.players, arguments.matches, arguments.doubles_ratio, arguments.level_change_rate,
+                  arguments.replacement_rate, arguments.skew]
+        arguments.synthetic = sizing != [None] * len(sizing)
+        if arguments.players is None:
+            arguments.players = DEMO_PLAYERS
+        if arguments.matches is None:
+            arguments.matches = DEMO_MATCHES
+        if arguments.doubles_ratio is None:
+            arguments.doubles_ratio = DEMO_DOUBLES_RATIO
+        if arguments.level_change_rate is None:
+            arguments.level_change_rate = DEMO_LEVEL_CHANGE_RATE
+        if arguments.replacement_rate is None:
+            arguments.replacement_rate = DEMO_REPLACEMENT_RATE
+        if arguments.skew is None:
+            arguments.skew = DEMO_SKEW
+
+        if arguments.players < 2 or (arguments.players < 4 and arguments.doubles_ratio > 0):
+            logger.error("A synthetic league needs at least 2 players, 4 if it has doubles matches.")
+            error = True
+
+        if arguments.matches < 0:
+            logger.error("Number of matches can't be negative.")
+            error = True
+
+        for rate in [arguments.doubles_ratio, arguments.level_change_rate, arguments.replacement_rate]:
+            if not 0 <= rate <= 1:
+                logger.error("Ratios and rates must be between 0 and 1.")
+                error = True
+                break
+
+        if arguments.skew < 0:
+            logger.error("Skew can't be negative.")
+            error = True
+
     if error:
         sys.exit(1)
 
@@ -280,6 +628,9 @@ Emulate current point system based on games won vs games lost without considerat
 
 
 def list_players_in_csv_format(tennis_league):
+    from interfaces import PlayingEntity, LeagueIndex
+    import importer.csv
+
     print()
     print("Change the following and put it at the TOP of your csv file to set player's")
     print("initial level (scoring factor) and initial points.")
@@ -309,10 +660,51 @@ def list_players_in_csv_format(tennis_league):
                                                                  league_match_index=1))
 
 
-def compute_and_show_standings(main_args, tennis_league, play_type):
-    processor_type = ScoreProcessor
-
-    s = processor_type(league=tennis_league,
+def _get_previous_run_points(result_cache, cache, csv_file, parameters, play_type, records, nb_matches):
+    """
+    Returns the points of the matches the CSV file's previous run computed which its current content doesn't
+    affect, None if there is no such run or match.
+    """
+    import importer.csv
+
+    previous_hash = result_cache.get_previous_run(csv_file, parameters, play_type)
+    if previous_hash is None or records is None:
+        return None
+    previous_points = result_cache.load(previous_hash, parameters, play_type)
+    previous_records = cache.load_content(previous_hash)
+    if previous_points is None or previous_records is None:
+        return None
+
+    first_affected = importer.csv.get_first_affected_match_index(previous_records, records, play_type)
+    nb_reused = min(first_affected - 1, len(previous_points) // 2, nb_matches)
+    Counters.increment('result_cache.reused_matches', nb_reused)
+    if nb_reused <= 0:
+        return None
+    return previous_points[:2 * nb_reused]
+
+
+def compute_and_show_standings(main_args, tennis_league, play_type, cache=None, records=None):
+    """
+    Computes and prints the standings. Given ParseCache's directory, if set, also caches computed points,
+    which are reused for the matches before the first one 'records' (the league's parsed CSV records)
+    differ at from the CSV file's previous content, see importer.csv.get_first_affected_match_index.
+    """
+    with Profiler.phase("compute import"):
+        from ScoreProcessor import ScoreProcessor
+        from ResultCache import ResultCache
+        from StatsPrinter import StatsPrinter, CsvStatsPrinter
+        from RankTimeline import RankTimeline
+        from ComputeTrace import ComputeTrace
+        from MatchExplanations import MatchExplanations
+
+    Counters.set_scope(play_type.value)
+
+    # Checked before computing, 'every:N' may select no index
+    indexes = None
+    if not main_args.match_index.is_single():
+        indexes = main_args.match_index.get_indexes(tennis_league.last_match_index(play_type))
+
+    s = ScoreProcessor(league=tennis_league,
                        points_per_match=main_args.points_per_match,
                        ranking_factor_constant=main_args.ranking_factor_constant,
                        ranking_diff_factor_constant=main_args.ranking_diff_factor_constant,
@@ -320,33 +712,157 @@ def compute_and_show_standings(main_args, tennis_league, play_type):
                        ranking_factor_break_in_period=main_args.ranking_factor_break_in_period,
                        ignore_ranking_factors=main_args.ignore_ranking_factors)
     s.set_player_filter(main_args.player_filter)
-    s.compute(LeagueIndex(main_args.match_index), play_type)
+    match_explanations = None
+    if main_args.explanations is not None:
+        match_explanations = MatchExplanations()
+        s.set_match_explanations(match_explanations)
+    compute_trace = None
+    if main_args.compute_trace is not None:
+        compute_trace = ComputeTrace(main_args.compute_trace)
+        s.set_compute_trace(compute_trace)
+    rank_timeline = None
+    if main_args.rank_timeline is not None:
+        rank_timeline = RankTimeline()
+        s.set_rank_timeline(rank_timeline)
+
+    # Traces, explanations and timelines are recorded while computing, only points are cached
+    result_cache = None
+    if cache is not None and not main_args.verbose and match_explanations is None and compute_trace is None \
+            and rank_timeline is None and tennis_league.last_match_index(play_type) != -1:
+        result_cache = ResultCache(cache.cache_dir, main_args.result_cache_size * (1 << 20))
+
+    compute_index = main_args.match_index.get_compute_index()
+    points = None
+    prefix_points = None
+    if result_cache is not None:
+        parameters = s.get_parameters()
+        content_hash = cache.get_content_hash(main_args.csv)
+        nb_matches = int(tennis_league.last_match_index(play_type))
+        if compute_index != -1:
+            nb_matches = min(nb_matches, int(compute_index))
+        with Profiler.phase("result cache lookup"):
+            points = result_cache.load(content_hash, parameters, play_type, nb_matches)
+            if points is None:
+                prefix_points = _get_previous_run_points(result_cache, cache, main_args.csv, parameters, play_type,
+                                                         records, nb_matches)
+        Counters.increment('result_cache.hit' if points is not None else 'result_cache.miss')
+
+    if points is not None:
+        with Profiler.phase("set cached points %s" % play_type.value):
+            s.set_match_points(points, play_type)
+    else:
+        with Profiler.phase("compute %s" % play_type.value, cprofile=True):
+            s.compute(compute_index, play_type, prefix_points)
+        if result_cache is not None:
+            result_cache.save(content_hash, parameters, play_type, s.get_match_points(compute_index, play_type))
+    if result_cache is not None:
+        result_cache.set_previous_run(main_args.csv, parameters, play_type, content_hash)
+
+    if compute_trace is not None:
+        compute_trace.close()
+
+    if match_explanations is not None:
+        match_explanations.save(main_args.explanations)
+
+    if rank_timeline is not None:
+        with Profiler.phase("rank timeline export"):
+            rank_timeline.write(main_args.rank_timeline)
 
     if main_args.csv_output:
         printer = CsvStatsPrinter(tennis_league, main_args.player_filter)
     else:
         printer = StatsPrinter(tennis_league, main_args.player_filter)
 
-    if main_args.print_match_scores:
-        printer.print_matches(play_type, LeagueIndex(main_args.match_index))
-    printer.print_rankings(play_type, "%s stats" % play_type, LeagueIndex(main_args.match_index))
+    with Profiler.phase("print"):
+        if main_args.print_match_scores:
+            printer.print_matches(play_type, compute_index)
+
+        if main_args.match_index.is_single():
+            printer.print_rankings(play_type, "%s stats" % play_type, compute_index)
+        else:
+            for index in indexes:
+                printer.print_rankings(play_type, "%s stats as of league match index %d" % (play_type, index), index)
+
+
+def show_compute_trace(main_args):
+    import json
+    from ComputeTrace import ComputeTrace
+
+    for record in ComputeTrace.read(main_args.trace_file):
+        if main_args.first is not None and record['league_match_index'] < main_args.first:
+            continue
+        if main_args.last is not None and record['league_match_index'] > main_args.last:
+            continue
+        if not ComputeTrace.is_in_filter(record, main_args.player_filter):
+            continue
+
+        if main_args.jsonl:
+            print(json.dumps(record))
+        else:
+            for line in ComputeTrace.format_record(record):
+                print(line)
+
+
+def explain(main_args):
+    from MatchExplanations import MatchExplanations
+
+    match_explanations = MatchExplanations.load(main_args.snapshot)
+    explanations = match_explanations.get_explanations(main_args.player, main_args.explain_match_index)
+    if len(explanations) == 0 and main_args.explain_match_index is None:
+        raise Exception("%s has no recorded matches" % main_args.player)
+    if len(explanations) == 0:
+        raise Exception("%s didn't play league match index %d" % (main_args.player, main_args.explain_match_index))
+
+    for explanation in explanations:
+        for line in match_explanations.format_explanation(explanation):
+            print(line)
 
 
 def main(main_args):
     if main_args.cmd == "demo_csv":
-        importer.csv.dump_sample(main_args.seed)
+        with Profiler.phase("demo csv import"):
+            import importer.csv_format
+
+        with Profiler.phase("demo csv dump"):
+            if main_args.synthetic:
+                importer.csv_format.dump_league(main_args.seed,
+                                                nb_players=main_args.players,
+                                                nb_matches=main_args.matches,
+                                                doubles_ratio=main_args.doubles_ratio,
+                                                level_change_rate=main_args.level_change_rate,
+                                                replacement_rate=main_args.replacement_rate,
+                                                skew=main_args.skew)
+            else:
+                importer.csv_format.dump_sample(main_args.seed)
+    elif main_args.cmd == "compute_trace":
+        show_compute_trace(main_args)
+    elif main_args.cmd == "explain":
+        explain(main_args)
     else:
+        with Profiler.phase("league model import"):
+            from League import League
+            from interfaces import PlayingEntity
+            from importer.cache import ParseCache
+            import importer.csv
+
         play_type = PlayingEntity.PlayType.SINGLES
         if main_args.doubles:
             play_type = PlayingEntity.PlayType.DOUBLES
 
+        cache = None
+        cache_dir = ParseCache.get_cache_dir(main_args.cache_dir)
+        if cache_dir is not None:
+            cache = ParseCache(cache_dir, main_args.parse_cache_size * (1 << 20))
+
         tennis_league = League()
-        importer.csv.init_league(main_args.csv, tennis_league)
+        Counters.set_scope("csv parse")
+        with Profiler.phase("csv parse"):
+            records = importer.csv.init_league(main_args.csv, tennis_league, cache)
 
         if main_args.list_players:
             list_players_in_csv_format(tennis_league)
         else:
-            compute_and_show_standings(main_args, tennis_league, play_type)
+            compute_and_show_standings(main_args, tennis_league, play_type, cache, records)
 
         # For testing:
         return tennis_league
@@ -354,6 +870,14 @@ def main(main_args):
 
 if __name__ == "__main__":
     _args = parse_command_line()
+    if _args.profile:
+        Profiler.enable(_args.profile_dir)
+        Profiler.add_phase("startup import", IMPORT_TIME)
+    if _args.counters:
+        Counters.enable()
+        atexit.register(Counters.print_summary)
+    if _args.trace is not None:
+        Tracer.enable(_args.trace_sample)
     try:
         main(_args)
     except Exception as global_e:
@@ -362,4 +886,8 @@ if __name__ == "__main__":
             import traceback
             traceback.print_exc()
         sys.exit(1)
+    if _args.profile:
+        Profiler.print_summary(_args.profile_top)
+    if _args.trace is not None:
+        Tracer.write(_args.trace)
     sys.exit(0)
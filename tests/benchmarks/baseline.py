@@ -0,0 +1,113 @@
+"""
+Regression gate: compares a benchmark report with the one stored in a baseline file.
+
+The baseline file holds one report per benchmark, along with per benchmark tolerances:
+
+    {
+        "tolerances": {"scaling": {"relative": 0.5, "absolute": 0.005}, ...},
+        "reports": {"scaling": {...}, ...}
+    }
+
+A measure regresses when it is both 'relative' times and 'absolute' units (seconds, bytes or ns) above
+its baseline value, the absolute part keeping noise on tiny measures from failing the gate.
+"""
+import json
+import os
+
+from tests.benchmarks.common import *
+
+BASELINE_FILE = os.path.join(benchmarks_path, "baseline.json")
+
+DEFAULT_TOLERANCES = {
+    'scaling': {'relative': 0.5, 'absolute': 0.005},
+    'memory': {'relative': 0.1, 'absolute': 65536},
+    'micro': {'relative': 0.5, 'absolute': 100},
+    'startup': {'relative': 0.5, 'absolute': 0.02},
+}
+
+
+def _scaling_measures(result):
+    key = "%s: players=%d matches=%d doubles_ratio=%.2f" % (result['series'], result['players'],
+                                                            result['matches'], result['doubles_ratio'])
+    return [(key, phase, seconds) for phase, seconds in sorted(result['phases'].items())]
+
+
+def _memory_measures(result):
+    key = "players=%d matches=%d doubles_ratio=%.2f" % (result['players'], result['matches'], result['doubles_ratio'])
+    return [(key, 'peak', result['peak']), (key, 'retained', result['retained'])]
+
+
+def _micro_measures(result):
+    return [("history_length=%d" % result['history_length'], result['primitive'], result['ns_per_op'])]
+
+
+def _startup_measures(result):
+    return [(result['command'], 'seconds', result['seconds'])]
+
+
+_MEASURES = {
+    'scaling': _scaling_measures,
+    'memory': _memory_measures,
+    'micro': _micro_measures,
+    'startup': _startup_measures,
+}
+
+_UNITS = {
+    'scaling': lambda v: "%.4fs" % v,
+    'memory': lambda v: "%.1fKiB" % (v / 1024.0),
+    'micro': lambda v: "%.0fns" % v,
+    'startup': lambda v: "%.4fs" % v,
+}
+
+
+def load_baseline(file_name=BASELINE_FILE):
+    if not os.path.exists(file_name):
+        return {'tolerances': dict(DEFAULT_TOLERANCES), 'reports': dict()}
+    with open(file_name, 'r') as fd:
+        return json.load(fd)
+
+
+def update_baseline(report, file_name=BASELINE_FILE):
+    """
+    Stores report as the baseline of its benchmark, other benchmarks' baseline are kept.
+    """
+    baseline = load_baseline(file_name)
+    baseline['tolerances'].setdefault(report['benchmark'], DEFAULT_TOLERANCES[report['benchmark']])
+    baseline['reports'][report['benchmark']] = report
+    write_report(baseline, file_name)
+
+
+def _measures(report):
+    return dict([((key, name), value)
+                 for result in report['results']
+                 for key, name, value in _MEASURES[report['benchmark']](result)])
+
+
+def compare(report, file_name=BASELINE_FILE):
+    """
+    Returns the list of regressions of report against the baseline, as printable lines.
+    """
+    benchmark = report['benchmark']
+    baseline = load_baseline(file_name)
+    if benchmark not in baseline['reports']:
+        raise Exception("No %s baseline in %s, create one with --update-baseline" % (benchmark, file_name))
+
+    old_report = baseline['reports'][benchmark]
+    if old_report.get('quick') != report.get('quick'):
+        raise Exception("%s baseline in %s was run %s --quick, run the benchmark the same way" %
+                        (benchmark, file_name, "with" if old_report.get('quick') else "without"))
+
+    tolerance = baseline['tolerances'].get(benchmark, DEFAULT_TOLERANCES[benchmark])
+    old_measures = _measures(old_report)
+    unit = _UNITS[benchmark]
+
+    regressions = []
+    for (key, name), new in sorted(_measures(report).items()):
+        if (key, name) not in old_measures:
+            continue
+        old = old_measures[(key, name)]
+        if new > old * (1 + tolerance['relative']) and new - old > tolerance['absolute']:
+            increase = (new - old) * 100.0 / old if old != 0 else float('inf')
+            regressions.append("%s [%s] %s: %s -> %s (%+.0f%%)" %
+                               (benchmark, key, name, unit(old), unit(new), increase))
+    return regressions
@@ -0,0 +1,91 @@
+"""
+Helpers shared by the benchmarks, see run-benchmarks.py.
+"""
+import importlib
+import json
+import math
+import os
+import platform
+import sys
+import time
+
+benchmarks_path = os.path.abspath(os.path.dirname(__file__))
+root_path = os.path.abspath(os.path.join(benchmarks_path, "..", ".."))
+sys.path.append(root_path)
+
+League = importlib.import_module("League")
+Match = importlib.import_module("Match")
+importer = importlib.import_module("importer.csv")
+
+
+def new_league():
+    """
+    League and Match are singletons, reset them to build a new league.
+    """
+    League.League._SINGLETON = None
+    Match.Match.LEAGUE = None
+    return League.League()
+
+
+def generate_league_csv(file_name, players, matches, doubles_ratio, seed=0, skew=0.0):
+    with open(file_name, 'w') as fd:
+        importer.dump_league(seed,
+                             nb_players=players,
+                             nb_matches=matches,
+                             doubles_ratio=doubles_ratio,
+                             level_change_rate=0.01,
+                             replacement_rate=0.0,
+                             skew=skew,
+                             out=fd)
+
+
+def best_time(f, repeat):
+    """
+    Returns the best wall clock time out of 'repeat' calls to f, along with f's last return value.
+    """
+    best = None
+    result = None
+    for _ in range(0, repeat):
+        start = time.perf_counter()
+        result = f()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def fit_exponent(sizes, times):
+    """
+    Least square fit of 'time = a * size^exponent' in log-log space. Returns None if it can't be fitted.
+    """
+    points = [(math.log(s), math.log(t)) for s, t in zip(sizes, times) if s > 0 and t > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(p[0] for p in points) / len(points)
+    mean_y = sum(p[1] for p in points) / len(points)
+    var_x = sum((p[0] - mean_x) ** 2 for p in points)
+    if var_x == 0:
+        return None
+    return sum((p[0] - mean_x) * (p[1] - mean_y) for p in points) / var_x
+
+
+def new_report(benchmark):
+    return {
+        'benchmark': benchmark,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': [],
+    }
+
+
+def write_report(report, file_name=None):
+    """
+    Writes the JSON report to given file, standard output if None.
+    """
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if file_name is None:
+        print(output)
+    else:
+        with open(file_name, 'w') as fd:
+            fd.write(output)
+            fd.write("\n")
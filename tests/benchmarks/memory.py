@@ -0,0 +1,254 @@
+"""
+Memory footprint benchmark: builds synthetic leagues of growing size, computes both play types and reports
+peak and retained bytes (traced with tracemalloc), along with the retained bytes attributed to each
+subsystem:
+
+    matches                 League's match logs, see MatchLog
+    stats.<tag>             Each Stats column (StatsData or RankHistory), summed over all playing entities
+    stats.cumulative        Per match league indexes and cumulative sums used by the '_at' getters
+    index_caches            Stats' SmartIndexCache, summed over all playing entities
+    players                 Player objects, without their Stats
+    doubles_teams           DoublesTeam objects, without their Stats
+    other                   Retained bytes not reachable from the above
+
+Attribution walks the object graph in that order and counts each object once, so objects shared between
+subsystems (e.g. the PlayerIndex keys of a Stats' columns) are attributed to the first one reaching them.
+Objects which weren't allocated while building the league (e.g. small ints) aren't counted.
+
+Bytes allocated per computed match are also measured, on a separate compute: the peak memory traced while
+a match is computed above what was traced before it, averaged over the matches. Computing a match only
+stores its results, whatever the number of playing entities, so it has to stay within a budget, see
+over_budget.
+"""
+import gc
+import importlib
+import logging
+import os
+import sys
+import tempfile
+import tracemalloc
+import types
+from array import array
+from enum import Enum
+
+from tests.benchmarks.common import *
+
+interfaces = importlib.import_module("interfaces")
+ScoreProcessor = importlib.import_module("ScoreProcessor")
+DoublesTeam = importlib.import_module("DoublesTeam")
+score = importlib.import_module("score")
+
+SINGLES = interfaces.PlayingEntity.PlayType.SINGLES
+DOUBLES = interfaces.PlayingEntity.PlayType.DOUBLES
+
+SIZES = [
+    {'players': 8, 'matches': 250, 'doubles_ratio': 0.5},
+    {'players': 12, 'matches': 500, 'doubles_ratio': 0.5},
+    {'players': 16, 'matches': 1000, 'doubles_ratio': 0.5},
+    {'players': 24, 'matches': 2000, 'doubles_ratio': 0.5},
+]
+
+QUICK_SIZES = [
+    {'players': 8, 'matches': 100, 'doubles_ratio': 0.5},
+    {'players': 16, 'matches': 200, 'doubles_ratio': 0.5},
+]
+
+# Bytes allocated per computed match, see over_budget
+MATCH_ALLOCATION_BUDGET = 2048
+
+# Objects shared by everything, never attributed
+_NOT_WALKED = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType, Enum)
+
+
+def _deep_size(root, seen, stop=()):
+    """
+    Size in bytes of root and everything reachable from it which isn't in 'seen' yet, 'seen' being updated.
+    The walk doesn't go through objects whose type is in 'stop'. Only objects traced by tracemalloc count.
+    """
+    size = 0
+    pending = [root]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, _NOT_WALKED) or (obj is not root and isinstance(obj, stop)):
+            continue
+        seen.add(id(obj))
+        if tracemalloc.get_object_traceback(obj) is not None:
+            size += sys.getsizeof(obj)
+
+        if isinstance(obj, dict):
+            pending.extend(obj.keys())
+            pending.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            pending.extend(obj)
+        elif isinstance(obj, (str, bytes, int, float, array)):
+            continue
+
+        if hasattr(obj, '__dict__'):
+            pending.append(obj.__dict__)
+        for slot in getattr(type(obj), '__slots__', ()):
+            if hasattr(obj, slot):
+                pending.append(getattr(obj, slot))
+    return size
+
+
+def _attribute(league):
+    """
+    Returns subsystem -> retained bytes, see module documentation.
+    """
+    seen = set()
+    # Everything reachable from the league which isn't walked on purpose is attributed to 'other'
+    seen.add(id(league))
+    seen.add(id(league.__dict__))
+
+    attribution = dict()
+    attribution['matches'] = _deep_size(league._match_logs, seen, stop=(interfaces.PlayingEntity,))
+
+    entities = [entity for play_type in [SINGLES, DOUBLES] for entity in league.iter_playing_entities(play_type)]
+    for entity in entities:
+        for tag, column in entity._stats._stats_data.items():
+            key = 'stats.%s' % tag
+            attribution[key] = attribution.get(key, 0) + _deep_size(column, seen)
+
+    for entity in entities:
+        stats = entity._stats
+        attribution['stats.cumulative'] = attribution.get('stats.cumulative', 0) + \
+            _deep_size(stats._league_indexes, seen) + _deep_size(stats._cumulative_data, seen)
+        attribution['index_caches'] = attribution.get('index_caches', 0) + _deep_size(stats._index_cache, seen)
+
+    for entity in entities:
+        key = 'doubles_teams' if isinstance(entity, DoublesTeam.DoublesTeam) else 'players'
+        # Remaining Stats attributes (e.g. the player match index) go with the entity
+        attribution[key] = attribution.get(key, 0) + _deep_size(entity, seen, stop=(interfaces.PlayingEntity,))
+
+    return attribution
+
+
+def _new_processor(league):
+    return ScoreProcessor.ScoreProcessor(league=league,
+                                         points_per_match=score.DEFAULT_POINTS_PER_MATCH,
+                                         ranking_factor_constant=score.RANKING_FACTOR_CONSTANT,
+                                         ranking_diff_factor_constant=score.RANKING_DIFF_FACTOR_CONSTANT,
+                                         league_break_in_score_factor=score.LEAGUE_BREAK_IN_SCORE_FACTOR,
+                                         ranking_factor_break_in_period=score.RANKING_FACTOR_BREAK_IN_PERIOD,
+                                         ignore_ranking_factors=False)
+
+
+class _MatchAllocationProbe:
+    """
+    Stands in for MatchExplanations, which ScoreProcessor.compute calls once per match (see
+    ScoreProcessor.set_match_explanations), to measure the memory each match allocates.
+    """
+    def __init__(self):
+        self.matches = 0
+        self.allocated = 0
+        self._start = None
+
+    def reset(self, play_type, points_per_match):
+        self.matches = 0
+        self.allocated = 0
+        self._start = None
+
+    def add(self, league_match_index, player1, player2, state):
+        current, peak = tracemalloc.get_traced_memory()
+        if self._start is not None:
+            self.matches += 1
+            self.allocated += peak - self._start
+        tracemalloc.reset_peak()
+        self._start = tracemalloc.get_traced_memory()[0]
+
+
+def _measure_match_allocations(csv_file):
+    """
+    Returns play type -> bytes allocated per computed match, see module documentation.
+    """
+    league = new_league()
+    importer.init_league(csv_file, league)
+    processor = _new_processor(league)
+    probe = _MatchAllocationProbe()
+    processor.set_match_explanations(probe)
+
+    allocations = dict()
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    tracemalloc.start()
+    try:
+        for play_type in [SINGLES, DOUBLES]:
+            processor.compute(interfaces.LeagueIndex(-1), play_type)
+            allocations[str(play_type)] = probe.allocated / probe.matches if probe.matches != 0 else 0.0
+    finally:
+        tracemalloc.stop()
+        if gc_enabled:
+            gc.enable()
+    return allocations
+
+
+def _measure(csv_file):
+    """
+    Builds and computes a league from csv_file under tracemalloc, returns its memory measures.
+    """
+    result = dict()
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    league = new_league()
+    importer.init_league(csv_file, league)
+    gc.collect()
+    result['retained_after_init_league'] = tracemalloc.get_traced_memory()[0] - baseline
+
+    processor = _new_processor(league)
+    for play_type in [SINGLES, DOUBLES]:
+        processor.compute(interfaces.LeagueIndex(-1), play_type)
+    del processor
+    gc.collect()
+
+    current, peak = tracemalloc.get_traced_memory()
+    result['retained'] = current - baseline
+    result['peak'] = peak - baseline
+
+    result['subsystems'] = _attribute(league)
+    result['subsystems']['other'] = result['retained'] - sum(result['subsystems'].values())
+    tracemalloc.stop()
+    result['playing_entities'] = dict([(str(play_type), len(list(league.iter_playing_entities(play_type))))
+                                       for play_type in [SINGLES, DOUBLES]])
+    return result
+
+
+def run(quick=False, repeat=3):
+    """
+    Memory measures are deterministic, 'repeat' is ignored.
+    """
+    report = new_report('memory')
+
+    # Replacement players and such are logged on import
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in QUICK_SIZES if quick else SIZES:
+            csv_file = os.path.join(tmp_dir, "league-%(players)d-%(matches)d-%(doubles_ratio).2f.csv" % size)
+            generate_league_csv(csv_file, size['players'], size['matches'], size['doubles_ratio'])
+
+            result = dict(size)
+            result.update(_measure(csv_file))
+            result['allocated_bytes_per_match'] = _measure_match_allocations(csv_file)
+            report['results'].append(result)
+
+    logging.disable(logging.NOTSET)
+
+    return report
+
+
+def over_budget(report):
+    """
+    Returns the league sizes whose matches allocate more than MATCH_ALLOCATION_BUDGET bytes each, as
+    printable lines.
+    """
+    failures = []
+    for result in report['results']:
+        for play_type, allocated in sorted(result['allocated_bytes_per_match'].items()):
+            if allocated > MATCH_ALLOCATION_BUDGET:
+                failures.append("memory [players=%d matches=%d doubles_ratio=%.2f] %s: %.0f bytes allocated per "
+                                "match, over its %d bytes budget" % (result['players'], result['matches'],
+                                                                     result['doubles_ratio'], play_type, allocated,
+                                                                     MATCH_ALLOCATION_BUDGET))
+    return failures
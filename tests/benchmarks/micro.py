@@ -0,0 +1,130 @@
+"""
+Microbenchmarks of the index machinery primitives (SmartIndex, SmartIndexCache, StatsData, Stats), measured
+in isolation at different history lengths. Reports time per call (ns/op) and bytes allocated per call
+(allocated bytes/op, measured with tracemalloc on a separate run).
+"""
+import gc
+import importlib
+import timeit
+import tracemalloc
+
+from tests.benchmarks.common import *
+
+SmartIndex = importlib.import_module("utils.SmartIndex")
+Stats = importlib.import_module("Stats")
+
+HISTORY_LENGTHS = [10, 1000, 100000]
+QUICK_HISTORY_LENGTHS = [10, 1000]
+
+# Number of calls per measure, scaled down for long histories where some primitives are O(n)
+MIN_CALLS = 5
+TARGET_SECONDS = 0.2
+
+
+def _stats_with_history(length):
+    """
+    Stats of an entity which has played every other league match, with points set for each match.
+    """
+    stats = Stats.Stats(0.0, 1.0)
+    for i in range(1, length + 1):
+        league_index = SmartIndex.LeagueIndex(2 * i, locked=True)
+        stats.set_match_results(6, 3, league_index)
+        stats.set_data('match_points', 1.0, league_index)
+    return stats
+
+
+def _cache_with_history(length):
+    cache = SmartIndex.SmartIndexCache()
+    for i in range(1, length + 1):
+        cache.add_index(SmartIndex.LeagueIndex(2 * i), SmartIndex.PlayerIndex(i))
+    return cache
+
+
+def _stats_data_with_history(length):
+    data = Stats.StatsData('ranking', int, extendable=True)
+    for i in range(0, length + 1):
+        data[SmartIndex.PlayerIndex(i)] = i
+    return data
+
+
+def _primitives(length):
+    """
+    Returns name -> callable for every primitive, set up with a history of given length.
+    """
+    stats = _stats_with_history(length)
+    cache = _cache_with_history(length)
+    stats_data = _stats_data_with_history(length)
+
+    index = SmartIndex.PlayerIndex(length // 2)
+    existing_league_index = SmartIndex.LeagueIndex(length)
+    missing_league_index = SmartIndex.LeagueIndex(length + 1)
+    missing_player_index = SmartIndex.PlayerIndex(length + 1)
+    missing_player_index.set_no_exists()
+
+    return {
+        'SmartIndex.__hash__': lambda: hash(index),
+        'SmartIndex.get_locked_copy': lambda: index.get_locked_copy(),
+        'SmartIndexCache.get_index_for_type(existing)':
+            lambda: cache.get_index_for_type(existing_league_index, SmartIndex.IndexType.PLAYER),
+        'SmartIndexCache.get_index_for_type(missing)':
+            lambda: cache.get_index_for_type(missing_league_index, SmartIndex.IndexType.PLAYER),
+        'SmartIndexCache.get_latest_valid_index': lambda: cache.get_latest_valid_index(missing_league_index),
+        'StatsData.__getitem__(existing)': lambda: stats_data[index],
+        'StatsData.__getitem__(extendable fallback)': lambda: stats_data[missing_player_index],
+        'Stats.get_cumulative_data_sum_for_index':
+            lambda: stats.get_cumulative_data_sum_for_index('match_points', index=existing_league_index),
+        'Stats.get_cumulative_data_at':
+            lambda: stats.get_cumulative_data_at('match_points', missing_league_index),
+        'Stats.get_number_of_match_played_by_league_index_time':
+            lambda: stats.get_number_of_match_played_by_league_index_time(index=missing_league_index),
+        'Stats.get_number_of_match_played_at': lambda: stats.get_number_of_match_played_at(missing_league_index),
+    }
+
+
+def _calls_for(f):
+    # Calibrate the number of calls on a single one, some primitives are O(n)
+    calls = int(TARGET_SECONDS / max(timeit.timeit(f, number=1), 1e-9))
+    return min(max(MIN_CALLS, calls), 1000000)
+
+
+def _ns_per_op(f, calls, repeat):
+    return min(timeit.repeat(f, number=calls, repeat=repeat)) / calls * 1e9
+
+
+def _allocated_bytes_per_op(f, calls):
+    """
+    Peak memory traced while each call runs, above what was traced before it: temporary allocations count,
+    e.g. a list sorted and dropped within the call, not only what the call returns. Results aren't kept and
+    the garbage collector is disabled, so that neither adds to the following calls' measure.
+    """
+    f()
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    tracemalloc.start()
+    allocated = 0
+    try:
+        for _ in range(0, calls):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            f()
+            allocated += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+        if gc_enabled:
+            gc.enable()
+    return allocated / calls
+
+
+def run(quick=False, repeat=3):
+    report = new_report('micro')
+    report['history_lengths'] = QUICK_HISTORY_LENGTHS if quick else HISTORY_LENGTHS
+
+    for length in report['history_lengths']:
+        for name, f in sorted(_primitives(length).items()):
+            calls = _calls_for(f)
+            report['results'].append({'primitive': name,
+                                      'history_length': length,
+                                      'ns_per_op': _ns_per_op(f, calls, repeat),
+                                      'allocated_bytes_per_op': _allocated_bytes_per_op(f, min(calls, 100))})
+
+    return report
@@ -0,0 +1,137 @@
+"""
+End-to-end scaling benchmark: times each phase of an 'input_csv' run on synthetic leagues of increasing
+size (players x matches x doubles share), then fits how each phase scales with the varied parameter.
+"""
+import contextlib
+import importlib
+import io
+import logging
+import os
+import tempfile
+import time
+
+from tests.benchmarks.common import *
+
+interfaces = importlib.import_module("interfaces")
+ScoreProcessor = importlib.import_module("ScoreProcessor")
+StatsPrinter = importlib.import_module("StatsPrinter")
+score = importlib.import_module("score")
+
+SINGLES = interfaces.PlayingEntity.PlayType.SINGLES
+DOUBLES = interfaces.PlayingEntity.PlayType.DOUBLES
+
+PHASES = ['init_league',
+          'generate_doubles_team_combination',
+          'compute_singles',
+          'compute_doubles',
+          'print_rankings_singles',
+          'print_rankings_doubles',
+          'csv_print_rankings_singles',
+          'csv_print_rankings_doubles']
+
+# Each series varies one parameter, the others being fixed
+SERIES = [
+    {'name': 'matches', 'players': [12], 'matches': [250, 500, 1000, 2000], 'doubles_ratio': [0.5]},
+    {'name': 'players', 'players': [8, 16, 32, 64], 'matches': [500], 'doubles_ratio': [0.5]},
+    {'name': 'doubles_ratio', 'players': [12], 'matches': [1000], 'doubles_ratio': [0.25, 0.5, 0.75]},
+]
+
+QUICK_SERIES = [
+    {'name': 'matches', 'players': [8], 'matches': [50, 100, 200], 'doubles_ratio': [0.5]},
+    {'name': 'players', 'players': [6, 12, 24], 'matches': [100], 'doubles_ratio': [0.5]},
+]
+
+
+def _new_processor(league):
+    return ScoreProcessor.ScoreProcessor(league=league,
+                                         points_per_match=score.DEFAULT_POINTS_PER_MATCH,
+                                         ranking_factor_constant=score.RANKING_FACTOR_CONSTANT,
+                                         ranking_diff_factor_constant=score.RANKING_DIFF_FACTOR_CONSTANT,
+                                         league_break_in_score_factor=score.LEAGUE_BREAK_IN_SCORE_FACTOR,
+                                         ranking_factor_break_in_period=score.RANKING_FACTOR_BREAK_IN_PERIOD,
+                                         ignore_ranking_factors=False)
+
+
+def _time_phases(csv_file):
+    """
+    Runs all phases once, returns their wall clock time in seconds.
+    'init_league' doesn't include the doubles team generation it triggers, which is timed on its own.
+    """
+    phases = dict()
+    league = new_league()
+
+    doubles_generation_time = [0.0]
+    generate_doubles_team_combination = league.generate_doubles_team_combination
+
+    def timed_generate_doubles_team_combination():
+        start = time.perf_counter()
+        generate_doubles_team_combination()
+        doubles_generation_time[0] += time.perf_counter() - start
+
+    league.generate_doubles_team_combination = timed_generate_doubles_team_combination
+
+    start = time.perf_counter()
+    importer.init_league(csv_file, league)
+    phases['init_league'] = time.perf_counter() - start - doubles_generation_time[0]
+    phases['generate_doubles_team_combination'] = doubles_generation_time[0]
+
+    processor = _new_processor(league)
+    for play_type, suffix in [(SINGLES, 'singles'), (DOUBLES, 'doubles')]:
+        start = time.perf_counter()
+        processor.compute(interfaces.LeagueIndex(-1), play_type)
+        phases['compute_%s' % suffix] = time.perf_counter() - start
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for printer_type, prefix in [(StatsPrinter.StatsPrinter, ''), (StatsPrinter.CsvStatsPrinter, 'csv_')]:
+            for play_type, suffix in [(SINGLES, 'singles'), (DOUBLES, 'doubles')]:
+                start = time.perf_counter()
+                printer_type(league).print_rankings(play_type, "%s stats" % play_type)
+                phases['%sprint_rankings_%s' % (prefix, suffix)] = time.perf_counter() - start
+
+    return phases
+
+
+def run(quick=False, repeat=3):
+    report = new_report('scaling')
+    report['scaling'] = dict()
+
+    # Replacement players and such are logged on import
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for series in QUICK_SERIES if quick else SERIES:
+            sizes = []
+            phase_times = dict([(phase, []) for phase in PHASES])
+
+            for players in series['players']:
+                for matches in series['matches']:
+                    for doubles_ratio in series['doubles_ratio']:
+                        csv_file = os.path.join(tmp_dir, "league-%d-%d-%.2f.csv" % (players, matches, doubles_ratio))
+                        generate_league_csv(csv_file, players, matches, doubles_ratio)
+
+                        best = dict()
+                        for _ in range(0, repeat):
+                            for phase, seconds in _time_phases(csv_file).items():
+                                best[phase] = min(seconds, best.get(phase, seconds))
+
+                        report['results'].append({'series': series['name'],
+                                                  'players': players,
+                                                  'matches': matches,
+                                                  'doubles_ratio': doubles_ratio,
+                                                  'phases': best})
+
+                        sizes.append({'players': players, 'matches': matches,
+                                      'doubles_ratio': doubles_ratio}[series['name']])
+                        for phase in PHASES:
+                            phase_times[phase].append(best[phase])
+
+            report['scaling'][series['name']] = {
+                'sizes': sizes,
+                'phases': dict([(phase, {'seconds': phase_times[phase],
+                                         'exponent': fit_exponent(sizes, phase_times[phase])})
+                                for phase in PHASES])
+            }
+
+    logging.disable(logging.NOTSET)
+
+    return report
@@ -0,0 +1,81 @@
+"""
+Startup benchmark: wall clock time of short score.py invocations, each in a new interpreter, along with the
+project modules they imported. Commands which don't need the league model have to stay within a time budget
+on top of the bare interpreter's startup time, see over_budget.
+"""
+import subprocess
+import tempfile
+
+from tests.benchmarks.common import *
+
+SCORE_FILE = os.path.join(root_path, "score.py")
+SAMPLE_CSV = os.path.join(root_path, "tests", "score-processor.csv")
+
+# Command name -> (score.py arguments, seconds allowed on top of the bare interpreter's startup or None)
+COMMANDS = {
+    'help': (['-h'], 0.05),
+    'demo_csv': (['demo_csv'], 0.05),
+    'input_csv': (['input_csv', SAMPLE_CSV], None),
+}
+
+RUNS = 20
+QUICK_RUNS = 5
+
+# Reports the project modules (not under the standard library) imported by the command
+_MODULES_PROBE = """
+import runpy
+import sys
+sys.argv = [%(score)r] + %(args)r
+try:
+    runpy.run_path(%(score)r, run_name='__main__')
+except SystemExit:
+    pass
+with open(%(output)r, 'w') as fd:
+    fd.write("\\n".join(sorted(name for name, module in sys.modules.items()
+                                if (getattr(module, '__file__', None) or "").startswith(%(root)r))))
+"""
+
+
+def _run_seconds(command, runs):
+    return best_time(lambda: subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                            check=False), runs)[0]
+
+
+def _project_modules(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output = os.path.join(tmp_dir, "modules")
+        probe = _MODULES_PROBE % {'score': SCORE_FILE, 'args': args, 'root': root_path, 'output': output}
+        subprocess.run([sys.executable, "-c", probe], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       cwd=root_path, check=True)
+        with open(output, 'r') as fd:
+            return [name for name in fd.read().split("\n") if name != ""]
+
+
+def run(quick=False, repeat=3):
+    report = new_report('startup')
+    runs = QUICK_RUNS if quick else RUNS
+    # Best of 'repeat' sets of runs, startup times being short and noisy
+    runs *= repeat
+
+    report['interpreter'] = _run_seconds([sys.executable, "-c", "pass"], runs)
+    for name, (args, budget) in sorted(COMMANDS.items()):
+        report['results'].append({'command': name,
+                                  'seconds': _run_seconds([sys.executable, SCORE_FILE] + args, runs),
+                                  'budget': budget,
+                                  'modules': _project_modules(args)})
+    return report
+
+
+def over_budget(report):
+    """
+    Returns the commands over their time budget, as printable lines.
+    """
+    failures = []
+    for result in report['results']:
+        if result['budget'] is None:
+            continue
+        allowed = report['interpreter'] + result['budget']
+        if result['seconds'] > allowed:
+            failures.append("startup [%s]: %.4fs, over its %.4fs budget (imported %s)" %
+                            (result['command'], result['seconds'], allowed, ", ".join(result['modules'])))
+    return failures
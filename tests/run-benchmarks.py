@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks, results are reported as JSON.
+
+    run-benchmarks.py scaling               End-to-end phase timings on synthetic leagues of increasing size.
+    run-benchmarks.py micro                 Per call cost of SmartIndex, SmartIndexCache and Stats primitives.
+    run-benchmarks.py memory                Peak and retained memory, attributed per subsystem, and bytes
+                                            allocated per computed match, fails if over budget.
+    run-benchmarks.py startup               score.py startup time and imported modules, fails if over budget.
+
+Regression gate, against tests/benchmarks/baseline.json unless a file is given:
+    run-benchmarks.py --quick scaling --update-baseline
+                                            Stores the results as the scaling baseline.
+    run-benchmarks.py --quick scaling --compare
+                                            Fails listing the measures above the baseline's tolerances.
+Baseline timings are those of the machine they were recorded on, update them before comparing on another one.
+'run-coverage.py --benchmarks' runs the comparison for the scaling, memory and startup benchmarks.
+"""
+import argparse
+import os
+import sys
+
+test_path = os.path.abspath(os.path.dirname(__file__))
+root_path = os.path.abspath(os.path.join(test_path, ".."))
+sys.path.append(root_path)
+
+BASELINE_FILE = os.path.join(test_path, "benchmarks", "baseline.json")
+
+
+def parse_command_line(command_line_args=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description="Tennis score performance benchmarks",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog=__doc__)
+
+    parser.add_argument("benchmark",
+                        choices=['scaling', 'micro', 'memory', 'startup'],
+                        help="Benchmark to run.")
+
+    parser.add_argument("--quick",
+                        dest="quick",
+                        action="store_true",
+                        help="Run smaller sizes, for a quick sanity check.",
+                        default=False)
+
+    parser.add_argument("--repeat",
+                        dest="repeat",
+                        type=int,
+                        help="Number of runs per measure, the best one is kept. Defaults to 3.",
+                        default=3)
+
+    parser.add_argument("-o", "--output",
+                        dest="output",
+                        type=str,
+                        help="JSON report file, defaults to standard output.",
+                        default=None)
+
+    parser.add_argument("--compare",
+                        dest="compare",
+                        nargs='?',
+                        const=BASELINE_FILE,
+                        metavar="BASELINE",
+                        help="Compare the results with the baseline file and fail on regressions.",
+                        default=None)
+
+    parser.add_argument("--update-baseline",
+                        dest="update_baseline",
+                        nargs='?',
+                        const=BASELINE_FILE,
+                        metavar="BASELINE",
+                        help="Store the results as the benchmark's baseline.",
+                        default=None)
+
+    return parser.parse_args(command_line_args)
+
+
+if __name__ == "__main__":
+    args = parse_command_line()
+
+    from tests.benchmarks import baseline, common
+
+    if args.benchmark == 'scaling':
+        from tests.benchmarks import scaling
+        report = scaling.run(quick=args.quick, repeat=args.repeat)
+    elif args.benchmark == 'micro':
+        from tests.benchmarks import micro
+        report = micro.run(quick=args.quick, repeat=args.repeat)
+    elif args.benchmark == 'memory':
+        from tests.benchmarks import memory
+        report = memory.run(quick=args.quick, repeat=args.repeat)
+    elif args.benchmark == 'startup':
+        from tests.benchmarks import startup
+        report = startup.run(quick=args.quick, repeat=args.repeat)
+
+    report['quick'] = args.quick
+    common.write_report(report, args.output)
+
+    if args.update_baseline:
+        baseline.update_baseline(report, args.update_baseline)
+
+    if args.compare:
+        regressions = baseline.compare(report, args.compare)
+        if regressions:
+            print("%d performance regression(s) against %s:" % (len(regressions), args.compare), file=sys.stderr)
+            for regression in regressions:
+                print("    %s" % regression, file=sys.stderr)
+            sys.exit(1)
+
+    if args.benchmark == 'memory':
+        failures = memory.over_budget(report)
+        if failures:
+            print("%d league size(s) over their per match allocation budget:" % len(failures), file=sys.stderr)
+            for failure in failures:
+                print("    %s" % failure, file=sys.stderr)
+            sys.exit(1)
+
+    if args.benchmark == 'startup':
+        failures = startup.over_budget(report)
+        if failures:
+            print("%d command(s) over their startup time budget:" % len(failures), file=sys.stderr)
+            for failure in failures:
+                print("    %s" % failure, file=sys.stderr)
+            sys.exit(1)
@@ -19,6 +19,8 @@ failure_messages = []
 OUTPUT_BUFFER = io.StringIO()
 REFERENCE_COVERAGE_OUTPUT = "coverage-run-output-golden.txt"
 NEW_COVERAGE_OUTPUT = "coverage-run-output-new.txt"
+BENCHMARKS = ["scaling", "memory", "startup"]
+BENCHMARKS_OPTION = "--benchmarks"
 
 
 def run_command(cmd, expected_success=True, exit_on_fail=True):
@@ -42,9 +44,26 @@ def run_command(cmd, expected_success=True, exit_on_fail=True):
             sys.exit(1)
 
 
+def run_benchmark_gate():
+    """
+    Compares quick benchmark runs with tests/benchmarks/baseline.json. Run outside of coverage, and kept
+    out of the golden output since timings vary from run to run. The baseline's timings are those of the
+    machine it was recorded on, so the gate is only run if asked for, see BENCHMARKS_OPTION.
+    """
+    benchmark_file_path = os.path.join(test_path, "run-benchmarks.py")
+    for benchmark in BENCHMARKS:
+        cmd = "%s %s --quick %s --compare -o %s" % (sys.executable, benchmark_file_path, benchmark, os.devnull)
+        print("Running: %s" % cmd)
+        process = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        if process.returncode != 0:
+            failure_messages.append("%s failed:\n%s" % (cmd, process.stdout.decode('utf-8')))
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 1:
-        print("Usage: 'run-coverage.py' without arguments")
+    if sys.argv[1:] not in [[], [BENCHMARKS_OPTION]]:
+        print("Usage: 'run-coverage.py [%s]'" % BENCHMARKS_OPTION)
+        print("%s also compares quick benchmark runs with the baseline timings, recorded on another machine "
+              "than yours unless updated, see run-benchmarks.py." % BENCHMARKS_OPTION)
         print("Run 'score.py demo_csv --seed 0' for a sample player data csv file.")
         sys.exit(0)
 
@@ -94,6 +113,10 @@ if __name__ == "__main__":
                         expected_success=False)
             run_command("coverage run -a %s -v input_csv -p math %s" % (score_file_path, csv_file))
 
+        if BENCHMARKS_OPTION in sys.argv:
+            print("RUNNING BENCHMARK REGRESSION GATE")
+            run_benchmark_gate()
+
     run_command("coverage html")
     path = os.path.join(root_path, "htmlcov/index.html")
     p = pathlib.PurePath(path)
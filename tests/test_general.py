@@ -4,6 +4,10 @@ import unittest
 import os
 import sys
 import importlib
+import io
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 utils = importlib.import_module("utils")
@@ -13,8 +17,13 @@ League = importlib.import_module("League")
 Player = importlib.import_module("Player")
 DoublesTeam = importlib.import_module("DoublesTeam")
 Match = importlib.import_module("Match")
+MatchLog = importlib.import_module("MatchLog")
+importer = importlib.import_module("importer.csv")
+importer_format = importlib.import_module("importer.csv_format")
+cache = importlib.import_module("importer.cache")
 
 from interfaces import *
+from utils.counters import Counters
 
 CSV = os.path.join(os.path.dirname(__file__), 'league-avg-ppm.csv')
 
@@ -79,6 +88,293 @@ class TestGeneral(unittest.TestCase):
             Match.Match(PlayingEntity.DOUBLES_NAME_FORMAT.format("player_a", "player_b"), 0,
                         PlayingEntity.DOUBLES_NAME_FORMAT.format("player_b", "player_c"), 0)
 
+    def test_playing_entity_ids(self):
+        entities = [self.tennis_league.get_playing_entity_by_id(i) for i in range(4)]
+        self.assertEqual([e.get_name() for e in entities], ["player_a", "player_b", "player_c", "player_d"])
+        for entity_id, entity in enumerate(entities):
+            self.assertEqual(entity.id, entity_id)
+            self.assertEqual(self.tennis_league.get_playing_entity_id(entity.get_name()), entity_id)
+        with self.assertRaises(PlayingEntityDoesNotExistError):
+            self.tennis_league.get_playing_entity_id("player_z")
+
+        match = next(self.tennis_league.iter_matches(PlayingEntity.PlayType.SINGLES))
+        self.assertEqual([match.get_entity_id(1), match.get_entity_id(2)],
+                         [entities[0].id, entities[1].id])
+        self.assertEqual([match.get_entity_games_won(1), match.get_entity_games_won(2)],
+                         [match.get_games_won("player_a"), match.get_games_lost("player_a")])
+
+    def test_match_log(self):
+        play_type = PlayingEntity.PlayType.SINGLES
+        match_log = self.tennis_league.get_match_log(play_type)
+        nb_matches = len(match_log)
+        self.assertEqual(self.tennis_league.last_match_index(play_type), nb_matches)
+        self.assertEqual(self.tennis_league.last_match_index(PlayingEntity.PlayType.DOUBLES), -1)
+
+        self.tennis_league.insert_match(LeagueIndex(2), Match.Match("player_c", 3, "player_d", 1))
+        self.assertEqual(self.tennis_league.last_match_index(play_type), nb_matches + 1)
+        match = list(self.tennis_league.iter_matches(play_type))[1]
+        self.assertEqual([match.get_name(1), match.get_name(2)], ["player_c", "player_d"])
+        self.assertEqual(match_log.get(1), ((2, 3), (3, 1)))
+
+        columns = match_log.get_columns()
+        self.assertEqual(sorted(columns.keys()), sorted(MatchLog.MatchLog.COLUMNS))
+        self.assertEqual(list(columns['entity_1'][:2]), [0, 2])
+        self.assertEqual(list(columns['games_won_2'][:2]), [0, 1])
+        with self.assertRaises(TypeError):
+            columns['games_won_1'][0] = 5
+        # Views share the log's memory, which can't grow while they are alive
+        with self.assertRaises(BufferError):
+            self.tennis_league.add_match(Match.Match("player_a", 1, "player_d", 1))
+        for view in columns.values():
+            view.release()
+        self.tennis_league.add_match(Match.Match("player_a", 1, "player_d", 1))
+        self.assertEqual(len(match_log), nb_matches + 2)
+
+    def test_doubles_match(self):
+        pa = self.tennis_league.get_playing_entity("player_a")
+        pb = self.tennis_league.get_playing_entity("player_b")
+        pc = self.tennis_league.get_playing_entity("player_c")
+        pd = self.tennis_league.get_playing_entity("player_d")
+        team_ab = DoublesTeam.DoublesTeam(pa, pb, 1.0, 1.0)
+        team_cd = DoublesTeam.DoublesTeam(pc, pd, 1.0, 1.0)
+        self.tennis_league.add_playing_entity(team_ab)
+        self.tennis_league.add_playing_entity(team_cd)
+        self.assertIs(self.tennis_league.get_playing_entity_by_id(team_ab.id), team_ab)
+
+        match = Match.Match(team_ab.get_name(), 6, team_cd.get_name().upper(), 4)
+        self.assertFalse(hasattr(match, '__dict__'))
+        self.assertEqual(match.play_type, PlayingEntity.PlayType.DOUBLES)
+        self.assertEqual(match.get_name(2), team_cd.get_name())
+        self.assertEqual(match.get_players_list(), {team_ab.get_name(), team_cd.get_name(),
+                                                    "player_a", "player_b", "player_c", "player_d"})
+        self.assertTrue(match.has_played("Player_A", "player_d"))
+        self.assertFalse(match.has_played("player_a", "player_e"))
+        self.assertEqual(match.get_games_won("player_b"), 6)
+        self.assertEqual(match.get_games_lost("player_b"), 4)
+        self.assertEqual(match.get_games_won(team_cd.get_name()), 4)
+        self.assertEqual(match.get_games_lost("player_c"), 6)
+        with self.assertRaises(Exception):
+            match.get_games_won("player_e")
+        self.assertEqual(str(match), "{:<12s} vs {:<12s}: 6-4".format(team_ab.get_name(), team_cd.get_name()))
+
+    def test_match_index_selection(self):
+        last_index = self.tennis_league.last_match_index(PlayingEntity.PlayType.SINGLES)
+
+        selection = score.MatchIndexSelection.from_string("3,1,2")
+        self.assertTrue(selection.is_valid())
+        self.assertFalse(selection.is_single())
+        self.assertEqual(selection.get_compute_index(), 3)
+        self.assertEqual(selection.get_indexes(last_index), [1, 2, 3])
+
+        selection = score.MatchIndexSelection.from_string("every:2")
+        self.assertTrue(selection.is_valid())
+        self.assertEqual(selection.get_compute_index(), -1)
+        self.assertEqual(selection.get_indexes(LeagueIndex(7)), [2, 4, 6])
+        with self.assertRaises(SmartIndexError):
+            score.MatchIndexSelection.from_string("every:8").get_indexes(LeagueIndex(7))
+        with self.assertRaises(SmartIndexError):
+            selection.get_indexes(LeagueIndex(-1))
+
+        self.assertTrue(score.MatchIndexSelection.from_string("-1").is_single())
+        self.assertFalse(score.MatchIndexSelection.from_string("0,5").is_valid())
+        self.assertFalse(score.MatchIndexSelection.from_string("every:0").is_valid())
+
+    def test_synthetic_league(self):
+        def dump(seed):
+            output = io.StringIO()
+            importer.dump_league(seed, nb_players=10, nb_matches=1000, doubles_ratio=0.4, level_change_rate=0.05,
+                                 replacement_rate=0.02, skew=1.5, out=output, chunk_size=64)
+            return output.getvalue().splitlines()
+
+        lines = dump(3)
+        self.assertEqual(lines, dump(3))
+        self.assertNotEqual(lines, dump(4))
+
+        self.assertEqual(len([l for l in lines if l.startswith("NEW_PLAYER,")]), 10)
+        self.assertEqual(len([l for l in lines if l.startswith("SINGLES_GAME,") or l.startswith("DOUBLES_GAME,")]),
+                         1000)
+
+        # Game lines are formatted from tuples, they must follow the entry formats
+        for line in lines:
+            fields = line.split(",")
+            if fields[0] == "SINGLES_GAME":
+                self.assertEqual(line, importer_format.SINGLES_GAME_ENTRY_FORMAT.format(
+                    player1=fields[1], games_won_1=int(fields[2]), player2=fields[3], games_won_2=int(fields[4])))
+            elif fields[0] == "DOUBLES_GAME":
+                self.assertEqual(line, importer_format.DOUBLES_GAME_ENTRY_FORMAT.format(
+                    player1=fields[1], player2=fields[2], games_won_a=int(fields[3]), player3=fields[4],
+                    player4=fields[5], games_won_b=int(fields[6])))
+
+        # skew: first players play a lot more than last ones
+        self.assertGreater(len([l for l in lines if "player01," in l]), 5*len([l for l in lines if "player10," in l]))
+
+    def test_doubles_name_format(self):
+        team_name = PlayingEntity.DOUBLES_NAME_FORMAT.format("name1", "name2")
+        names = PlayingEntity.DOUBLES_NAME_RE.match(team_name)
+        self.assertIsNotNone(names)
+        self.assertEqual((names.group(1), names.group(2)), ("name1", "name2"))
+
+    def test_lazy_imports(self):
+        # Sub commands which don't need the league model must not import it, see tests/benchmarks/startup.py
+        root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        probe = "import sys; sys.argv = ['score.py', 'demo_csv']; import score; score.main(score.parse_command_line()); " \
+                "print(','.join(sorted(sys.modules)))"
+        process = subprocess.run([sys.executable, "-c", probe], cwd=root_path, stdout=subprocess.PIPE, check=True)
+        modules = process.stdout.decode('utf-8').splitlines()[-1].split(',')
+        self.assertIn("importer.csv_format", modules)
+        for module in ["interfaces", "League", "ScoreProcessor", "importer.csv", "pstats"]:
+            self.assertNotIn(module, modules)
+
+    def test_profile_import_phases(self):
+        # Lazily imported modules are timed by the sub command importing them, not in the startup phase
+        root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        process = subprocess.run([sys.executable, "score.py", "--profile", "input_csv", CSV], cwd=root_path,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+        phases = [line.split()[:-1] for line in process.stderr.decode('utf-8').splitlines() if line.startswith("    ")]
+        self.assertEqual([phase for phase in phases if phase[-1] == "import"],
+                         [["startup", "import"], ["league", "model", "import"], ["compute", "import"]])
+
+    def test_parse_cache(self):
+        with open(CSV, 'r') as fd:
+            records = importer.parse_league(fd)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_file = os.path.join(tmp_dir, "league.csv")
+            with open(CSV, 'r') as src, open(csv_file, 'w') as dst:
+                dst.write(src.read())
+
+            parse_cache = cache.ParseCache(os.path.join(tmp_dir, "cache"))
+            self.assertIsNone(parse_cache.load(csv_file))
+            parse_cache.save(csv_file, records)
+            self.assertEqual(cache.ParseCache(os.path.join(tmp_dir, "cache")).load(csv_file), records)
+
+            # Entries are keyed by content
+            with open(csv_file, 'a') as fd:
+                fd.write("SINGLES_GAME,a,6,b,2\n")
+            self.assertIsNone(cache.ParseCache(os.path.join(tmp_dir, "cache")).load(csv_file))
+
+            # Invalid entries are ignored
+            parse_cache = cache.ParseCache(os.path.join(tmp_dir, "cache"))
+            parse_cache.save(csv_file, records)
+            entry = parse_cache._get_file_name(parse_cache.get_content_hash(csv_file))
+            with open(entry, 'r+b') as fd:
+                fd.truncate(os.path.getsize(entry) - 8)
+            # Captured, the warning names the temporary directory
+            with self.assertLogs("cache", "WARNING"):
+                self.assertIsNone(parse_cache.load(csv_file))
+
+        self.assertEqual(cache.ParseCache.get_cache_dir("dir"), "dir")
+
+    def test_parse_cache_eviction(self):
+        with open(CSV, 'r') as fd:
+            records = importer.parse_league(fd)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_files = [os.path.join(tmp_dir, "league%d.csv" % i) for i in range(0, 3)]
+            for i, csv_file in enumerate(csv_files):
+                with open(CSV, 'r') as src, open(csv_file, 'w') as dst:
+                    dst.write(src.read() + "SINGLES_GAME,a,%d,b,2\n" % i)
+
+            # Room for two entries, the least recently used one is evicted when a third is saved
+            parse_cache = cache.ParseCache(os.path.join(tmp_dir, "cache"))
+            parse_cache.save(csv_files[0], records)
+            entry_size = os.path.getsize(parse_cache._get_file_name(parse_cache.get_content_hash(csv_files[0])))
+            parse_cache = cache.ParseCache(os.path.join(tmp_dir, "cache"), max_size=2 * entry_size)
+            parse_cache.save(csv_files[1], records)
+            for age, csv_file in enumerate(csv_files[:2]):
+                entry = parse_cache._get_file_name(parse_cache.get_content_hash(csv_file))
+                os.utime(entry, (1000 + age, 1000 + age))
+            self.assertEqual(parse_cache.load(csv_files[0]), records)
+            parse_cache.save(csv_files[2], records)
+
+            self.assertEqual(parse_cache.load(csv_files[0]), records)
+            self.assertIsNone(parse_cache.load(csv_files[1]))
+            self.assertEqual(parse_cache.load(csv_files[2]), records)
+            self.assertEqual(len(os.listdir(os.path.join(tmp_dir, "cache"))), 2)
+
+    def test_cached_league(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            args = score.parse_command_line(['input_csv', CSV, '-i', '--cache-dir', tmp_dir])
+            for _ in range(0, 2):
+                League.League._SINGLETON = None
+                tennis_league = score.main(args)
+                # One parse cache entry, computed points are cached under 'results'
+                self.assertEqual(sorted([name.endswith(".bin") for name in os.listdir(tmp_dir)]), [False, True])
+                self.assertEqual(len([name for name in os.listdir(os.path.join(tmp_dir, "results"))
+                                      if name.endswith(".bin")]), 1)
+                avg = tennis_league.get_league_average_points_per_match(LeagueIndex(-1),
+                                                                        PlayingEntity.PlayType.SINGLES)
+                self.assertEqual(round(avg, 2), 5.0)
+
+    def test_first_affected_match_index(self):
+        singles = PlayingEntity.PlayType.SINGLES
+        doubles = PlayingEntity.PlayType.DOUBLES
+        lines = ["NEW_PLAYER,a,1.0,0.0", "NEW_PLAYER,b,1.0,0.0", "NEW_PLAYER,c,1.0,0.0",
+                 "SINGLES_GAME,a,6,b,2", "SINGLES_GAME,b,6,c,2", "SINGLES_GAME,a,6,c,2"]
+
+        def first_affected(new_lines, play_type=singles, old_lines=lines):
+            return importer.get_first_affected_match_index(importer.parse_league(old_lines),
+                                                           importer.parse_league(new_lines), play_type)
+
+        self.assertEqual(first_affected(lines), 4)
+        self.assertEqual(first_affected(["# comment"] + lines + ["SINGLES_GAME,b,6,a,2"]), 4)
+        self.assertEqual(first_affected(lines[:4] + lines[5:]), 2)
+        self.assertEqual(first_affected(lines[:5] + ["SINGLES_GAME,a,6,c,3"]), 3)
+        self.assertEqual(first_affected(["NEW_PLAYER,d,1.0,0.0"] + lines), 1)
+        self.assertEqual(first_affected(lines + ["NEW_PLAYER,d,1.0,0.0"]), 1)
+        # Levels set at a match the player played apply from its next one, otherwise possibly from its first
+        self.assertEqual(first_affected(lines + ["NEW_PLAYER_LEVEL,c,3,0.5"]), 4)
+        self.assertEqual(first_affected(lines + ["NEW_PLAYER_LEVEL,c,1,0.5"]), 2)
+        self.assertEqual(first_affected(lines + ["NEW_PLAYER_LEVEL,c,3,0.5"], doubles), 1)
+        self.assertEqual(first_affected(lines[:4] + ["DOUBLES_GAME,a,b,6,c,d,2"]), 2)
+        # Levels after the first difference are looked up in the league they belong to
+        level_lines = lines + ["SINGLES_GAME,b,6,c,2", "NEW_PLAYER_LEVEL,c,4,0.5"]
+        self.assertEqual(first_affected(level_lines[:6] + ["SINGLES_GAME,b,6,c,3"] + level_lines[7:],
+                                        old_lines=level_lines), 4)
+        self.assertEqual(first_affected(level_lines + ["SINGLES_GAME,a,6,b,2"], old_lines=level_lines), 5)
+        # A player's level changes its doubles teams' from their first match
+        doubles_lines = lines[:3] + ["NEW_PLAYER,d,1.0,0.0", "NEW_PLAYER,e,1.0,0.0",
+                                     "DOUBLES_GAME,a,b,6,c,d,2", "DOUBLES_GAME,a,b,6,c,e,2"]
+        self.assertEqual(first_affected(doubles_lines + ["NEW_PLAYER_LEVEL,e,2,0.5"], doubles, doubles_lines), 2)
+
+    def test_prefix_reuse(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_file = os.path.join(tmp_dir, "league.csv")
+            cache_dir = os.path.join(tmp_dir, "cache")
+            with open(os.path.join(os.path.dirname(__file__), 'score-processor.csv'), 'r') as fd:
+                lines = fd.readlines()
+
+            def run(csv_lines, cache_dir=None):
+                with open(csv_file, 'w') as fd:
+                    fd.writelines(csv_lines)
+                League.League._SINGLETON = None
+                Match.Match.LEAGUE = None
+                args = ['input_csv', csv_file] + (['--cache-dir', cache_dir] if cache_dir else [])
+                Counters.enable()
+                Counters.reset()
+                with redirect_stdout(io.StringIO()) as output:
+                    score.main(score.parse_command_line(args))
+                reused = Counters.get_count('result_cache.reused_matches')
+                Counters.disable()
+                return output.getvalue(), reused
+
+            last_game = "SINGLES_GAME,player_e,3,player_f,1\n"
+            cases = [
+                ("first match changed", lines[:9] + ["SINGLES_GAME,player_a,0,player_d,1\n"] + lines[10:], 0),
+                ("last match changed", lines[:-1] + [last_game], 7),
+                ("match inserted before the last one", lines[:-1] + [last_game, lines[-1]], 7),
+                ("match added after the last one", lines + [last_game], 8),
+                # player_b played the 4th match, its level change at it applies from its next match
+                ("level at a match played", lines + ["NEW_PLAYER_LEVEL,player_b,4,0.5\n"], 4),
+                # player_a didn't, its level change possibly applies from its first match
+                ("level at a match not played", lines + ["NEW_PLAYER_LEVEL,player_a,4,0.5\n"], 0),
+            ]
+            for name, changed, nb_reused in cases:
+                with self.subTest(name):
+                    run(lines, cache_dir)
+                    output, reused = run(changed, cache_dir)
+                    self.assertEqual(reused, nb_reused)
+                    self.assertEqual(output, run(changed)[0])
 
 if __name__ == "__main__":
     unittest.main()
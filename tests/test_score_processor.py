@@ -4,19 +4,71 @@ import unittest
 import os
 import sys
 import importlib
+import subprocess
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 utils = importlib.import_module("utils")
 interfaces = importlib.import_module("interfaces")
 score = importlib.import_module("score")
+ScoreProcessor = importlib.import_module("ScoreProcessor")
 League = importlib.import_module("League")
+RankTimeline = importlib.import_module("RankTimeline")
+ComputeTrace = importlib.import_module("ComputeTrace")
+MatchExplanations = importlib.import_module("MatchExplanations")
+ResultCache = importlib.import_module("ResultCache")
+Match = importlib.import_module("Match")
+importer = importlib.import_module("importer.csv")
 
 from interfaces import *
+from utils.counters import Counters
 
 
 CSV = os.path.join(os.path.dirname(__file__), 'score-processor.csv')
 
 
+def import_league(lines):
+    League.League._SINGLETON = None
+    Match.Match.LEAGUE = None
+    tennis_league = League.League()
+    importer.apply_records(importer.parse_league(lines), tennis_league)
+    return tennis_league
+
+
+def import_synthetic_league():
+    import io
+
+    output = io.StringIO()
+    importer.dump_league(5, nb_players=8, nb_matches=120, doubles_ratio=0.4, level_change_rate=0.05,
+                         replacement_rate=0.0, skew=1.0, out=output)
+    return import_league(output.getvalue().splitlines())
+
+
+def get_results(tennis_league, processor, play_type):
+    """
+    Match points and standings once all matches of given play type are computed.
+    """
+    return (processor.get_match_points(LeagueIndex(-1), play_type),
+            [(e.entity.get_name(), e.points, e.match_played, e.games_won)
+             for e in tennis_league.get_standings(LeagueIndex(-1), play_type)])
+
+
+def get_entity_results(tennis_league, play_type):
+    """
+    Rankings, cumulative points and match points as of each match played, and cumulative points as of each
+    league match index, of every playing entity of given play type.
+    """
+    results = dict()
+    last_index = int(tennis_league.last_match_index(play_type))
+    for entity in tennis_league.iter_playing_entities(play_type):
+        player_indexes = [PlayerIndex(i) for i in range(0, entity.get_nb_match_played(LeagueIndex(-1)) + 1)]
+        results[entity.get_name()] = (
+            [entity.get_ranking(index) for index in player_indexes],
+            [entity.get_cumulative_points(index) for index in player_indexes],
+            [entity.get_match_points(index) for index in player_indexes],
+            [entity.get_cumulative_points_at(LeagueIndex(i)) for i in range(1, last_index + 1)])
+    return results
+
+
 class TestScoreProcessor(unittest.TestCase):
 
     def setUp(self):
@@ -116,6 +168,468 @@ class TestScoreProcessor(unittest.TestCase):
                     self.assertEqual(player_e.get_match_points(league_index), 0.0)
                     self.assertEqual(player_f.get_match_points(league_index), 0.0)
 
+    def test_standings_as_of_league_index(self):
+        # rank and number of match played for entities which have played as of the league index
+        expected_standings = {
+            LeagueIndex(1): {'player_a': (1, 1), 'player_d': (2, 1)},
+            LeagueIndex(2): {'player_a': (1, 1), 'player_b': (2, 1), 'player_c': (3, 1), 'player_d': (4, 1)},
+            LeagueIndex(7): {'player_a': (1, 3), 'player_b': (2, 3), 'player_c': (3, 3), 'player_d': (4, 3),
+                             'player_e': (4, 1), 'player_f': (4, 1)},
+        }
+
+        for league_index in expected_standings:
+            with self.subTest(str(league_index)):
+                standings = self.tennis_league.get_standings(league_index, PlayingEntity.PlayType.SINGLES)
+                played = dict()
+                for entry in standings:
+                    if entry.match_played != 0:
+                        played[entry.entity.get_name()] = (entry.rank, entry.match_played)
+                self.assertEqual(played, expected_standings[league_index])
+
+        self.assertEqual(self.tennis_league.get_standings(LeagueIndex(5), PlayingEntity.PlayType.SINGLES)
+                         .get_entry('player_a').points, 30.0)
+
+    def test_standings_match_partial_compute(self):
+        play_type = PlayingEntity.PlayType.SINGLES
+        last_index = int(self.tennis_league.last_match_index(play_type))
+        full_season = dict()
+        for i in range(1, last_index + 1):
+            full_season[i] = [(e.entity.get_name(), e.rank, e.match_played, e.points, e.games_won, e.games_lost)
+                              for e in self.tennis_league.get_standings(LeagueIndex(i), play_type)]
+
+        processor = ScoreProcessor.ScoreProcessor(self.tennis_league, 100, 1.0, 1.0, 0.1, 3, True)
+        for i in range(1, last_index + 1):
+            with self.subTest(i):
+                processor.compute(LeagueIndex(i), play_type)
+                partial_season = [(e.entity.get_name(), e.rank, e.match_played, e.points, e.games_won, e.games_lost)
+                                  for e in self.tennis_league.get_standings(LeagueIndex(i), play_type)]
+                self.assertEqual(full_season[i], partial_season)
+
+    def test_rankings_match_standings(self):
+        tennis_league = import_synthetic_league()
+
+        # Ranks are updated as matches change them, they must be those of the standings after each match
+        processor = ScoreProcessor.ScoreProcessor(tennis_league, 100, 1.0, 1.0, 0.1, 1, False)
+        for play_type in PlayingEntity.PlayType:
+            for league_index in range(1, int(tennis_league.last_match_index(play_type)) + 1):
+                processor.compute(LeagueIndex(league_index), play_type)
+                for entry in tennis_league.get_standings(LeagueIndex(league_index), play_type):
+                    if entry.match_played != 0:
+                        self.assertEqual(entry.entity.get_ranking(PlayerIndex(entry.match_played)), entry.rank)
+
+    def test_rank_timeline(self):
+        play_type = PlayingEntity.PlayType.SINGLES
+        timeline = RankTimeline.RankTimeline()
+        processor = ScoreProcessor.ScoreProcessor(self.tennis_league, 100, 1.0, 1.0, 0.1, 3, True)
+        processor.set_rank_timeline(timeline)
+        processor.compute(LeagueIndex(-1), play_type)
+
+        self.assertEqual(timeline.indexes, list(range(1, 9)))
+        self.assertEqual(timeline.get_row('rank', 'player_a'), [1] * 8)
+        self.assertEqual(timeline.get_row('rank', 'player_e'), [0] * 6 + [4, 4])
+        self.assertEqual(timeline.get_row('points', 'player_b'), [0.0, 7.5, 7.5, 15.0, 15.0, 22.5, 22.5, 22.5])
+
+        for league_index in timeline.indexes:
+            standings = self.tennis_league.get_standings(LeagueIndex(league_index), play_type)
+            for entry in standings:
+                column = league_index - 1
+                self.assertEqual(timeline.get_row('points_per_match', entry.entity.get_name())[column],
+                                 entry.points_per_match)
+
+    def test_rank_timeline_matches_standings(self):
+        tennis_league = import_synthetic_league()
+        processor = ScoreProcessor.ScoreProcessor(tennis_league, 100, 1.0, 1.0, 0.1, 1, False)
+        timeline = RankTimeline.RankTimeline()
+        processor.set_rank_timeline(timeline)
+
+        def get_timeline(rank_timeline):
+            return [(metric, name, rank_timeline.get_row(metric, name))
+                    for metric in RankTimeline.RankTimeline.METRICS for name in rank_timeline.names]
+
+        # Columns are filled from the ranking state, as they would be from the standings
+        for play_type in PlayingEntity.PlayType:
+            with self.subTest(play_type.value):
+                processor.compute(LeagueIndex(-1), play_type)
+                last_index = int(tennis_league.last_match_index(play_type))
+                expected = RankTimeline.RankTimeline()
+                expected.reset(tennis_league.iter_playing_entities(play_type))
+                for league_index in range(1, last_index + 1):
+                    expected.add(tennis_league.get_standings(LeagueIndex(league_index), play_type))
+                self.assertEqual(timeline.indexes, expected.indexes)
+                self.assertEqual(get_timeline(timeline), get_timeline(expected))
+
+                processor.recompute_from(LeagueIndex(last_index // 2), LeagueIndex(-1), play_type)
+                self.assertEqual(timeline.indexes, expected.indexes)
+                self.assertEqual(get_timeline(timeline), get_timeline(expected))
+
+    def test_compute_trace(self):
+        import tempfile
+
+        play_type = PlayingEntity.PlayType.SINGLES
+        processor = ScoreProcessor.ScoreProcessor(self.tennis_league, 100, 1.0, 1.0, 0.1, 3, True)
+        processor.set_player_filter(['player_b'])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, "trace.jsonl")
+            trace = ComputeTrace.ComputeTrace(file_name)
+            processor.set_compute_trace(trace)
+            processor.compute(LeagueIndex(-1), play_type)
+            trace.close()
+            records = list(ComputeTrace.ComputeTrace.read(file_name))
+
+        self.assertEqual([r['league_match_index'] for r in records], [2, 4, 6])
+        for record in records:
+            self.assertIn('player_b', record['players'])
+            self.assertTrue(ComputeTrace.ComputeTrace.is_in_filter(record, ['player_b']))
+            self.assertFalse(ComputeTrace.ComputeTrace.is_in_filter(record, ['nobody']))
+            for i in range(0, 2):
+                player = self.tennis_league.get_playing_entity(record['players'][i])
+                index = LeagueIndex(record['league_match_index'])
+                self.assertEqual(record['points_after'][i], player.get_cumulative_points_at(index))
+                self.assertAlmostEqual(record['earned'][i], record['base_points'][i] * record['break_in_factor'][i] *
+                                       record['level_factor'][i] * record['ranking_factor'][i] *
+                                       record['diff_ranking_factor'][i])
+            self.assertEqual(sum(record['base_points']), 100 if sum(record['won']) != 0 else 0)
+            self.assertEqual(len(ComputeTrace.ComputeTrace.format_record(record)), 19)
+
+    def test_match_explanations(self):
+        import tempfile
+
+        play_type = PlayingEntity.PlayType.SINGLES
+        explanations = MatchExplanations.MatchExplanations()
+        processor = ScoreProcessor.ScoreProcessor(self.tennis_league, 100, 1.0, 1.0, 0.1, 1, False)
+        processor.set_match_explanations(explanations)
+        processor.compute(LeagueIndex(-1), play_type)
+
+        self.assertEqual(len(explanations), 16)
+        player_b = self.tennis_league.get_playing_entity('player_b')
+        for explanation in explanations.get_explanations('player_b'):
+            self.assertEqual(explanation['earned_points'],
+                             player_b.get_match_points(LeagueIndex(explanation['league_match_index'])))
+            self.assertAlmostEqual(explanation['earned_points'],
+                                   explanation['base_points'] * explanation['ranking_factor'] *
+                                   explanation['diff_ranking_factor'] * explanation['break_in_factor'] *
+                                   explanation['level_factor'])
+
+        explanation = explanations.get_explanations('PLAYER_B', LeagueIndex(4))
+        self.assertEqual(len(explanation), 1)
+        self.assertEqual((explanation[0]['opponent'], explanation[0]['games_won'], explanation[0]['games_lost']),
+                         ('player_c', 3, 1))
+        self.assertEqual(explanations.get_explanations('player_b', LeagueIndex(3)), [])
+        with self.assertRaises(PlayingEntityDoesNotExistError):
+            explanations.get_explanations('nobody')
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, "explanations.bin")
+            explanations.save(file_name)
+            loaded = MatchExplanations.MatchExplanations.load(file_name)
+
+            with self.assertRaises(PlayingEntityDoesNotExistError):
+                score.main(score.parse_command_line(['explain', file_name, 'nobody']))
+            with self.assertRaisesRegex(Exception, "player_b didn't play league match index 3"):
+                score.main(score.parse_command_line(['explain', file_name, 'player_b', '-m', '3']))
+
+        self.assertEqual(loaded.play_type, play_type)
+        for name in ['player_a', 'player_e']:
+            self.assertEqual(loaded.get_explanations(name), explanations.get_explanations(name))
+        self.assertEqual(loaded.format_explanation(loaded.get_explanations('player_a')[0]),
+                         explanations.format_explanation(explanations.get_explanations('player_a')[0]))
+
+    def test_engine_modules(self):
+        # Every module imported to compute points must invalidate cached results when it changes, but those
+        # which only record, count or check what is computed
+        root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        probe = "import os, sys; import League, ScoreProcessor, importer.csv; from interfaces import *; " \
+                "league = League.League(); importer.csv.init_league(%r, league); " \
+                "processor = ScoreProcessor.ScoreProcessor(league, 100, 1.0, 1.0, 0.1, 1, False); " \
+                "[processor.compute(LeagueIndex(-1), play_type) for play_type in PlayingEntity.PlayType]; " \
+                "print(','.join(sorted([name for name, module in sys.modules.items() if " \
+                "os.path.abspath(getattr(module, '__file__', None) or '/').startswith(os.getcwd() + os.sep)])))" % CSV
+        process = subprocess.run([sys.executable, "-c", probe], cwd=root_path, stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL, check=True)
+        modules = set(process.stdout.decode('utf-8').splitlines()[-1].split(','))
+        not_engine_modules = {'importer', 'ComputeTrace', 'MatchExplanations', 'utils.counters', 'utils.exceptions',
+                              'utils.profiler', 'utils.tracer', 'utils.utils'}
+        self.assertIn('ScoreProcessor', modules)
+        self.assertEqual(modules - not_engine_modules, set(ResultCache.ENGINE_MODULES))
+
+    def test_result_cache(self):
+        import tempfile
+
+        play_type = PlayingEntity.PlayType.SINGLES
+        processor = ScoreProcessor.ScoreProcessor(self.tennis_league, 100, 1.0, 1.0, 0.1, 1, False)
+        processor.compute(LeagueIndex(-1), play_type)
+        points = processor.get_match_points(LeagueIndex(-1), play_type)
+        self.assertEqual(len(points), 2 * int(self.tennis_league.last_match_index(play_type)))
+        standings = [(e.entity.get_name(), e.points) for e in self.tennis_league.get_standings(LeagueIndex(-1),
+                                                                                               play_type)]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResultCache.ResultCache(tmp_dir)
+            parameters = processor.get_parameters()
+            self.assertIsNone(cache.load("content", parameters, play_type, 8))
+            cache.save("content", parameters, play_type, points)
+            self.assertEqual(list(cache.load("content", parameters, play_type, 8)), points)
+            # Entries serve shorter computes, not longer ones
+            self.assertEqual(list(cache.load("content", parameters, play_type, 3)), points[:6])
+            self.assertIsNone(cache.load("content", parameters, play_type, 9))
+            self.assertIsNone(cache.load("content", (50,) + parameters[1:], play_type, 8))
+            self.assertIsNone(cache.load("content", parameters, PlayingEntity.PlayType.DOUBLES, 8))
+
+            processor.set_match_points(cache.load("content", parameters, play_type, 8), play_type)
+            self.assertEqual([(e.entity.get_name(), e.points)
+                              for e in self.tennis_league.get_standings(LeagueIndex(-1), play_type)], standings)
+
+            # Least recently used entries are evicted first
+            small_cache = ResultCache.ResultCache(tmp_dir, max_size=1)
+            small_cache.save("content", (50,) + parameters[1:], play_type, points)
+            self.assertIsNone(cache.load("content", parameters, play_type, 8))
+            self.assertIsNotNone(cache.load("content", (50,) + parameters[1:], play_type, 8))
+
+            self.assertIsNone(cache.get_previous_run(CSV, parameters, play_type))
+            cache.set_previous_run(CSV, parameters, play_type, "content")
+            self.assertEqual(cache.get_previous_run(CSV, parameters, play_type), "content")
+            self.assertIsNone(cache.get_previous_run(CSV, parameters, PlayingEntity.PlayType.DOUBLES))
+
+    def test_prefix_points(self):
+        play_type = PlayingEntity.PlayType.SINGLES
+        processor = ScoreProcessor.ScoreProcessor(self.tennis_league, 100, 1.0, 1.0, 0.1, 1, False)
+        processor.compute(LeagueIndex(-1), play_type)
+        points = processor.get_match_points(LeagueIndex(-1), play_type)
+
+        # Points computed from a prefix of set points are those of a full compute
+        for nb_prefix_matches in [0, 1, 5, 8]:
+            processor.compute(LeagueIndex(-1), play_type, points[:2 * nb_prefix_matches])
+            self.assertEqual(processor.get_match_points(LeagueIndex(-1), play_type), points)
+
+    def test_prefix_points_rankings(self):
+        tennis_league = import_synthetic_league()
+        processor = ScoreProcessor.ScoreProcessor(tennis_league, 100, 1.0, 1.0, 0.1, 1, False)
+
+        # Rankings of set points, e.g. from a ResultCache, are those of a full compute
+        for play_type in PlayingEntity.PlayType:
+            with self.subTest(play_type.value):
+                processor.compute(LeagueIndex(-1), play_type)
+                points = processor.get_match_points(LeagueIndex(-1), play_type)
+                results = get_entity_results(tennis_league, play_type)
+                for nb_prefix_matches in [1, len(points) // 4, len(points) // 2]:
+                    processor.compute(LeagueIndex(-1), play_type, points[:2 * nb_prefix_matches])
+                    self.assertEqual(get_entity_results(tennis_league, play_type), results)
+                processor.set_match_points(points, play_type)
+                self.assertEqual(get_entity_results(tennis_league, play_type), results)
+
+    def test_apply_level_change(self):
+        play_type = PlayingEntity.PlayType.SINGLES
+        processor = ScoreProcessor.ScoreProcessor(self.tennis_league, 100, 1.0, 1.0, 0.1, 1, False)
+        processor.compute(LeagueIndex(-1), play_type)
+        points = processor.get_match_points(LeagueIndex(-1), play_type)
+
+        # player_b played the 4th match, its new level applies from its next one
+        self.assertEqual(processor.apply_level_change("player_b", 0.5, LeagueIndex(4), play_type), 5)
+        changed_points = processor.get_match_points(LeagueIndex(-1), play_type)
+        self.assertEqual(changed_points[:8], points[:8])
+        self.assertNotEqual(changed_points[8:], points[8:])
+
+        # Same points as computing all matches again, trying another level replaces the previous one
+        processor.compute(LeagueIndex(-1), play_type)
+        self.assertEqual(processor.get_match_points(LeagueIndex(-1), play_type), changed_points)
+        processor.apply_level_change("player_b", 1.0, LeagueIndex(4), play_type)
+        self.assertEqual(processor.get_match_points(LeagueIndex(-1), play_type), points)
+
+        # player_a didn't play the 4th match, its new level may apply from its first one
+        self.assertEqual(self.tennis_league.get_first_match_affected_by_level("player_a", LeagueIndex(4), play_type), 1)
+        self.assertEqual(self.tennis_league.get_first_match_affected_by_level(
+            "player_a", LeagueIndex(4), PlayingEntity.PlayType.DOUBLES), 1)
+
+    def test_replace_and_insert_match(self):
+        play_type = PlayingEntity.PlayType.SINGLES
+        with open(CSV, 'r') as fd:
+            lines = fd.readlines()
+        game_lines = [i for i, line in enumerate(lines) if line.startswith("SINGLES_GAME")]
+
+        processor = ScoreProcessor.ScoreProcessor(self.tennis_league, 100, 1.0, 1.0, 0.1, 1, False)
+        processor.compute(LeagueIndex(-1), play_type)
+        # The 3rd match's score was mis-entered, the 2nd one forgotten
+        processor.replace_match(LeagueIndex(3), Match.Match("player_a", 0, "player_d", 1))
+        processor.insert_match(LeagueIndex(2), Match.Match("player_c", 2, "player_e", 1))
+        self.assertEqual(self.tennis_league.last_match_index(play_type), 9)
+        results = get_results(self.tennis_league, processor, play_type)
+        self._assert_same_as_compute(self.tennis_league, processor, play_type)
+
+        # Same as a league built from the corrected csv
+        lines[game_lines[2]] = "SINGLES_GAME,player_a,0,player_d,1\n"
+        lines.insert(game_lines[1], "SINGLES_GAME,player_c,2,player_e,1\n")
+        tennis_league = import_league(lines)
+        processor = ScoreProcessor.ScoreProcessor(tennis_league, 100, 1.0, 1.0, 0.1, 1, False)
+        processor.compute(LeagueIndex(-1), play_type)
+        self.assertEqual(results, get_results(tennis_league, processor, play_type))
+
+    def test_replace_and_insert_match_out_of_range(self):
+        play_type = PlayingEntity.PlayType.SINGLES
+        processor = ScoreProcessor.ScoreProcessor(self.tennis_league, 100, 1.0, 1.0, 0.1, 1, False)
+        processor.compute(LeagueIndex(-1), play_type)
+        match = Match.Match("player_a", 0, "player_d", 1)
+
+        # Matches can be replaced from the first to the last one, inserted up to one after the last one
+        for league_index in [0, 9]:
+            with self.subTest(league_index):
+                with self.assertRaises(SmartIndexError):
+                    self.tennis_league.replace_match(LeagueIndex(league_index), match)
+                with self.assertRaises(SmartIndexError):
+                    processor.replace_match(LeagueIndex(league_index), match)
+        for league_index in [0, 10]:
+            with self.subTest(league_index):
+                with self.assertRaises(SmartIndexError):
+                    self.tennis_league.insert_match(LeagueIndex(league_index), match)
+                with self.assertRaises(SmartIndexError):
+                    processor.insert_match(LeagueIndex(league_index), match)
+        self.assertEqual(self.tennis_league.last_match_index(play_type), 8)
+
+    def _assert_same_as_compute(self, tennis_league, processor, play_type):
+        """
+        Rankings and points of the matches computed again follow those kept, as when computing all of them.
+        """
+        results = get_entity_results(tennis_league, play_type)
+        points = get_results(tennis_league, processor, play_type)
+        processor.compute(LeagueIndex(-1), play_type)
+        self.assertEqual(results, get_entity_results(tennis_league, play_type))
+        self.assertEqual(points, get_results(tennis_league, processor, play_type))
+
+    @staticmethod
+    def _get_player_names(entity):
+        if entity.play_type == PlayingEntity.PlayType.SINGLES:
+            return {entity.get_name()}
+        return {entity.get_player(1).get_name(), entity.get_player(2).get_name()}
+
+    def _apply_level_change(self, tennis_league, processor, play_type, league_index):
+        # The entity played the match, its new level applies from its next one
+        entity_ids, _ = tennis_league.get_match_log(play_type).get(league_index - 1)
+        name = tennis_league.get_playing_entity_by_id(entity_ids[0]).get_name()
+        self.assertEqual(processor.apply_level_change(name, 0.5, LeagueIndex(league_index), play_type),
+                         league_index + 1)
+
+    def _replace_score(self, tennis_league, processor, play_type, league_index):
+        entity_ids, games_won = tennis_league.get_match_log(play_type).get(league_index - 1)
+        processor.replace_match(LeagueIndex(league_index),
+                                Match.Match.from_entity_ids(tennis_league, entity_ids, games_won[::-1]))
+
+    def _replace_entities(self, tennis_league, processor, play_type, league_index):
+        # Neither entity played the match replaced
+        entity_ids, games_won = tennis_league.get_match_log(play_type).get(league_index - 1)
+        entities = []
+        for entity in tennis_league.iter_playing_entities(play_type):
+            if entity.id not in entity_ids and \
+                    all([self._get_player_names(entity).isdisjoint(self._get_player_names(e)) for e in entities]):
+                entities.append(entity)
+        processor.replace_match(LeagueIndex(league_index), Match.Match.from_entity_ids(
+            tennis_league, (entities[0].id, entities[1].id), games_won))
+
+    def _insert(self, tennis_league, processor, play_type, league_index):
+        # Same match as the one before, or as the first one
+        entity_ids, games_won = tennis_league.get_match_log(play_type).get(max(league_index - 2, 0))
+        processor.insert_match(LeagueIndex(league_index),
+                               Match.Match.from_entity_ids(tennis_league, entity_ids, games_won))
+
+    def test_partial_recompute_rankings(self):
+        edits = [(self._apply_level_change, ["first", "middle", "last"]),
+                 (self._replace_score, ["first", "middle", "last"]),
+                 (self._replace_entities, ["first", "middle", "last"]),
+                 (self._insert, ["first", "middle", "last", "after last"])]
+        for play_type in PlayingEntity.PlayType:
+            for edit, positions in edits:
+                for position in positions:
+                    with self.subTest(play_type=play_type.value, edit=edit.__name__, position=position):
+                        tennis_league = import_synthetic_league()
+                        processor = ScoreProcessor.ScoreProcessor(tennis_league, 100, 1.0, 1.0, 0.1, 1, False)
+                        processor.compute(LeagueIndex(-1), play_type)
+                        last_index = int(tennis_league.last_match_index(play_type))
+                        league_index = {"first": 1, "middle": last_index // 2, "last": last_index,
+                                        "after last": last_index + 1}[position]
+                        edit(tennis_league, processor, play_type, league_index)
+                        self._assert_same_as_compute(tennis_league, processor, play_type)
+
+    def test_insert_doubles_match_singles_level(self):
+        singles = PlayingEntity.PlayType.SINGLES
+        doubles = PlayingEntity.PlayType.DOUBLES
+        tennis_league = import_synthetic_league()
+        processor = ScoreProcessor.ScoreProcessor(tennis_league, 100, 1.0, 1.0, 0.1, 1, False)
+        processor.compute(LeagueIndex(-1), singles)
+        processor.compute(LeagueIndex(-1), doubles)
+        singles_results = get_entity_results(tennis_league, singles)
+
+        # Only doubles league match indexes are shifted
+        self._insert(tennis_league, processor, doubles, 1)
+        self._assert_same_as_compute(tennis_league, processor, doubles)
+        self.assertEqual(get_entity_results(tennis_league, singles), singles_results)
+
+        self._apply_level_change(tennis_league, processor, singles, int(tennis_league.last_match_index(singles)) // 2)
+        self._assert_same_as_compute(tennis_league, processor, singles)
+
+    def test_replace_and_insert_match_levels(self):
+        play_type = PlayingEntity.PlayType.SINGLES
+        with open(CSV, 'r') as fd:
+            lines = fd.readlines()
+        # player_b plays the 2nd, 4th, 6th, 9th and 10th matches, its levels apply from its 2nd and 4th ones
+        lines += ["SINGLES_GAME,player_b,2,player_e,1\n", "SINGLES_GAME,player_b,1,player_f,2\n",
+                  "NEW_PLAYER_LEVEL,player_b,2,0.5\n", "NEW_PLAYER_LEVEL,player_b,6,0.8\n"]
+        game_lines = [i for i, line in enumerate(lines) if line.startswith("SINGLES_GAME")]
+
+        def import_and_compute(csv_lines):
+            tennis_league = import_league(csv_lines)
+            processor = ScoreProcessor.ScoreProcessor(tennis_league, 100, 1.0, 1.0, 0.1, 1, False)
+            processor.compute(LeagueIndex(-1), play_type)
+            return tennis_league, processor
+
+        tennis_league, processor = import_and_compute(lines)
+        points = processor.get_match_points(LeagueIndex(-1), play_type)
+        # player_b no longer plays the 6th match: its level set there replaces the one set at the 2nd match,
+        # changing the points of the 4th one
+        processor.replace_match(LeagueIndex(6), Match.Match("player_c", 1, "player_e", 3))
+        replaced_lines = list(lines)
+        replaced_lines[game_lines[5]] = "SINGLES_GAME,player_c,1,player_e,3\n"
+        results = get_results(tennis_league, processor, play_type)
+        self.assertNotEqual(results[0][6:8], points[6:8])
+        self._assert_same_as_compute(tennis_league, processor, play_type)
+        self.assertEqual(results, get_results(*import_and_compute(replaced_lines), play_type))
+
+        tennis_league, processor = import_and_compute(lines)
+        # player_b plays the 3rd match, its levels set from there on follow their matches
+        processor.insert_match(LeagueIndex(3), Match.Match("player_b", 1, "player_d", 3))
+        inserted_lines = lines[:-1] + ["NEW_PLAYER_LEVEL,player_b,7,0.8\n"]
+        inserted_lines.insert(game_lines[2], "SINGLES_GAME,player_b,1,player_d,3\n")
+        results = get_results(tennis_league, processor, play_type)
+        self._assert_same_as_compute(tennis_league, processor, play_type)
+        self.assertEqual(results, get_results(*import_and_compute(inserted_lines), play_type))
+
+    def test_memoized_getters(self):
+        player_a = self.tennis_league.get_playing_entity('player_a')
+        index = LeagueIndex(5)
+        points = player_a.get_cumulative_points(index)
+        match_points = player_a.get_match_points(index)
+        self.assertNotEqual(points, match_points)
+
+        Counters.reset()
+        Counters.enable()
+        try:
+            self.assertEqual(player_a.get_cumulative_points(index), points)
+            self.assertEqual(player_a.get_cumulative_points(LeagueIndex(5)), points)
+            # Index values are memoized, not index objects
+            index += 1
+            self.assertEqual(player_a.get_nb_match_played(index), 3)
+            # Player indexes aren't league indexes
+            self.assertEqual(player_a.get_nb_match_played(PlayerIndex(6)), 3)
+
+            player_a.reset_points()
+            self.assertEqual(player_a.get_cumulative_points(LeagueIndex(5)), 0.0)
+            player_a.set_match_points(LeagueIndex(1), match_points)
+            self.assertEqual(player_a.get_cumulative_points(LeagueIndex(5)), match_points)
+        finally:
+            Counters.disable()
+
+        self.assertEqual(Counters.get_count(Counters.ENTITY_GETTER_HIT), 2)
+        self.assertEqual(Counters.get_count(Counters.ENTITY_GETTER_MISS), 4)
+        Counters.reset()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -162,6 +162,26 @@ class TestSmartIndex(unittest.TestCase):
         # TODO
         # self.assertEqual(cache.get_latest_valid_index(), 0)
 
+    def test_remove_latest_indexes(self):
+        cache = SmartIndexCache()
+        for player_index, league_index in enumerate([2, 4, 7], 1):
+            cache.add_index(LeagueIndex(league_index), PlayerIndex(player_index))
+
+        cache.remove_latest_indexes(LeagueIndex(2), PlayerIndex(1))
+        self.assertEqual(len(cache), 1)
+        self.assertFalse(cache.exists(LeagueIndex(4)))
+        self.assertFalse(cache.exists(PlayerIndex(3)))
+        self.assertEqual(cache.max_index(IndexType.LEAGUE), LeagueIndex(2))
+        self.assertEqual(cache.max_index(IndexType.PLAYER), PlayerIndex(1))
+
+        cache.add_index(LeagueIndex(3), PlayerIndex(2))
+        self.assertEqual(cache.get_index_for_type(PlayerIndex(2), IndexType.LEAGUE), LeagueIndex(3))
+
+        cache.remove_latest_indexes(LeagueIndex(0), PlayerIndex(0))
+        self.assertEqual(len(cache), 0)
+        with self.assertRaises(SmartIndexError):
+            cache.max_index(IndexType.LEAGUE)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -12,6 +12,7 @@ importlib.import_module("Stats")
 from Stats import *
 from utils.SmartIndex import *
 import utils.utils as utils
+from utils.counters import Counters
 
 
 class TestStats(unittest.TestCase):
@@ -122,6 +123,61 @@ class TestStats(unittest.TestCase):
         with self.assertRaises(BackToTheFutureError):
             stats.set_match_results(6, 3, LeagueIndex(3))
 
+    def test_match_results_in_the_past(self):
+        stats = Stats(0.0, 1.0)
+        for index, (games_won, games_lost) in [(2, (6, 3)), (4, (2, 6)), (7, (6, 4))]:
+            stats.set_match_results(games_won, games_lost, LeagueIndex(index))
+        # Set at the player's 2nd match, applies from its 3rd one
+        stats.set_data('level_scoring_factor', 0.5, LeagueIndex(4))
+
+        stats.replace_match_results(3, 6, LeagueIndex(4))
+        self.assertEqual(stats.get_match_results(), [(2, 6, 3), (4, 3, 6), (7, 6, 4)])
+        self.assertEqual(stats.get_cumulative_data_sum_for_index('games_won', index=LeagueIndex(-1)), 15)
+
+        with self.assertRaises(OverwriteError):
+            stats.insert_match_results(1, 1, LeagueIndex(4))
+        stats.shift_league_indexes(LeagueIndex(4), 1)
+        stats.insert_match_results(6, 0, LeagueIndex(4))
+        self.assertEqual(stats.get_match_results(), [(2, 6, 3), (4, 6, 0), (5, 3, 6), (8, 6, 4)])
+        self.assertEqual(stats.get_number_of_match_played_at(LeagueIndex(5)), 3)
+        # The level follows the match it was set at
+        self.assertEqual(stats.get_data_for_index('level_scoring_factor', index=PlayerIndex(2)), 1.0)
+        self.assertEqual(stats.get_data_for_index('level_scoring_factor', index=PlayerIndex(3)), 0.5)
+
+        stats.remove_match_results(LeagueIndex(2))
+        self.assertEqual(stats.get_match_results(), [(4, 6, 0), (5, 3, 6), (8, 6, 4)])
+        self.assertEqual(stats.get_data_for_index('level_scoring_factor', index=PlayerIndex(1)), 1.0)
+        self.assertEqual(stats.get_data_for_index('level_scoring_factor', index=PlayerIndex(2)), 0.5)
+        with self.assertRaises(SmartIndexError):
+            stats.remove_match_results(LeagueIndex(3))
+
+    def test_match_results_in_the_past_keep_prior_points(self):
+        stats = Stats(0.0, 1.0)
+        for index, points in [(2, 1.0), (4, 2.0), (7, 3.0)]:
+            stats.set_match_results(6, 3, LeagueIndex(index))
+            stats.set_data('match_points', points, LeagueIndex(index))
+            stats.set_ranking(int(stats.get_number_of_match_played_at(LeagueIndex(index))), index)
+
+        # Points and rankings of the matches before the one replaced are kept, the others are set again
+        stats.replace_match_results(3, 6, LeagueIndex(4))
+        self.assertEqual(stats.get_cumulative_data_at('match_points', LeagueIndex(2)), 1.0)
+        self.assertEqual(stats.get_data_for_index('ranking', index=PlayerIndex(1)), 2)
+        with self.assertRaises(SmartIndexError):
+            stats.get_cumulative_data_at('match_points', LeagueIndex(4))
+        stats.set_data('match_points', -2.0, LeagueIndex(4))
+        stats.set_data('match_points', 3.0, LeagueIndex(7))
+        self.assertEqual(stats.get_cumulative_data_at('match_points', LeagueIndex(-1)), 2.0)
+
+        stats.shift_league_indexes(LeagueIndex(3), 1)
+        stats.insert_match_results(6, 0, LeagueIndex(3))
+        self.assertEqual(stats.get_match_results(), [(2, 6, 3), (3, 6, 0), (5, 3, 6), (8, 6, 3)])
+        self.assertEqual(stats.get_match_results(2), [(5, 3, 6), (8, 6, 3)])
+        self.assertEqual(stats.get_cumulative_data_at('match_points', LeagueIndex(2)), 1.0)
+        with self.assertRaises(SmartIndexError):
+            stats.get_cumulative_data_at('match_points', LeagueIndex(3))
+        self.assertEqual(stats.get_number_of_match_played_at(LeagueIndex(-1)), 4)
+        self.assertEqual(stats.get_cumulative_data_sum_for_index('games_won', index=LeagueIndex(-1)), 21)
+
     def test_get_point_for_match(self):
         stats = self._setup_test_stats()
 
@@ -146,6 +202,18 @@ class TestStats(unittest.TestCase):
         with self.assertRaises(SmartIndexError):
             stats.get_data_for_index('match_points', index=LeagueIndex(15))
 
+    def test_cumulative_data_past_points_set(self):
+        stats = self._setup_test_stats()
+        stats.set_match_results(6, 4, LeagueIndex(8))
+
+        self.assertEqual(stats.get_cumulative_data_at('match_points', LeagueIndex(7)), 3.0)
+        self.assertEqual(stats.get_cumulative_data_at('games_won', LeagueIndex(8)), 12)
+        # No points set for the latest match yet, don't return the previous match's sum
+        with self.assertRaises(SmartIndexError):
+            stats.get_cumulative_data_at('match_points', LeagueIndex(8))
+        with self.assertRaises(SmartIndexError):
+            stats.get_cumulative_data_at('match_points', LeagueIndex(-1))
+
     def test_get_stats(self):
         """
         There are 3 matches set with points in this function
@@ -246,6 +314,67 @@ class TestStats(unittest.TestCase):
             with self.assertRaises(NoMatchPlayedYetError):
                 stats.get_average_points_per_match(index=i)
 
+    def test_rank_history(self):
+        """
+        RankHistory must behave like an extendable StatsData, only storing changes.
+        """
+        import random
+        random.seed(0)
+
+        history = RankHistory('ranking')
+        reference = StatsData('ranking', int, extendable=True)
+        history[PlayerIndex(0)] = 0
+        reference[PlayerIndex(0)] = 0
+
+        player_index = 0
+        for league_index in range(1, 500):
+            rank = random.choice([1, 1, 1, 2, 3])
+            if random.random() < 0.3:
+                # entity played that match
+                player_index += 1
+                key = PlayerIndex(player_index)
+            else:
+                key = LeagueIndex(league_index)
+                key.set_no_exists()
+            history[key] = rank
+            reference[key] = rank
+
+            if random.random() < 0.05:
+                # rewrite the past
+                key = PlayerIndex(random.randint(0, player_index))
+                history[key] = 7
+                dict.__setitem__(reference, key, 7)
+
+        for i in range(0, player_index + 10):
+            self.assertEqual(history[PlayerIndex(i)], reference[PlayerIndex(i)])
+            self.assertEqual(PlayerIndex(i) in history, PlayerIndex(i) in reference)
+
+        self.assertLess(history.get_number_of_events(), len(history))
+
+        history.reset()
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history[PlayerIndex(5)], reference[PlayerIndex(0)])
+
+    def test_counters(self):
+        stats = self._setup_test_stats()
+        index = LeagueIndex(8)
+
+        Counters.reset()
+        Counters.enable()
+        try:
+            stats.get_cumulative_data_sum_for_index('match_points', index=index)
+            stats.get_cumulative_data_sum_for_index('match_points', index=LeagueIndex(5))
+            with self.assertRaises(NoMatchPlayedYetError):
+                Stats(0.0, 1.0).get_number_of_match_played_by_league_index_time(index=index)
+        finally:
+            Counters.disable()
+
+        self.assertEqual(Counters.get_count(Counters.CUMULATIVE_SUM), 2)
+        self.assertEqual(Counters.get_count(Counters.NON_EXISTS_FALLBACK), 1)
+        self.assertEqual(Counters.get_count(Counters.INDEX_CONVERSION), 2)
+        self.assertEqual(Counters.get_count(Counters.NO_MATCH_PLAYED_YET_RAISED), 1)
+        Counters.reset()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -8,6 +8,9 @@ import importlib
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 utils = importlib.import_module("utils")
 from utils.utils import *
+from utils.counters import Counters
+from utils.profiler import Profiler
+from utils.tracer import Tracer
 
 
 class BaseClass:
@@ -168,5 +171,126 @@ class TestUtilsTypeChecker(unittest.TestCase):
             foo('a', 3, c=4.0)
 
 
+class TestUtilsProfiler(unittest.TestCase):
+
+    def tearDown(self):
+        Profiler.disable()
+
+    def test_disabled_profiler(self):
+        Profiler.enable()
+        Profiler.disable()
+        with Profiler.phase("not timed"):
+            pass
+        Profiler.add_phase("not timed either", 1.0)
+        self.assertEqual(Profiler.get_phases(), [])
+
+    def test_nested_phases(self):
+        Profiler.enable()
+        Profiler.add_phase("import", 0.5)
+        with Profiler.phase("parse"):
+            with Profiler.phase("generate"):
+                pass
+        with self.assertRaises(ValueError):
+            with Profiler.phase("compute"):
+                raise ValueError("Phases must be timed even if they fail")
+
+        phases = Profiler.get_phases()
+        self.assertEqual([(name, depth) for name, depth, _ in phases],
+                         [("import", 0), ("parse", 0), ("generate", 1), ("compute", 0)])
+        self.assertEqual(phases[0][2], 0.5)
+        self.assertGreaterEqual(phases[1][2], phases[2][2])
+
+    def test_cprofile_phase(self):
+        import io
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as profile_dir:
+            Profiler.enable(profile_dir)
+            with Profiler.phase("compute singles", cprofile=True):
+                sorted(range(1000), key=lambda x: -x)
+            self.assertTrue(os.path.exists(os.path.join(profile_dir, "compute-singles.prof")))
+
+            output = io.StringIO()
+            Profiler.print_summary(top=3, file=output)
+            self.assertIn("compute singles", output.getvalue())
+            self.assertIn("Top 3 functions by own time for 'compute singles'", output.getvalue())
+
+
+class TestUtilsCounters(unittest.TestCase):
+
+    def setUp(self):
+        Counters.reset()
+
+    def tearDown(self):
+        Counters.disable()
+        Counters.reset()
+
+    def test_disabled_counters(self):
+        Counters.increment(Counters.INDEX_CONVERSION)
+        self.assertEqual(Counters.get_count(Counters.INDEX_CONVERSION), 0)
+        self.assertEqual(Counters.get_counts(), dict())
+
+    def test_scoped_counters(self):
+        import io
+
+        Counters.enable()
+        Counters.increment(Counters.INDEX_CONVERSION)
+        Counters.set_scope('singles')
+        Counters.increment(Counters.INDEX_CONVERSION, 2)
+        Counters.increment('cache.hit', 3)
+        Counters.increment('cache.miss')
+
+        self.assertEqual(Counters.get_count(Counters.INDEX_CONVERSION, scope=Counters.DEFAULT_SCOPE), 1)
+        self.assertEqual(Counters.get_count(Counters.INDEX_CONVERSION, scope='singles'), 2)
+        self.assertEqual(Counters.get_count(Counters.INDEX_CONVERSION), 3)
+        self.assertEqual(Counters.get_count(Counters.INDEX_CONVERSION, scope='doubles'), 0)
+
+        output = io.StringIO()
+        Counters.print_summary(file=output)
+        self.assertIn("cache hit rate", output.getvalue())
+        self.assertIn("75.0%", output.getvalue())
+
+
+class TestUtilsTracer(unittest.TestCase):
+
+    def tearDown(self):
+        Tracer.disable()
+
+    def test_disabled_tracer(self):
+        self.assertIsNone(Tracer.begin("chunk"))
+        self.assertIsNone(Tracer.sample("match"))
+
+    def test_sampled_spans(self):
+        import json
+        import tempfile
+
+        Tracer.enable(sample_rate=3)
+        for i in range(1, 10):
+            span = Tracer.sample("match", index=i)
+            if span is not None:
+                span.step("points")
+                span.step("ranking")
+                span.end()
+
+        events = Tracer.get_events()
+        matches = [e for e in events if e['name'] == 'match']
+        self.assertEqual([e['args']['index'] for e in matches], [3, 6, 9])
+        self.assertEqual(len([e for e in events if e['name'] == 'points']), 3)
+
+        # Steps are nested in their span
+        points = [e for e in events if e['name'] == 'points'][0]
+        self.assertLessEqual(matches[0]['ts'], points['ts'])
+        self.assertLessEqual(points['ts'] + points['dur'], matches[0]['ts'] + matches[0]['dur'])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, "trace.json")
+            Tracer.write(file_name)
+            with open(file_name) as fd:
+                self.assertEqual(len(json.load(fd)['traceEvents']), len(events))
+
+        with self.assertRaises(ValueError):
+            Tracer.enable(sample_rate=0)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,13 +1,8 @@
 from abc import ABCMeta, abstractmethod
 import copy
 from enum import Enum
-import sys
-import os
-import importlib
-
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-utils = importlib.import_module("utils")
 
+from utils.counters import Counters
 from utils.utils import Accepts
 from utils.exceptions import *
 
@@ -37,13 +32,14 @@ class SmartIndex(metaclass=ABCMeta):
     def exists(self):
         return self._exists
 
+    # Attributes are immutable, a shallow copy is enough and much cheaper than a deep one
     def get_unlocked_copy(self):
-        c = copy.deepcopy(self)
+        c = copy.copy(self)
         c._lock = False
         return c
 
     def get_locked_copy(self):
-        c = copy.deepcopy(self)
+        c = copy.copy(self)
         c.lock()
         return c
 
@@ -51,6 +47,13 @@ class SmartIndex(metaclass=ABCMeta):
     def index(self):
         return self._index
 
+    def get_key(self):
+        """
+        Hashable value of the index, e.g. to memoize values per index. Unlike the index itself, it doesn't
+        change when the index is incremented and isn't equal to that of another index type.
+        """
+        return type(self), self._index, self._exists
+
     def lock(self):
         # prevent index modification
         self._lock = True
@@ -181,6 +184,8 @@ class SmartIndexCache:
         self._index_cache = dict()
         self._index_cache[IndexType.PLAYER] = set()
         self._index_cache[IndexType.LEAGUE] = set()
+        # Indexes are added in increasing order, keeping track of the largest saves scanning them
+        self._max_index = dict()
 
     @Accepts.accepts(object, LeagueIndex, PlayerIndex, league_index=LeagueIndex, player_index=PlayerIndex)
     def add_index(self, league_index: LeagueIndex, player_index: PlayerIndex):
@@ -192,6 +197,30 @@ class SmartIndexCache:
         self._index_cache[league_index.index_type].add(league_index)
         self._index_to_index_map[league_index] = player_index
         self._index_to_index_map[player_index] = league_index
+        for index in [player_index, league_index]:
+            if index.index_type not in self._max_index or index > self._max_index[index.index_type]:
+                self._max_index[index.index_type] = index
+
+    @Accepts.accepts(object, LeagueIndex, PlayerIndex, league_index=LeagueIndex, player_index=PlayerIndex)
+    def remove_latest_indexes(self, league_index: LeagueIndex, player_index: PlayerIndex):
+        """
+        Removes the indexes added after given ones, which become the largest (0 for none). Player indexes
+        must have been added from 1 on, one after the other, as Stats.set_match_results does.
+        """
+        index = int(self._max_index.get(IndexType.PLAYER, 0))
+        while index > int(player_index):
+            removed_player_index = PlayerIndex(index)
+            removed_league_index = self._index_to_index_map.pop(removed_player_index)
+            del self._index_to_index_map[removed_league_index]
+            self._index_cache[IndexType.PLAYER].remove(removed_player_index)
+            self._index_cache[IndexType.LEAGUE].remove(removed_league_index)
+            index -= 1
+
+        if player_index == 0:
+            self._max_index.clear()
+        else:
+            self._max_index[IndexType.PLAYER] = self._index_to_index_map[league_index]
+            self._max_index[IndexType.LEAGUE] = self._index_to_index_map[player_index]
 
     @Accepts.accepts(object, SmartIndex, index=SmartIndex)
     def exists(self, index: SmartIndex):
@@ -207,13 +236,14 @@ class SmartIndexCache:
     def max_index(self, index_type: IndexType):
         if len(self._index_cache[index_type]) == 0:
             raise SmartIndexError("No index added to cache yet")
-        return max(self._index_cache[index_type])
+        return self._max_index[index_type]
 
     def get_latest_valid_index(self, index: SmartIndex):
         if index.index_type == IndexType.PLAYER:
             latest_index = PlayerIndex(0)
         else:
             latest_index = LeagueIndex(0)
+        Counters.increment(Counters.LATEST_VALID_INDEX_SCAN)
         for i in sorted(self._index_cache[index.index_type]):
             if latest_index < i <= index:
                 latest_index = i
@@ -229,10 +259,11 @@ class SmartIndexCache:
                 return LeagueIndex(0)
 
         if len(self._index_to_index_map) == 0:
+            Counters.increment(Counters.NO_MATCH_PLAYED_YET_RAISED)
             raise NoMatchPlayedYetError("No match played yet for that index (%s)" % index)
 
         if index == -1:
-            return max(self._index_cache[index_type])
+            return self._max_index[index_type]
 
         if not self.exists(index):
             # Let the data object handle the case
@@ -243,6 +274,7 @@ class SmartIndexCache:
         if index.index_type == index_type:
             return index
         else:
+            Counters.increment(Counters.INDEX_CONVERSION)
             r = self._index_to_index_map[index]
             if r.index_type != index_type:
                 raise SmartIndexError("Can't find %s for %s" % (str(index_type), str(index)))
@@ -0,0 +1,98 @@
+import sys
+
+
+class Counters:
+    """
+    Opt-in operation counters for the hot paths (see score.py --counters), to see which access
+    patterns dominate for a given league shape. Counts are kept per scope, e.g. the play type
+    being computed, see set_scope.
+
+    Cache hit rates are reported for counters named '<cache>.hit' and '<cache>.miss'.
+
+        Counters.enable()
+        Counters.set_scope('singles')
+        Counters.increment(Counters.INDEX_CONVERSION)
+        Counters.print_summary()
+    """
+    # SmartIndexCache.get_index_for_type converting a league index to a player index or vice versa
+    INDEX_CONVERSION = 'index_conversion'
+    # Stats._fix_non_exists looking for the latest valid index of a non existent one
+    NON_EXISTS_FALLBACK = 'non_exists_fallback'
+    # Sorted scans for the latest index: StatsData extendable lookups and SmartIndexCache.get_latest_valid_index
+    EXTENDABLE_SCAN = 'extendable_scan'
+    LATEST_VALID_INDEX_SCAN = 'latest_valid_index_scan'
+    # Stats._get_sum, summing a column up to an index
+    CUMULATIVE_SUM = 'cumulative_sum'
+    # League.get_league_average_points_per_match, going over every playing entity
+    LEAGUE_AVERAGE_SCAN = 'league_average_scan'
+    # PlayingEntity memoized getters, see interfaces._memoized
+    ENTITY_GETTER_HIT = 'entity_getter.hit'
+    ENTITY_GETTER_MISS = 'entity_getter.miss'
+    NO_MATCH_PLAYED_YET_RAISED = 'no_match_played_yet_raised'
+    NO_MATCH_PLAYED_YET_CAUGHT = 'no_match_played_yet_caught'
+
+    DEFAULT_SCOPE = 'other'
+
+    _ENABLED = False
+    _scope = DEFAULT_SCOPE
+    _counts = dict()
+
+    @classmethod
+    def enable(cls):
+        cls._ENABLED = True
+
+    @classmethod
+    def disable(cls):
+        cls._ENABLED = False
+
+    @classmethod
+    def is_enabled(cls):
+        return cls._ENABLED
+
+    @classmethod
+    def reset(cls):
+        cls._scope = Counters.DEFAULT_SCOPE
+        cls._counts = dict()
+
+    @classmethod
+    def set_scope(cls, scope: str):
+        cls._scope = scope
+
+    @classmethod
+    def increment(cls, name: str, count=1):
+        if not cls._ENABLED:
+            return
+        scope_counts = cls._counts.setdefault(cls._scope, dict())
+        scope_counts[name] = scope_counts.get(name, 0) + count
+
+    @classmethod
+    def get_count(cls, name: str, scope=None):
+        """
+        Count for given scope, summed over all scopes if None.
+        """
+        if scope is not None:
+            return cls._counts.get(scope, dict()).get(name, 0)
+        return sum([counts.get(name, 0) for counts in cls._counts.values()])
+
+    @classmethod
+    def get_counts(cls):
+        """
+        Dictionary of scope -> counter name -> count.
+        """
+        return dict([(scope, dict(counts)) for scope, counts in cls._counts.items()])
+
+    @classmethod
+    def print_summary(cls, file=sys.stderr):
+        print("Operation counters:", file=file)
+        for scope in sorted(cls._counts.keys()):
+            counts = cls._counts[scope]
+            print("    %s" % scope, file=file)
+            for name in sorted(counts.keys()):
+                print("        %-40s %12d" % (name, counts[name]), file=file)
+
+            for name in sorted(counts.keys()):
+                if not name.endswith('.hit'):
+                    continue
+                cache = name[:-len('.hit')]
+                lookups = counts[name] + counts.get(cache + '.miss', 0)
+                print("        %-40s %11.1f%%" % (cache + ' hit rate', counts[name] * 100.0 / lookups), file=file)
@@ -0,0 +1,115 @@
+import contextlib
+import os
+import sys
+import time
+
+
+class Profiler:
+    """
+    Times the phases of a run (see score.py --profile). Phases can be nested, in which case the
+    enclosing phase's time includes the nested ones. It is disabled by default, phase() then doesn't
+    time anything.
+
+    When enabled with a profile directory, phases opened with cprofile=True are also run under
+    cProfile: their stats are saved to '<profile directory>/<phase name>.prof' and their hottest
+    functions are added to the summary.
+
+        Profiler.enable()
+        with Profiler.phase("compute singles", cprofile=True):
+            ...
+        Profiler.print_summary()
+    """
+    _ENABLED = False
+    _PROFILE_DIR = None
+    _phases = []
+    _profiles = []
+    _depth = 0
+
+    @classmethod
+    def enable(cls, profile_dir=None):
+        cls._ENABLED = True
+        cls._PROFILE_DIR = profile_dir
+        cls._phases = []
+        cls._profiles = []
+        cls._depth = 0
+
+    @classmethod
+    def disable(cls):
+        cls._ENABLED = False
+
+    @classmethod
+    def is_enabled(cls):
+        return cls._ENABLED
+
+    @classmethod
+    def add_phase(cls, name: str, seconds: float):
+        """
+        Records a phase timed by the caller, e.g. one which happened before the profiler got enabled.
+        """
+        if cls._ENABLED:
+            cls._phases.append((name, cls._depth, seconds))
+
+    @classmethod
+    @contextlib.contextmanager
+    def phase(cls, name: str, cprofile=False):
+        if not cls._ENABLED:
+            yield
+            return
+
+        # Phases are listed in start order, timed on exit
+        position = len(cls._phases)
+        cls._phases.append((name, cls._depth, 0.0))
+        cls._depth += 1
+
+        profile = None
+        if cprofile and cls._PROFILE_DIR is not None:
+            # Only imported when needed, pstats alone noticeably slows down score.py's startup
+            import cProfile
+            profile = cProfile.Profile()
+
+        start = time.perf_counter()
+        try:
+            if profile is None:
+                yield
+            else:
+                profile.enable()
+                try:
+                    yield
+                finally:
+                    profile.disable()
+        finally:
+            cls._phases[position] = (name, cls._depth - 1, time.perf_counter() - start)
+            cls._depth -= 1
+            if profile is not None:
+                cls._save_profile(name, profile)
+
+    @classmethod
+    def _save_profile(cls, name: str, profile):
+        import pstats
+
+        os.makedirs(cls._PROFILE_DIR, exist_ok=True)
+        file_name = os.path.join(cls._PROFILE_DIR, "%s.prof" % "-".join(name.split()))
+        profile.dump_stats(file_name)
+        cls._profiles.append((name, file_name, pstats.Stats(profile)))
+
+    @classmethod
+    def get_phases(cls):
+        """
+        List of (name, nesting depth, seconds) in start order.
+        """
+        return list(cls._phases)
+
+    @classmethod
+    def print_summary(cls, top=10, file=sys.stderr):
+        print("Profile (seconds, nested phases are included in their enclosing one):", file=file)
+        for name, depth, seconds in cls._phases:
+            print("    %-40s %10.4f" % ("  " * depth + name, seconds), file=file)
+
+        for name, file_name, stats in cls._profiles:
+            print(file=file)
+            print("Top %d functions by own time for '%s', see %s:" % (top, name, file_name), file=file)
+            print("    %10s %10s %10s  %s" % ("ncalls", "tottime", "cumtime", "function"), file=file)
+            hottest = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+            for (path, line, function), (_, ncalls, tottime, cumtime, _) in hottest:
+                print("    %10d %10.4f %10.4f  %s:%d(%s)" % (ncalls, tottime, cumtime, os.path.basename(path), line,
+                                                           function), file=file)
@@ -0,0 +1,117 @@
+import json
+import os
+import time
+
+
+class TraceSpan:
+    """
+    Span being recorded, see Tracer. A span can be split into consecutive steps, each step being
+    recorded as a nested span.
+    """
+    __slots__ = ['_name', '_args', '_start', '_step_name', '_step_start']
+
+    def __init__(self, name: str, args: dict):
+        self._name = name
+        self._args = args
+        self._start = time.perf_counter_ns()
+        self._step_name = None
+        self._step_start = None
+
+    def step(self, name: str):
+        """
+        Ends the current step, if any, and starts a new one.
+        """
+        now = time.perf_counter_ns()
+        if self._step_name is not None:
+            Tracer.add_event(self._step_name, self._step_start, now, None)
+        self._step_name = name
+        self._step_start = now
+
+    def end(self):
+        now = time.perf_counter_ns()
+        if self._step_name is not None:
+            Tracer.add_event(self._step_name, self._step_start, now, None)
+        Tracer.add_event(self._name, self._start, now, self._args)
+
+
+class Tracer:
+    """
+    Records spans in memory and writes them in Chrome trace event format, to be loaded in
+    chrome://tracing or https://ui.perfetto.dev (see score.py --trace).
+
+    Spans started with sample() are only recorded for one out of 'sample_rate' calls, so that
+    tracing a long season only costs a few percent. Spans started with begin() are always recorded.
+    Both return None when the tracer is disabled or the span isn't sampled, callers are expected
+    to check for it:
+
+        span = Tracer.sample("match", index=1)
+        if span is not None:
+            span.step("points")
+        ...
+        if span is not None:
+            span.end()
+    """
+    _ENABLED = False
+    _sample_rate = 1
+    _sample_count = 0
+    _events = []
+    _origin = 0
+
+    @classmethod
+    def enable(cls, sample_rate=1):
+        if sample_rate < 1:
+            raise ValueError("Trace sample rate must be at least 1, got %d" % sample_rate)
+        cls._ENABLED = True
+        cls._sample_rate = sample_rate
+        cls._sample_count = 0
+        cls._events = []
+        cls._origin = time.perf_counter_ns()
+
+    @classmethod
+    def disable(cls):
+        cls._ENABLED = False
+
+    @classmethod
+    def is_enabled(cls):
+        return cls._ENABLED
+
+    @classmethod
+    def begin(cls, name: str, **args):
+        if not cls._ENABLED:
+            return None
+        return TraceSpan(name, args)
+
+    @classmethod
+    def sample(cls, name: str, **args):
+        if not cls._ENABLED:
+            return None
+        cls._sample_count += 1
+        if cls._sample_count % cls._sample_rate != 0:
+            return None
+        return TraceSpan(name, args)
+
+    @classmethod
+    def add_event(cls, name: str, start_ns: int, end_ns: int, args):
+        cls._events.append((name, start_ns, end_ns, args))
+
+    @classmethod
+    def get_events(cls):
+        """
+        Complete ('X') trace events, timestamps and durations being in microseconds.
+        """
+        pid = os.getpid()
+        events = []
+        for name, start, end, args in cls._events:
+            event = {'name': name, 'ph': 'X', 'pid': pid, 'tid': 1,
+                     'ts': (start - cls._origin) / 1000.0, 'dur': (end - start) / 1000.0}
+            if args:
+                event['args'] = args
+            events.append(event)
+        return events
+
+    @classmethod
+    def write(cls, file_name: str):
+        with open(file_name, 'w') as fd:
+            json.dump({'traceEvents': cls.get_events(),
+                       'displayTimeUnit': 'ms',
+                       'otherData': {'sample_rate': cls._sample_rate}}, fd)
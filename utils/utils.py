@@ -111,7 +111,7 @@ class LoggerHandler:
 
     @classmethod
     def set_default_level(cls, level: int):
-        cls.DEFAULT_LEVEL = level
+        cls._DEFAULT_LEVEL = level
 
     @classmethod
     def get_instance(cls):